@@ -0,0 +1,606 @@
+"""
+بنچمارک آفلاین موتور لایک.
+
+هندلرهای واقعی تنظیم فرآیند و liking_task را با یک کلاینت جعلی اینستاگرام
+(تاخیر، خطا، محدودیت سرعت و اندازه داده قابل تنظیم) و یک ربات جعلی تلگرام
+اجرا می‌کند. تمام خواب‌ها (فاصله‌گذاری سطل‌های توکن و تاخیر درخواست‌ها) روی
+یک ساعت مجازی اجرا می‌شوند، بنابراین چند ساعت کار واقعی در چند ثانیه و بدون
+اتصال به شبکه شبیه‌سازی می‌شود.
+
+مثال:
+    python benchmark.py --scenario following --users 2000 --posts-per-user 2
+    python benchmark.py --scenario post_likers --posts 5 --likers-per-post 800 --accounts 3 --json
+"""
+import argparse
+import array
+import asyncio
+import concurrent.futures
+import datetime
+import heapq
+import json
+import logging
+import math
+import os
+import random
+import resource
+import selectors
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from instagrapi.exceptions import ClientError, FeedbackRequired, PleaseWaitFewMinutes
+from instagrapi.types import Media, UserShort
+
+from sources import SHORTCODE_ALPHABET
+
+BENCH_ADMIN_ID = 1
+BENCH_CHAT_ID = 1
+FIRST_USER_PK = 10_000_000
+# هر بار جلو بردن ساعت مجازی کمی بیشتر از موعد تایمر است (مانند ساعت واقعی)، تا
+# محاسباتی که با خطای ممیز شناور چند نانوثانیه کم می‌آورند در حلقه بی‌پایان نیفتند
+CLOCK_STEP = 1e-6
+# مدت (مجازی) یک درخواست گیر کرده در شبیه‌سازی --hang-rate
+HANG_SECONDS = 24 * 3600
+
+
+# --- ساعت مجازی ---
+def _noop() -> None:
+    pass
+
+
+class VirtualClock:
+    """
+    ساعت مجازی مشترک بین event loop و thread های اجرای درخواست‌ها.
+    کلاینت جعلی تاخیر هر درخواست را با `sleep_in_thread` روی این ساعت می‌گذراند.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.lock = threading.Lock()
+        self.blocked = 0
+        self.loop = None
+        self._waiters = []
+        self._seq = 0
+
+    def sleep_in_thread(self, seconds: float) -> None:
+        event = threading.Event()
+        with self.lock:
+            heapq.heappush(self._waiters, (self.now + max(0.0, seconds), self._seq, event))
+            self._seq += 1
+            self.blocked += 1
+        # event loop باید بیدار شود تا ببیند همه thread ها منتظر ساعت مجازی هستند
+        self.loop.call_soon_threadsafe(_noop)
+        event.wait()
+
+    def next_wakeup(self):
+        return self._waiters[0][0] if self._waiters else None
+
+    def release_due(self) -> int:
+        """thread هایی را که زمان بیدار شدنشان رسیده آزاد می‌کند (باید با قفل فراخوانی شود)."""
+        released = 0
+        while self._waiters and self._waiters[0][0] <= self.now:
+            _, _, event = heapq.heappop(self._waiters)
+            self.blocked -= 1
+            event.set()
+            released += 1
+        return released
+
+
+class CountingExecutor(concurrent.futures.ThreadPoolExecutor):
+    """thread pool که کارهای در صف خود و کارهای در حال اجرای کل گروه را می‌شمارد."""
+
+    def __init__(self, group: 'ExecutorGroup', max_workers: int = None, **kwargs):
+        super().__init__(max_workers, **kwargs)
+        self.group = group
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.queued = 0
+        self.running = 0
+
+    def _forget_cancelled(self, future) -> None:
+        if future.cancelled():
+            with self.group.lock:
+                self.queued -= 1
+
+    def submit(self, fn, /, *args, **kwargs):
+        group = self.group
+
+        def run():
+            with group.lock:
+                self.queued -= 1
+                self.running += 1
+                group.running += 1
+                group.peak_running = max(group.peak_running, group.running)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with group.lock:
+                    self.running -= 1
+                    group.running -= 1
+
+        with group.lock:
+            self.queued += 1
+        try:
+            future = super().submit(run)
+        except BaseException:
+            with group.lock:
+                self.queued -= 1
+            raise
+        future.add_done_callback(self._forget_cancelled)
+        return future
+
+
+class ExecutorGroup:
+    """تمام thread pool های بنچمارک: pool پیش‌فرض event loop و pool اختصاصی هر اکانت."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak_running = 0
+        self.executors = []
+
+    def create(self, **kwargs) -> CountingExecutor:
+        executor = CountingExecutor(self, **kwargs)
+        self.executors.append(executor)
+        return executor
+
+    def busy(self, blocked: int) -> bool:
+        """آیا thread ای (غیر از thread های منتظر ساعت مجازی) کار واقعی انجام می‌دهد یا به زودی شروع می‌کند."""
+        with self.lock:
+            if self.running > blocked:
+                return True
+            # کار در صف فقط وقتی به زودی شروع می‌شود که pool آن thread آزاد داشته باشد
+            return any(e.queued > 0 and e.running < e.max_workers for e in self.executors)
+
+    def shutdown(self) -> None:
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class VirtualTimeSelector(selectors.DefaultSelector):
+    """
+    selector که به جای انتظار واقعی برای تایمرها، ساعت مجازی را جلو می‌برد.
+    ساعت فقط زمانی جلو می‌رود که هیچ thread ای کار واقعی انجام ندهد. مدت
+    اجرای واقعی callback ها بین دو فراخوانی select به عنوان تاخیر event loop ثبت می‌شود.
+    """
+
+    def __init__(self, clock: VirtualClock, executors: ExecutorGroup):
+        super().__init__()
+        self.clock = clock
+        self.executors = executors
+        self.lag_samples = array.array('d')
+        self._resumed_at = None
+
+    def select(self, timeout=None):
+        if self._resumed_at is not None:
+            self.lag_samples.append(time.perf_counter() - self._resumed_at)
+        try:
+            return self._select(timeout)
+        finally:
+            self._resumed_at = time.perf_counter()
+
+    def _select(self, timeout):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+
+        with self.clock.lock:
+            if not self.executors.busy(self.clock.blocked):
+                candidates = [] if timeout is None else [self.clock.now + timeout]
+                wakeup = self.clock.next_wakeup()
+                if wakeup is not None:
+                    candidates.append(wakeup)
+                if not candidates:
+                    # نه تایمری هست و نه thread ای؛ فقط رویداد واقعی می‌تواند کاری پیش ببرد
+                    return super().select(timeout)
+                self.clock.now = max(self.clock.now, min(candidates)) + CLOCK_STEP
+                if not self.clock.release_due():
+                    # یک تایمر event loop سررسید شده است
+                    return []
+        # thread های در حال کار با پایان کار یا رسیدن به خواب مجازی بعدی loop را بیدار می‌کنند
+        return super().select(None)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock: VirtualClock, executors: ExecutorGroup):
+        self.clock = clock
+        self.virtual_selector = VirtualTimeSelector(clock, executors)
+        super().__init__(self.virtual_selector)
+        self.set_default_executor(executors.create())
+        clock.loop = self
+
+    def time(self) -> float:
+        return self.clock.now
+
+
+# --- کلاینت جعلی اینستاگرام ---
+def _fraction(index: int, salt: int) -> float:
+    """عدد شبه‌تصادفی ثابت در بازه [0, 1) برای ویژگی‌های هر کاربر یا پست."""
+    return ((index * 2654435761 + salt * 40503) % 1000003) / 1000003
+
+
+class FakeDataset:
+    """داده‌های ساختگی: دنبال‌شوندگان، پست‌های هدف و لایک‌کنندگان آن‌ها و پست‌های هر کاربر."""
+
+    def __init__(self, args):
+        self.args = args
+        self.post_codes = [self._shortcode(1000 + i) for i in range(args.posts)]
+        # لایک‌کنندگان پست‌های پشت سر هم به اندازه likers_overlap با هم اشتراک دارند
+        self.likers_step = max(1, int(args.likers_per_post * (1 - args.likers_overlap)))
+        self._post_index = {}
+        for index, code in enumerate(self.post_codes):
+            pk = 0
+            for char in code:
+                pk = pk * 64 + SHORTCODE_ALPHABET.index(char)
+            self._post_index[str(pk)] = index
+
+    @staticmethod
+    def _shortcode(number: int) -> str:
+        chars = []
+        for _ in range(11):
+            number, digit = divmod(number, 64)
+            chars.append(SHORTCODE_ALPHABET[digit])
+        return ''.join(reversed(chars))
+
+    def post_urls(self) -> list:
+        return [f"https://www.instagram.com/p/{code}/" for code in self.post_codes]
+
+    def user(self, index: int) -> UserShort:
+        return UserShort(
+            pk=str(FIRST_USER_PK + index),
+            username=f"bench_user_{index}",
+            is_private=_fraction(index, 1) < self.args.private_rate,
+        )
+
+    def likers(self, media_pk: str) -> list:
+        start = self._post_index[str(media_pk)] * self.likers_step
+        return [self.user(i) for i in range(start, start + self.args.likers_per_post)]
+
+    def medias(self, user_pk: str, amount: int) -> list:
+        index = int(user_pk) - FIRST_USER_PK
+        if _fraction(index, 2) < self.args.no_posts_rate:
+            return []
+        taken_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        medias = []
+        for n in range(min(amount, self.args.medias_per_user)):
+            media_pk = f"{user_pk}{n:03d}"
+            medias.append(Media.model_construct(
+                pk=media_pk, id=f"{media_pk}_{user_pk}", taken_at=taken_at,
+                has_liked=_fraction(index * 31 + n, 3) < self.args.already_liked_rate,
+            ))
+        return medias
+
+
+class FakeInstagramClient:
+    """
+    جایگزین instagrapi.Client با همان متدهایی که موتور لایک صدا می‌زند.
+    هر درخواست با تاخیر (توزیع log-normal حول `latency`) روی ساعت مجازی می‌خوابد و
+    درخواست‌های دریافت پست‌ها و لایک با احتمال‌های داده شده خطای محدودیت سرعت
+    یا خطای عادی برمی‌گردانند.
+    """
+
+    def __init__(self, index: int, dataset: FakeDataset, clock: VirtualClock, args, seed: int):
+        self.user_id = str(900_000 + index)
+        self.username = f"bench_account_{index}"
+        self.delay_range = [1, 3]
+        self.dataset = dataset
+        self.clock = clock
+        self.args = args
+        self.likes = 0
+        self.first_like_at = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _request(self, kind: str) -> None:
+        with self._lock:
+            roll = self._rng.random()
+            latency = self._rng.lognormvariate(math.log(self.args.latency), self.args.latency_jitter)
+        if kind != 'list' and roll > 1 - self.args.hang_rate:
+            # درخواست گیر کرده؛ فقط با پایان مهلت موتور لایک رها می‌شود
+            latency = HANG_SECONDS
+        self.clock.sleep_in_thread(latency)
+        if kind == 'list':
+            # خطای دریافت لیست کاربران کل منبع را متوقف می‌کند؛ فقط تاخیر آن شبیه‌سازی می‌شود
+            return
+        if roll < self.args.throttle_rate:
+            if kind == 'like':
+                raise FeedbackRequired("feedback_required (benchmark)")
+            raise PleaseWaitFewMinutes("Please wait a few minutes before you try again. (benchmark)")
+        if roll < self.args.throttle_rate + self.args.error_rate:
+            raise ClientError("simulated error (benchmark)")
+
+    def user_following_v1_chunk(self, user_id: str, max_amount: int = 0, max_id: str = ""):
+        self._request('list')
+        start = int(max_id or 0)
+        end = min(start + (max_amount or 200), self.args.users)
+        users = [self.dataset.user(i) for i in range(start, end)]
+        return users, (str(end) if end < self.args.users else "")
+
+    def media_likers(self, media_id: str) -> list:
+        self._request('list')
+        return self.dataset.likers(media_id)
+
+    def media_pk_from_url(self, url: str) -> str:
+        raise ClientError(f"unexpected non-local url in benchmark: {url}")
+
+    def user_medias(self, user_id: str, amount: int = 0) -> list:
+        self._request('read')
+        return self.dataset.medias(user_id, amount)
+
+    def media_like(self, media_id: str, revert: bool = False) -> bool:
+        self._request('like')
+        with self._lock:
+            self.likes += 1
+            if self.first_like_at is None:
+                self.first_like_at = (self.clock.now, time.perf_counter())
+        return True
+
+
+# --- ربات جعلی تلگرام ---
+class FakeBot:
+    def __init__(self):
+        self.messages = []
+        self.edits = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append(text)
+        return SimpleNamespace(chat_id=chat_id, message_id=len(self.messages), text=text)
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        self.edits += 1
+
+    async def pin_chat_message(self, chat_id, message_id, **kwargs):
+        return True
+
+    async def unpin_chat_message(self, chat_id, message_id=None, **kwargs):
+        return True
+
+
+def _make_update(bot: FakeBot, text: str):
+    async def reply_text(reply, **kwargs):
+        return await bot.send_message(BENCH_CHAT_ID, reply, **kwargs)
+
+    async def ignore(*args, **kwargs):
+        return None
+
+    # دکمه‌های inline هم با همین update شبیه‌سازی می‌شوند (text همان callback_data است)
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=BENCH_ADMIN_ID),
+        effective_chat=SimpleNamespace(id=BENCH_CHAT_ID),
+        message=SimpleNamespace(text=text, reply_text=reply_text),
+        callback_query=SimpleNamespace(data=text, answer=ignore, edit_message_text=reply_text,
+                                       edit_message_reply_markup=ignore),
+    )
+
+
+# --- اجرای سناریو ---
+def _import_engine(workdir: str, args):
+    """main.py را در یک پوشه موقت (برای session ها، دفتر لایک و کش‌ها) و با تنظیمات بنچمارک بارگذاری می‌کند."""
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': '0:benchmark',
+        'ADMIN_USER_ID': str(BENCH_ADMIN_ID),
+        'METRICS_PORT': '0',
+        'PREFETCH_USERS': str(args.prefetch),
+        'INSTAGRAM_CALL_TIMEOUT': str(args.call_timeout),
+    })
+    os.chdir(workdir)
+    import main
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+    return main
+
+
+def _setup_steps(main, args, dataset: FakeDataset) -> list:
+    """پیام‌های اپراتور در مکالمه تنظیم فرآیند، به همراه هندلر هر مرحله."""
+    delay = f"{args.delay[0]},{args.delay[1]}"
+    sleep = f"{args.sleep[0]},{args.sleep[1]}"
+    if args.scenario == 'post_likers':
+        return [
+            (main.liking_from_post_setup_start, ",".join(dataset.post_urls())),
+            (main.liking_from_post_get_post_count, str(args.posts_per_user)),
+            (main.liking_from_post_get_delay, delay),
+            (main.liking_from_post_get_sleep_and_start, sleep),
+            (main.handle_liking_confirmation, 'liking_start'),
+        ]
+    return [
+        (main.liking_following_setup_start, "/like_following"),
+        (main.liking_following_get_user_count, str(args.users)),
+        (main.liking_following_get_post_count, str(args.posts_per_user)),
+        (main.liking_following_get_delay, delay),
+        (main.liking_following_get_sleep_and_start, sleep),
+        (main.handle_liking_confirmation, 'liking_start'),
+    ]
+
+
+async def _run_job(main, args, clock: VirtualClock, clients: list, dataset: FakeDataset) -> dict:
+    bot = FakeBot()
+    user_data = {'client': clients[0], 'chat_id': BENCH_CHAT_ID, 'session_file': 'bench_account_0.json'}
+    if len(clients) > 1:
+        sessions = [f"bench_account_{i}.json" for i in range(1, len(clients))]
+        user_data['pool_sessions'] = sessions
+        user_data['pool_clients'] = dict(zip(sessions, clients[1:]))
+    context = SimpleNamespace(user_data=user_data, bot=bot, bot_data={})
+
+    started = (clock.now, time.perf_counter())
+    for handler, text in _setup_steps(main, args, dataset):
+        await handler(_make_update(bot, text), context)
+    setup_done = (clock.now, time.perf_counter())
+    job = user_data.get('liking_job')
+    if job is None:
+        raise RuntimeError(f"فرآیند لایک شروع نشد؛ آخرین پیام ربات: {bot.messages[-1] if bot.messages else '-'}")
+
+    current = asyncio.current_task()
+    while True:
+        pending = asyncio.all_tasks() - {current}
+        if not pending:
+            break
+        await asyncio.wait(pending)
+    finished = (clock.now, time.perf_counter())
+
+    first_likes = [cl.first_like_at for cl in clients if cl.first_like_at is not None]
+    first_like = min(first_likes) if first_likes else None
+    return {
+        'job': job,
+        'telegram_messages': len(bot.messages),
+        'telegram_edits': bot.edits,
+        'last_message': bot.messages[-1] if bot.messages else '',
+        'started': started,
+        'setup_done': setup_done,
+        'finished': finished,
+        'first_like': first_like,
+    }
+
+
+def _percentile(ordered, q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_benchmark(args) -> dict:
+    """سناریوی خواسته شده را اجرا و نتایج را به صورت دیکشنری برمی‌گرداند."""
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix='liking-benchmark-')
+    main = _import_engine(workdir, args)
+
+    clock = VirtualClock()
+    executors = ExecutorGroup()
+    # درخواست‌های اینستاگرام روی pool های اختصاصی اکانت‌ها اجرا می‌شوند؛ آن‌ها هم باید شمرده شوند
+    main.EXECUTORS.executor_factory = executors.create
+    loop = VirtualTimeEventLoop(clock, executors)
+    asyncio.set_event_loop(loop)
+
+    dataset = FakeDataset(args)
+    clients = [FakeInstagramClient(i, dataset, clock, args, seed=args.seed + i) for i in range(args.accounts)]
+
+    if args.trace_memory:
+        tracemalloc.start()
+    cpu_started = time.process_time()
+    try:
+        run = loop.run_until_complete(_run_job(main, args, clock, clients, dataset))
+    finally:
+        cpu_seconds = time.process_time() - cpu_started
+        loop.close()
+        # درخواست‌های رها شده‌ای که هنوز روی ساعت مجازی خوابیده‌اند آزاد می‌شوند تا برنامه بسته شود
+        with clock.lock:
+            clock.now = float('inf')
+            clock.release_due()
+        executors.shutdown()
+        if args.keep_workdir:
+            print(f"پوشه داده‌های بنچمارک: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    peak_traced = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+
+    job = run['job']
+    virtual_seconds = run['finished'][0] - run['started'][0]
+    real_seconds = run['finished'][1] - run['started'][1]
+    lag = sorted(loop.virtual_selector.lag_samples)
+    first_like = run['first_like']
+    users = job['processed_items']
+
+    return {
+        'scenario': args.scenario,
+        'accounts': args.accounts,
+        'users_total': job['total_items'],
+        'users_processed': users,
+        'likes': job['likes_done'],
+        'already_liked': job['already_liked'],
+        'skipped_known': job['skipped_known'],
+        'filtered_cached': job['filtered_cached'],
+        'errors': job['errors'],
+        'throttled': job['throttled'],
+        'virtual_seconds': round(virtual_seconds, 3),
+        'real_seconds': round(real_seconds, 3),
+        'cpu_seconds': round(cpu_seconds, 3),
+        'users_per_hour': round(users / virtual_seconds * 3600, 1) if virtual_seconds else None,
+        'likes_per_hour': round(job['likes_done'] / virtual_seconds * 3600, 1) if virtual_seconds else None,
+        'real_ms_per_user': round(real_seconds / users * 1000, 3) if users else None,
+        'time_to_first_like_virtual': round(first_like[0] - run['started'][0], 3) if first_like else None,
+        'time_to_first_like_real': round(first_like[1] - run['started'][1], 4) if first_like else None,
+        'setup_real_seconds': round(run['setup_done'][1] - run['started'][1], 4),
+        'loop_lag_ms_p50': round(_percentile(lag, 0.5) * 1000, 3),
+        'loop_lag_ms_p99': round(_percentile(lag, 0.99) * 1000, 3),
+        'loop_lag_ms_max': round(lag[-1] * 1000, 3) if lag else 0.0,
+        'peak_executor_threads_busy': executors.peak_running,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'peak_traced_mb': round(peak_traced / 1024 / 1024, 2) if peak_traced is not None else None,
+        'telegram_messages': run['telegram_messages'],
+        'telegram_edits': run['telegram_edits'],
+    }
+
+
+def _print_report(result: dict) -> None:
+    rows = [
+        ("سناریو", f"{result['scenario']} ({result['accounts']} اکانت)"),
+        ("کاربران پردازش شده", f"{result['users_processed']} از {result['users_total']}"),
+        ("لایک‌ها / قبلاً لایک شده", f"{result['likes']} / {result['already_liked']}"),
+        ("رد شده (دفتر / کش)", f"{result['skipped_known']} / {result['filtered_cached']}"),
+        ("خطاها / محدودیت‌ها", f"{result['errors']} / {result['throttled']}"),
+        ("زمان مجازی", f"{result['virtual_seconds']} ثانیه"),
+        ("زمان واقعی / CPU", f"{result['real_seconds']} / {result['cpu_seconds']} ثانیه"),
+        ("توان عملیاتی (مجازی)", f"{result['users_per_hour']} کاربر و {result['likes_per_hour']} لایک در ساعت"),
+        ("هزینه واقعی هر کاربر", f"{result['real_ms_per_user']} ms"),
+        ("زمان تا اولین لایک", f"{result['time_to_first_like_virtual']} ثانیه مجازی "
+                               f"({result['time_to_first_like_real']} ثانیه واقعی)"),
+        ("تاخیر event loop", f"p50={result['loop_lag_ms_p50']} p99={result['loop_lag_ms_p99']} "
+                             f"max={result['loop_lag_ms_max']} ms"),
+        ("بیشترین thread مشغول", str(result['peak_executor_threads_busy'])),
+        ("بیشترین حافظه", f"RSS={result['peak_rss_mb']} MB"
+                          + (f"، tracemalloc={result['peak_traced_mb']} MB" if result['peak_traced_mb'] is not None else "")),
+        ("پیام‌ها / ویرایش‌های تلگرام", f"{result['telegram_messages']} / {result['telegram_edits']}"),
+    ]
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"{label.ljust(width)} : {value}")
+
+
+def _parse_range(text: str) -> list:
+    parts = [int(p) for p in text.split(',')]
+    if len(parts) != 2:
+        raise argparse.ArgumentTypeError("دو عدد با کاما جدا شده لازم است (مثال: 2,5)")
+    return [min(parts), max(parts)]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="بنچمارک آفلاین موتور لایک با کلاینت جعلی اینستاگرام و ساعت مجازی.")
+    parser.add_argument('--scenario', choices=('following', 'post_likers'), default='following')
+    parser.add_argument('--accounts', type=int, default=1, help="تعداد اکانت‌های استخر")
+    parser.add_argument('--users', type=int, default=1000, help="تعداد دنبال‌شوندگان (سناریو following)")
+    parser.add_argument('--posts', type=int, default=3, help="تعداد لینک پست‌ها (سناریو post_likers)")
+    parser.add_argument('--likers-per-post', type=int, default=500)
+    parser.add_argument('--likers-overlap', type=float, default=0.2, help="کسر لایک‌کنندگان مشترک پست‌های پشت سر هم")
+    parser.add_argument('--posts-per-user', type=int, default=1)
+    parser.add_argument('--medias-per-user', type=int, default=12, help="تعداد پست‌های هر کاربر ساختگی")
+    parser.add_argument('--private-rate', type=float, default=0.2)
+    parser.add_argument('--no-posts-rate', type=float, default=0.1)
+    parser.add_argument('--already-liked-rate', type=float, default=0.05)
+    parser.add_argument('--latency', type=float, default=0.4, help="میانه تاخیر هر درخواست (ثانیه مجازی)")
+    parser.add_argument('--latency-jitter', type=float, default=0.5, help="انحراف معیار log-normal تاخیر")
+    parser.add_argument('--error-rate', type=float, default=0.01, help="احتمال خطا در دریافت پست‌ها و لایک")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="احتمال پاسخ محدودیت سرعت")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="احتمال گیر کردن یک درخواست تا پایان مهلت")
+    parser.add_argument('--call-timeout', type=float, default=60, help="مقدار INSTAGRAM_CALL_TIMEOUT (ثانیه)")
+    parser.add_argument('--delay', type=_parse_range, default=[2, 5], help="محدوده فاصله درخواست‌های خواندن")
+    parser.add_argument('--sleep', type=_parse_range, default=[5, 15], help="محدوده فاصله لایک‌ها")
+    parser.add_argument('--prefetch', type=int, default=3, help="مقدار PREFETCH_USERS")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--trace-memory', action='store_true', help="اندازه‌گیری حافظه با tracemalloc (کندتر)")
+    parser.add_argument('--keep-workdir', action='store_true', help="حذف نکردن پوشه موقت (دفتر لایک، کش‌ها و نقطه بازیابی)")
+    parser.add_argument('--json', action='store_true', help="چاپ نتایج به صورت JSON")
+    parser.add_argument('--verbose', action='store_true', help="نمایش لاگ‌های موتور لایک")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    result = run_benchmark(arguments)
+    if arguments.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        _print_report(result)
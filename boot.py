@@ -0,0 +1,42 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BootTimer:
+    """
+    زمان مراحل راه‌اندازی ربات را ثبت می‌کند. مراحل پشت سر هم با `mark` (از پایان مرحله
+    قبل تا الان) و مراحل پس‌زمینه که همزمان با کار ربات اجرا می‌شوند با `record` ثبت می‌شوند.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+        self.background = []
+        self.ready_after = None
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def ready(self) -> None:
+        """لحظه‌ای که ربات شروع به پذیرش دستورات می‌کند."""
+        self.ready_after = time.perf_counter() - self.started
+
+    def record(self, phase: str, seconds: float, note: str = '') -> None:
+        self.background.append((phase, seconds, note))
+
+    def report(self) -> str:
+        lines = [f"  {phase}: {seconds:.2f}s" for phase, seconds in self.phases]
+        if self.ready_after is not None:
+            lines.append(f"  آماده پذیرش دستورات پس از: {self.ready_after:.2f}s")
+        for phase, seconds, note in self.background:
+            lines.append(f"  (پس‌زمینه) {phase}: {seconds:.2f}s" + (f" — {note}" if note else ''))
+        return "زمان‌بندی راه‌اندازی ربات:\n" + "\n".join(lines)
+
+
+# پیش از import های سنگین ساخته می‌شود تا زمان بارگذاری ماژول‌ها هم اندازه‌گیری شود
+BOOT_TIMER = BootTimer()
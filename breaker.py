@@ -0,0 +1,88 @@
+import asyncio
+
+# وضعیت‌های مدار: بسته (عادی)، باز (اکانت متوقف است) و نیمه‌باز (اولین درخواست پس از بازیابی)
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+def _now() -> float:
+    # ساعت event loop، مثل سطل‌های توکن (در بنچمارک با ساعت مجازی جایگزین می‌شود)
+    return asyncio.get_running_loop().time()
+
+
+class CircuitBreaker:
+    """
+    قطع‌کننده مدار یک اکانت برای خطاهای سطح اکانت (نیاز به ورود، challenge، بلاک عملیات).
+    با هر خطا مدار باز می‌شود و اکانت به مدت `cooldown` ثانیه (دو برابر شونده تا `max_cooldown`)
+    هیچ درخواستی نمی‌فرستد. پس از مهلت، مدار نیمه‌باز می‌شود و اولین درخواست موفق آن را
+    می‌بندد؛ اگر مدار بیش از `max_trips` بار پشت سر هم باز شود اکانت دیگر بازیابی نمی‌شود.
+    """
+
+    def __init__(self, cooldown: float, max_cooldown: float, max_trips: int):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_trips = max_trips
+        self.state = CLOSED
+        self.trips = 0
+        self.open_until = 0.0
+        # در حالت باز پاک می‌شود؛ درخواست‌های اکانت پیش از ارسال منتظر آن می‌مانند
+        self._ready = asyncio.Event()
+        self._ready.set()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    @property
+    def exhausted(self) -> bool:
+        """مدار بیش از `max_trips` بار پشت سر هم باز شده است و اکانت دیگر بازیابی نمی‌شود."""
+        return self.trips > self.max_trips
+
+    def trip(self):
+        """
+        مدار را باز می‌کند و مدت توقف (ثانیه) را برمی‌گرداند؛ اگر دفعات باز شدن پشت سر هم
+        از `max_trips` گذشته باشد None برمی‌گرداند.
+        """
+        self.trips += 1
+        self.state = OPEN
+        self._ready.clear()
+        if self.exhausted:
+            return None
+        pause = min(self.cooldown * 2 ** (self.trips - 1), self.max_cooldown)
+        self.open_until = _now() + pause
+        return pause
+
+    def allow_retry(self) -> None:
+        """به اکانتی که بازیابی نشده بود (در فرآیند جدید) یک فرصت دیگر برای ورود دوباره می‌دهد."""
+        if self.exhausted:
+            self.trips = self.max_trips
+
+    async def wait_ready(self) -> None:
+        """تا زمانی که مدار باز است صبر می‌کند."""
+        await self._ready.wait()
+
+    def half_open(self) -> None:
+        """اکانت بازیابی شده است؛ درخواست بعدی تعیین می‌کند که مدار بسته شود یا نه."""
+        self.state = HALF_OPEN
+        self._ready.set()
+
+    def on_success(self) -> None:
+        if self.state != CLOSED:
+            self.state = CLOSED
+            self.trips = 0
+
+
+class CircuitBreakerRegistry:
+    """قطع‌کننده‌ها را به ازای اکانت نگه می‌دارد تا اکانت متوقف شده در فرآیند بعدی هم متوقف بماند."""
+
+    def __init__(self, cooldown: float, max_cooldown: float, max_trips: int):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_trips = max_trips
+        self._breakers = {}
+
+    def get(self, account: str) -> CircuitBreaker:
+        breaker = self._breakers.get(account)
+        if breaker is None:
+            breaker = CircuitBreaker(self.cooldown, self.max_cooldown, self.max_trips)
+            self._breakers[account] = breaker
+        return breaker
@@ -0,0 +1,100 @@
+import collections
+import json
+import sqlite3
+import threading
+import time
+
+# هر چند نوشتن یک بار، ردیف‌های منقضی و اضافی از دیسک پاک می‌شوند
+PRUNE_EVERY_WRITES = 500
+
+
+class TTLCache:
+    """
+    کش کلید-مقدار با زمان انقضا، در حافظه و پشتیبانی شده روی دیسک (SQLite).
+    حافظه با سیاست LRU به `max_entries` و دیسک به `max_disk_entries` محدود می‌شود؛
+    در صورت نبود کلید در حافظه، مقدار از دیسک خوانده و دوباره در حافظه نگه داشته می‌شود.
+    مقادیر باید قابل تبدیل به JSON باشند.
+    """
+
+    def __init__(self, path: str, table: str, ttl: float, max_entries: int = 10000,
+                 max_disk_entries: int = 1000000):
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = collections.OrderedDict()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires_at)")
+            self._conn.commit()
+
+    def _remember(self, key: str, expires_at: float, value) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key, default=None):
+        key = str(key)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+                return default
+
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return default
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            return value
+
+    def set(self, key, value, ttl: float = None) -> None:
+        key = str(key)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY_WRITES == 0:
+                self._prune()
+            self._conn.commit()
+
+    def update(self, key, **fields) -> dict:
+        """فیلدهای داده شده را با مقدار فعلی (دیکشنری) ادغام و ذخیره می‌کند."""
+        value = dict(self.get(key) or {})
+        value.update({k: v for k, v in fields.items() if v is not None})
+        self.set(key, value)
+        return value
+
+    def _prune(self) -> None:
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if count > self.max_disk_entries:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY expires_at LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
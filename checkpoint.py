@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import time
+
+from compact import CompactUser, CompactUserBuffer
+
+META_FILE = 'meta.json'
+USERS_FILE = 'users.jsonl'
+PROGRESS_FILE = 'progress.jsonl'
+SOURCE_COMPLETE_FILE = 'source_complete'
+# خطوط پیشرفت پس از این تعداد کاربر یا این مدت (ثانیه) یکجا روی دیسک نوشته (fsync) می‌شوند
+SYNC_EVERY = 100
+SYNC_INTERVAL = 5
+
+
+class JobCheckpoint:
+    """
+    نقطه بازیابی یک فرآیند لایک روی دیسک.
+    کاربران با رسیدن هر صفحه از منبع به انتهای لیست اضافه می‌شوند و بعد از پردازش هر کاربر فقط یک خط کوتاه
+    (شناسه کاربر و شمارنده‌ها) به انتهای فایل پیشرفت اضافه می‌شود، بنابراین
+    بعد از قطع شدن ربات می‌توان فرآیند را از همان نقطه ادامه داد. خطوط پیشرفت دسته‌ای روی
+    دیسک نوشته می‌شوند؛ پس از قطع ناگهانی، حداکثر آخرین دسته کاربران دوباره بررسی می‌شوند
+    (که دفتر لایک آن‌ها را بدون لایک دوباره رد می‌کند).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.job_id = os.path.basename(directory)
+        self._progress_file = None
+        self._unsynced = 0
+        self._synced_at = 0.0
+
+    @classmethod
+    def create(cls, base_dir: str, chat_id: int, mode: str, config: dict, users=()) -> 'JobCheckpoint':
+        """یک نقطه بازیابی جدید برای فرآیند می‌سازد و کاربران اولیه (در صورت وجود) را ذخیره می‌کند."""
+        job_id = f"{chat_id}-{int(time.time() * 1000)}"
+        checkpoint = cls(os.path.join(base_dir, job_id))
+        os.makedirs(checkpoint.directory, exist_ok=True)
+        meta = {'chat_id': chat_id, 'mode': mode, 'config': config, 'created_at': time.time()}
+        with open(os.path.join(checkpoint.directory, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        checkpoint.add_users(users)
+        return checkpoint
+
+    def add_users(self, users) -> None:
+        """کاربران را (فقط فیلدهای مورد نیاز حلقه لایک) به انتهای لیست کاربران اضافه می‌کند."""
+        with open(os.path.join(self.directory, USERS_FILE), 'a', encoding='utf-8') as f:
+            for user in users:
+                f.write(json.dumps({'pk': str(user.pk), 'username': user.username,
+                                    'is_private': bool(getattr(user, 'is_private', False))},
+                                   ensure_ascii=False) + '\n')
+
+    def mark_source_complete(self) -> None:
+        """ثبت می‌کند که منبع کاربران تا انتها خوانده شده و لیست کاربران کامل است."""
+        open(os.path.join(self.directory, SOURCE_COMPLETE_FILE), 'w').close()
+
+    def record_processed(self, user_pk, counters: dict) -> None:
+        """پردازش یک کاربر را به همراه آخرین مقدار شمارنده‌ها ثبت می‌کند."""
+        if self._progress_file is None:
+            self._progress_file = open(os.path.join(self.directory, PROGRESS_FILE), 'a', encoding='utf-8')
+        self._progress_file.write(json.dumps({'pk': str(user_pk), 'c': counters}) + '\n')
+        self._unsynced += 1
+        if self._unsynced >= SYNC_EVERY or time.monotonic() - self._synced_at >= SYNC_INTERVAL:
+            self._sync()
+
+    def _sync(self) -> None:
+        self._progress_file.flush()
+        os.fsync(self._progress_file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def load(self):
+        """
+        وضعیت ذخیره شده را می‌خواند و سه‌تایی (meta, remaining_users, counters) را برمی‌گرداند.
+        remaining_users یک CompactUserBuffer از کاربرانی است که هنوز پردازش نشده‌اند.
+        meta علاوه بر تنظیمات شامل total_items، source_complete و known_pks (شناسه تمام
+        کاربران ذخیره شده) است تا در صورت ناقص بودن منبع بتوان ادامه آن را دریافت کرد.
+        """
+        with open(os.path.join(self.directory, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+
+        processed = set()
+        counters = {}
+        progress_path = os.path.join(self.directory, PROGRESS_FILE)
+        if os.path.exists(progress_path):
+            with open(progress_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # خط آخر ممکن است هنگام قطع شدن ناقص نوشته شده باشد
+                        continue
+                    processed.add(int(record['pk']))
+                    counters = record['c']
+
+        remaining_users = CompactUserBuffer()
+        known_pks = set()
+        total = 0
+        users_path = os.path.join(self.directory, USERS_FILE)
+        if os.path.exists(users_path):
+            with open(users_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        user = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    total += 1
+                    pk = int(user['pk'])
+                    known_pks.add(pk)
+                    if pk not in processed:
+                        remaining_users.append(CompactUser(pk, user['username'], user['is_private']))
+        meta['total_items'] = total
+        meta['known_pks'] = known_pks
+        meta['source_complete'] = os.path.exists(os.path.join(self.directory, SOURCE_COMPLETE_FILE))
+        return meta, remaining_users, counters
+
+    def close(self) -> None:
+        if self._progress_file is not None:
+            self._sync()
+            self._progress_file.close()
+            self._progress_file = None
+
+    def finish(self) -> None:
+        """فرآیند به پایان رسیده است؛ نقطه بازیابی حذف می‌شود."""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @classmethod
+    def find_unfinished(cls, base_dir: str, chat_id: int = None) -> list:
+        """نقاط بازیابی فرآیندهای ناتمام (در صورت نیاز فقط برای یک چت) را برمی‌گرداند."""
+        if not os.path.isdir(base_dir):
+            return []
+        checkpoints = []
+        for name in sorted(os.listdir(base_dir)):
+            directory = os.path.join(base_dir, name)
+            if not os.path.exists(os.path.join(directory, META_FILE)):
+                continue
+            if chat_id is not None and not name.startswith(f"{chat_id}-"):
+                continue
+            checkpoints.append(cls(directory))
+        return checkpoints
@@ -0,0 +1,135 @@
+import array
+
+
+class CompactUser:
+    """
+    نمایش سبک یک کاربر در صف فرآیند لایک؛ فقط فیلدهایی که حلقه لایک لازم دارد
+    (شناسه عددی، نام کاربری و خصوصی بودن) به جای کل شیء UserShort نگه داشته می‌شود.
+    """
+
+    __slots__ = ('pk', 'username', 'is_private')
+
+    def __init__(self, pk, username: str, is_private: bool = False):
+        self.pk = int(pk)
+        self.username = username
+        self.is_private = bool(is_private)
+
+    @classmethod
+    def from_user(cls, user) -> 'CompactUser':
+        return cls(user.pk, user.username, getattr(user, 'is_private', False))
+
+    def __repr__(self) -> str:
+        return f"CompactUser(pk={self.pk}, username={self.username!r}, is_private={self.is_private})"
+
+
+class CompactUserBuffer:
+    """
+    صف FIFO آرایه‌ای برای تعداد زیادی کاربر.
+    شناسه‌ها در array و پرچم خصوصی بودن در bytearray ذخیره می‌شوند و شیء
+    CompactUser فقط هنگام برداشتن از صف ساخته می‌شود.
+    """
+
+    # بعد از برداشتن این تعداد کاربر از ابتدای صف، فضای آزاد شده بازپس گرفته می‌شود
+    COMPACT_THRESHOLD = 1024
+
+    def __init__(self, users=()):
+        self._pks = array.array('q')
+        self._private = bytearray()
+        self._usernames = []
+        self._head = 0
+        for user in users:
+            self.append(user)
+
+    def __len__(self) -> int:
+        return len(self._pks) - self._head
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def append(self, user) -> None:
+        self._pks.append(int(user.pk))
+        self._private.append(1 if getattr(user, 'is_private', False) else 0)
+        self._usernames.append(user.username)
+
+    def _user_at(self, index: int) -> CompactUser:
+        return CompactUser(self._pks[index], self._usernames[index], self._private[index])
+
+    def popleft(self) -> CompactUser:
+        if not self:
+            raise IndexError("pop from an empty CompactUserBuffer")
+        user = self._user_at(self._head)
+        self._usernames[self._head] = None
+        self._head += 1
+        if self._head >= self.COMPACT_THRESHOLD and self._head * 2 >= len(self._pks):
+            del self._pks[:self._head]
+            del self._private[:self._head]
+            del self._usernames[:self._head]
+            self._head = 0
+        return user
+
+    def __iter__(self):
+        for index in range(self._head, len(self._pks)):
+            yield self._user_at(index)
+
+
+class CompactTimestampIndex:
+    """
+    نگاشت شناسه عددی کاربر به یک زمان (ثانیه، عدد صحیح بدون علامت ۳۲ بیتی) با جدول
+    درهم‌سازی آدرس‌دهی باز روی دو array. هر ورودی (با ضریب بار حداکثر نصف) حدود ۲۴ بایت
+    حافظه می‌گیرد، در برابر چند صد بایت برای dict پایتون، و برای میلیون‌ها کاربر مناسب است.
+    شناسه صفر به عنوان خانه خالی استفاده می‌شود و قابل ذخیره نیست.
+    """
+
+    INITIAL_BITS = 10
+
+    def __init__(self):
+        self._count = 0
+        self._allocate(self.INITIAL_BITS)
+
+    def _allocate(self, bits: int) -> None:
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._keys = array.array('q', bytes(8 << bits))
+        self._values = array.array('I', bytes(4 << bits))
+
+    def _slot(self, pk: int) -> int:
+        # درهم‌سازی فیبوناچی تا شناسه‌های نزدیک به هم در جدول پخش شوند
+        slot = ((pk * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self._bits)
+        keys = self._keys
+        while keys[slot] != 0 and keys[slot] != pk:
+            slot = (slot + 1) & self._mask
+        return slot
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, pk, default=None):
+        pk = int(pk)
+        slot = self._slot(pk)
+        return self._values[slot] if self._keys[slot] == pk else default
+
+    def set(self, pk, value: int) -> None:
+        pk = int(pk)
+        slot = self._slot(pk)
+        if self._keys[slot] != pk:
+            if (self._count + 1) * 2 > len(self._keys):
+                self._grow()
+                slot = self._slot(pk)
+            self._keys[slot] = pk
+            self._count += 1
+        self._values[slot] = int(value)
+
+    def _grow(self) -> None:
+        old_keys, old_values = self._keys, self._values
+        self._allocate(self._bits + 1)
+        keys, values = self._keys, self._values
+        for pk, value in zip(old_keys, old_values):
+            if pk != 0:
+                slot = self._slot(pk)
+                keys[slot] = pk
+                values[slot] = value
+
+    def items(self):
+        for pk, value in zip(self._keys, self._values):
+            if pk != 0:
+                yield pk, value
@@ -0,0 +1,132 @@
+"""
+گزارش آفلاین از گزارش رویدادهای ربات (data/events).
+
+رویدادهای فایل فعلی و فایل‌های فشرده چرخانده شده را می‌خواند و برای هر روز و/یا
+اکانت تعداد لایک‌ها، دریافت‌ها، رد شدن‌ها، خطاها و محدودیت‌های سرعت، نرخ لایک در
+ساعت و تاخیر درخواست‌ها را گزارش می‌کند.
+
+مثال:
+    python event_report.py
+    python event_report.py --by account --since 2024-05-01 --errors
+    python event_report.py --by day --json
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import sys
+
+from events import iter_events
+
+COUNTED_EVENTS = ('like', 'fetch', 'skip', 'error', 'throttle')
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Group:
+    """آمار تجمیعی رویدادهای یک روز/اکانت."""
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.skips = collections.Counter()
+        self.errors = collections.Counter()
+        self.latency = collections.defaultdict(list)
+        self.first_ts = None
+        self.last_ts = None
+
+    def add(self, record: dict) -> None:
+        event = record['event']
+        ts = record['ts']
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self.counts[event] += 1
+        if event == 'skip':
+            self.skips[record.get('reason', '?')] += 1
+        elif event in ('error', 'throttle'):
+            self.errors[record.get('error', '?')] += 1
+        if 'latency' in record:
+            self.latency[event].append(record['latency'])
+
+    def summary(self) -> dict:
+        active_hours = max((self.last_ts - self.first_ts) / 3600, 1 / 60) if self.first_ts is not None else 0
+        result = {event: self.counts[event] for event in COUNTED_EVENTS}
+        result['likes_per_hour'] = round(self.counts['like'] / active_hours, 1) if active_hours else 0.0
+        for event in ('like', 'fetch'):
+            values = self.latency[event]
+            result[f'{event}_latency_avg'] = round(sum(values) / len(values), 3) if values else 0.0
+            result[f'{event}_latency_p95'] = round(_percentile(values, 0.95), 3)
+        result['skip_reasons'] = dict(self.skips)
+        result['error_types'] = dict(self.errors)
+        return result
+
+
+def aggregate(records, by: str, since: str = None, until: str = None) -> dict:
+    """رویدادها را بر اساس `by` ('day'، 'account' یا 'day-account') گروه‌بندی می‌کند."""
+    groups = collections.defaultdict(Group)
+    day_of = {}
+    for record in records:
+        if record.get('event') not in COUNTED_EVENTS:
+            continue
+        # تبدیل زمان به روز برای هر ساعت فقط یک بار انجام می‌شود
+        hour = int(record['ts'] // 3600)
+        day = day_of.get(hour)
+        if day is None:
+            day = day_of[hour] = datetime.datetime.fromtimestamp(hour * 3600).strftime('%Y-%m-%d')
+        if (since and day < since) or (until and day > until):
+            continue
+        account = record.get('username') or record.get('account') or '-'
+        key = {'day': (day,), 'account': (account,), 'day-account': (day, account)}[by]
+        groups[key].add(record)
+    return {key: group.summary() for key, group in sorted(groups.items())}
+
+
+def print_table(report: dict, by: str, show_errors: bool) -> None:
+    key_titles = {'day': ['روز'], 'account': ['اکانت'], 'day-account': ['روز', 'اکانت']}[by]
+    headers = key_titles + ['لایک', 'لایک/ساعت', 'دریافت', 'رد شده', 'خطا', 'محدودیت', 'تاخیر لایک', 'تاخیر دریافت']
+    rows = []
+    for key, s in report.items():
+        rows.append(list(key) + [
+            s['like'], s['likes_per_hour'], s['fetch'], s['skip'], s['error'], s['throttle'],
+            f"{s['like_latency_avg']:.2f}/{s['like_latency_p95']:.2f}s",
+            f"{s['fetch_latency_avg']:.2f}/{s['fetch_latency_p95']:.2f}s",
+        ])
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print('  '.join(str(cell).ljust(width) for cell, width in zip(row, widths)))
+    if show_errors:
+        print()
+        for key, s in report.items():
+            if s['error_types']:
+                errors = ', '.join(f"{name}: {count}" for name, count in
+                                   sorted(s['error_types'].items(), key=lambda item: -item[1]))
+                print(f"{' / '.join(key)}: {errors}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="گزارش روزانه و به ازای اکانت از گزارش رویدادهای ربات.")
+    parser.add_argument('--dir', default=os.path.join('data', 'events'), help="پوشه گزارش رویدادها")
+    parser.add_argument('--by', choices=('day', 'account', 'day-account'), default='day-account')
+    parser.add_argument('--since', help="از این روز (YYYY-MM-DD)")
+    parser.add_argument('--until', help="تا این روز (YYYY-MM-DD)")
+    parser.add_argument('--errors', action='store_true', help="نمایش انواع خطاها و محدودیت‌ها")
+    parser.add_argument('--json', action='store_true', help="خروجی JSON")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dir):
+        sys.exit(f"پوشه {args.dir} پیدا نشد.")
+    report = aggregate(iter_events(args.dir), args.by, args.since, args.until)
+    if args.json:
+        print(json.dumps([{'key': list(key), **summary} for key, summary in report.items()],
+                         ensure_ascii=False, indent=2))
+    else:
+        print_table(report, args.by, args.errors)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import asyncio
+import glob
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'events.jsonl'
+# حداکثر تعداد رویدادهای منتظر نوشتن؛ اگر دیسک عقب بماند قدیمی‌ترین‌ها کنار گذاشته می‌شوند
+MAX_PENDING = 100_000
+
+
+class EventLog:
+    """
+    ثبت غیرمسدودکننده رویدادهای ساخت‌یافته (لایک، رد شدن، خطا، ...) فرآیندهای لایک.
+    `emit` فقط رویداد را به بافر حافظه اضافه می‌کند؛ یک وظیفه پس‌زمینه هر `flush_interval`
+    ثانیه (یا با پر شدن `batch_size`) رویدادها را به صورت دسته‌ای و در یک thread جداگانه
+    به انتهای فایل JSON Lines اضافه می‌کند. فایلی که از `max_bytes` بزرگ‌تر شود چرخانده و
+    با gzip فشرده می‌شود و فقط `keep_files` فایل چرخانده شده آخر نگه داشته می‌شوند.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, batch_size: int = 500,
+                 flush_interval: float = 1.0, keep_files: int = 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.keep_files = keep_files
+        self.dropped = 0
+        self._pending = []
+        self._file = None
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+        self._closing = False
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def emit(self, event: str, **fields) -> None:
+        """یک رویداد را بدون هیچ I/O ثبت می‌کند؛ باید از داخل event loop صدا زده شود."""
+        if not self.enabled:
+            return
+        fields['ts'] = time.time()
+        fields['event'] = event
+        self._pending.append(fields)
+        excess = len(self._pending) - MAX_PENDING
+        if excess > 0:
+            del self._pending[:excess]
+            self.dropped += excess
+        self._ensure_writer()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        # وظیفه نویسنده پس از اولین دوره بدون رویداد تمام می‌شود و `emit` بعدی آن را دوباره می‌سازد
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._pending:
+                break
+            await self.flush()
+
+    async def flush(self) -> None:
+        """رویدادهای منتظر را در یک thread جداگانه روی دیسک می‌نویسد."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            logger.warning(f"نوشتن {len(batch)} رویداد در گزارش رویدادها ناموفق بود: {e}")
+
+    def _write(self, batch: list) -> None:
+        if self._file is None:
+            self._file = open(os.path.join(self.directory, CURRENT_FILE), 'a', encoding='utf-8')
+        self._file.write(''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                 for record in batch))
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        current = os.path.join(self.directory, CURRENT_FILE)
+        rotated = os.path.join(self.directory, f"events-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+        os.replace(current, rotated)
+        with open(rotated, 'rb') as src, gzip.open(rotated + '.gz', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+        for old in sorted(glob.glob(os.path.join(self.directory, 'events-*.jsonl.gz')))[:-self.keep_files]:
+            os.remove(old)
+
+    async def close(self) -> None:
+        """وظیفه نویسنده را متوقف و رویدادهای باقیمانده را روی دیسک می‌نویسد."""
+        if self._task is not None and not self._task.done() and self._loop is asyncio.get_running_loop():
+            # نوشتن در حال انجام نباید نیمه‌کاره رها شود
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+        self._task = None
+        self._closing = False
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def iter_events(directory: str):
+    """تمام رویدادهای ثبت شده (فایل‌های فشرده قدیمی و سپس فایل فعلی) را به ترتیب زمان برمی‌گرداند."""
+    paths = sorted(glob.glob(os.path.join(directory, 'events-*.jsonl.gz')))
+    current = os.path.join(directory, CURRENT_FILE)
+    if os.path.exists(current):
+        paths.append(current)
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # خط آخر ممکن است هنگام قطع شدن ناقص نوشته شده باشد
+                    continue
@@ -0,0 +1,188 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# درخواست‌هایی که تکرار آن‌ها بعد از پایان مهلت امن نیست
+NO_RETRY_ENDPOINTS = frozenset({'login'})
+
+
+class InstagramCallTimeout(TimeoutError):
+    """یک درخواست اینستاگرام (حتی پس از تلاش دوباره) در مهلت تعیین شده پاسخ نداد."""
+
+
+class AccountExecutor:
+    """
+    thread pool محدود و اختصاصی یک اکانت برای درخواست‌های مسدودکننده instagrapi.
+    تعداد کارهای در صف، در حال اجرا و رها شده (بعد از پایان مهلت) شمرده می‌شود. اگر
+    تمام thread ها با درخواست‌های گیر کرده اشغال شوند، pool جدیدی جایگزین می‌شود
+    تا درخواست‌های بعدی پشت آن‌ها نمانند.
+    """
+
+    def __init__(self, name: str, max_workers: int, executor_factory=None):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor_factory = executor_factory or concurrent.futures.ThreadPoolExecutor
+        self.queued = 0
+        self.running = 0
+        self.abandoned = 0
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return self._executor_factory(max_workers=self.max_workers, thread_name_prefix=f"instagram-{self.name}")
+
+    def submit(self, func, *args, **kwargs):
+        """کار را به pool می‌سپارد و (future, زمان شروع اجرا) را برمی‌گرداند."""
+        started = {}
+
+        def run():
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+            started['at'] = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        def forget_cancelled(future):
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        with self._lock:
+            self.queued += 1
+        try:
+            future = self._pool.submit(run)
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+            raise
+        future.add_done_callback(forget_cancelled)
+        return future, started
+
+    def abandon(self, future) -> None:
+        """درخواستی که مهلتش تمام شده رها می‌شود؛ thread آن تا پایان درخواست اشغال می‌ماند."""
+        if future.cancel():
+            return
+        with self._lock:
+            pool = self._pool
+            self.abandoned += 1
+            clogged = self.abandoned >= self.max_workers
+            if clogged:
+                self._pool = self._new_pool()
+                self.abandoned = 0
+
+        if clogged:
+            logger.warning(f"تمام thread های اکانت {self.name} با درخواست‌های گیر کرده اشغال شدند؛ pool جدید ساخته شد.")
+            pool.shutdown(wait=False)
+            return
+
+        def release(_future):
+            with self._lock:
+                # درخواست‌های رها شده pool قبلی دیگر در شمارش pool فعلی نیستند
+                if self._pool is pool:
+                    self.abandoned -= 1
+
+        future.add_done_callback(release)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ExecutorRegistry:
+    """
+    pool های اختصاصی هر اکانت و اجرای درخواست‌های instagrapi روی آن‌ها با مهلت و
+    تلاش دوباره. تعداد، کلاس خطا، تاخیر و مدت انتظار در صف هر درخواست و وضعیت
+    اشغال هر pool در metrics ثبت می‌شود.
+    """
+
+    def __init__(self, max_workers: int = 4, timeout: float = 60, retries: int = 1):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        # در بنچمارک با thread pool قابل شمارش جایگزین می‌شود
+        self.executor_factory = None
+        self._executors = {}
+
+    def configure(self, max_workers: int, timeout: float, retries: int) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+
+    @staticmethod
+    def account_of(client) -> str:
+        return str(getattr(client, 'user_id', None) or 'anonymous')
+
+    def for_account(self, account: str) -> AccountExecutor:
+        executor = self._executors.get(account)
+        if executor is None:
+            executor = AccountExecutor(account, self.max_workers, self.executor_factory)
+            self._executors[account] = executor
+        return executor
+
+    def saturation(self) -> dict:
+        """وضعیت هر pool: {account: (queued, running, abandoned)}."""
+        return {account: (e.queued, e.running, e.abandoned) for account, e in self._executors.items()}
+
+    async def call(self, func, *args, **kwargs):
+        """
+        متد `func` از یک کلاینت instagrapi را روی pool اکانت همان کلاینت اجرا می‌کند.
+        اگر پاسخ در مهلت نرسد درخواست رها و (برای درخواست‌های قابل تکرار) دوباره ارسال
+        می‌شود؛ در نهایت InstagramCallTimeout برگردانده می‌شود.
+        """
+        endpoint = func.__name__
+        executor = self.for_account(self.account_of(func.__self__))
+        attempts = 1 if endpoint in NO_RETRY_ENDPOINTS else 1 + self.retries
+
+        for attempt in range(1, attempts + 1):
+            submitted_at = time.perf_counter()
+            future, started = executor.submit(func, *args, **kwargs)
+            outcome = 'ok'
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout or None)
+            except asyncio.TimeoutError:
+                outcome = 'timeout'
+                executor.abandon(future)
+                logger.warning(f"درخواست {endpoint} اکانت {executor.name} پس از {self.timeout} ثانیه رها شد "
+                               f"(تلاش {attempt} از {attempts}).")
+            except asyncio.CancelledError:
+                outcome = 'cancelled'
+                executor.abandon(future)
+                raise
+            except Exception as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                finished_at = time.perf_counter()
+                started_at = started.get('at', finished_at)
+                REGISTRY.inc('instagram_calls_total', endpoint=endpoint, outcome=outcome)
+                REGISTRY.observe('instagram_call_seconds', finished_at - started_at, endpoint=endpoint)
+                REGISTRY.observe('instagram_call_queue_seconds', started_at - submitted_at, endpoint=endpoint)
+        raise InstagramCallTimeout(f"{endpoint} did not respond within {self.timeout}s ({attempts} attempts)")
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown()
+
+
+EXECUTORS = ExecutorRegistry()
+
+REGISTRY.describe('instagram_executor_queued', "Instagram calls waiting for a thread of the account's executor")
+REGISTRY.describe('instagram_executor_running', "Instagram calls running on the account's executor")
+REGISTRY.describe('instagram_executor_abandoned', "Timed-out Instagram calls still holding a thread")
+REGISTRY.gauge('instagram_executor_queued', lambda: {(('account', a),): s[0] for a, s in EXECUTORS.saturation().items()})
+REGISTRY.gauge('instagram_executor_running', lambda: {(('account', a),): s[1] for a, s in EXECUTORS.saturation().items()})
+REGISTRY.gauge('instagram_executor_abandoned', lambda: {(('account', a),): s[2] for a, s in EXECUTORS.saturation().items()})
+
+
+async def call_instagram(func, *args, **kwargs):
+    """متد یک کلاینت instagrapi را روی pool اختصاصی اکانت آن (با مهلت و تلاش دوباره) اجرا می‌کند."""
+    return await EXECUTORS.call(func, *args, **kwargs)
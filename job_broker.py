@@ -0,0 +1,153 @@
+import json
+import sqlite3
+import threading
+import time
+
+# وضعیت‌هایی که در آن‌ها فرآیند هنوز در اختیار workerهاست
+ACTIVE_STATES = ('queued', 'running')
+
+
+class DurableJobQueue:
+    """
+    صف ماندگار فرآیندهای لایک بین ربات و پروسه‌های worker (SQLite).
+    ربات فرآیند را با شناسه نقطه بازیابی آن ثبت می‌کند؛ یک worker آن را برمی‌دارد و در
+    طول اجرا پیشرفت را (برای /status) منتشر و دستورهای مکث/ادامه/لغو را دریافت می‌کند.
+    فرآیندی که worker آن بیش از `stale_after` ثانیه پیشرفتی منتشر نکرده باشد (مثلاً پروسه
+    از کار افتاده باشد) دوباره قابل برداشتن است و از نقطه بازیابی ادامه پیدا می‌کند.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id            TEXT PRIMARY KEY,
+                    chat_id       INTEGER NOT NULL,
+                    user_id       INTEGER NOT NULL,
+                    session_file  TEXT NOT NULL,
+                    pool_sessions TEXT NOT NULL,
+                    mode          TEXT NOT NULL,
+                    state         TEXT NOT NULL,
+                    worker        TEXT,
+                    control       TEXT,
+                    progress      TEXT,
+                    created_at    REAL NOT NULL,
+                    heartbeat_at  REAL
+                )
+                """
+            )
+
+    @staticmethod
+    def _as_dict(row) -> dict:
+        if row is None:
+            return None
+        job = dict(row)
+        job['pool_sessions'] = json.loads(job['pool_sessions'])
+        job['progress'] = json.loads(job['progress']) if job['progress'] else None
+        return job
+
+    def submit(self, job_id: str, chat_id: int, user_id: int, session_file: str, pool_sessions: list,
+               mode: str) -> None:
+        """فرآیندی را که نقطه بازیابی آن ساخته شده برای اجرا توسط workerها ثبت می‌کند."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, chat_id, user_id, session_file, pool_sessions, mode, state, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, chat_id, user_id, session_file, json.dumps(pool_sessions), mode, time.time())
+            )
+
+    def claim(self, worker: str, stale_after: float):
+        """
+        قدیمی‌ترین فرآیند آماده را برای `worker` برمی‌دارد. فرآیندی که اکانت اصلی آن در
+        حال حاضر در فرآیند دیگری اجرا می‌شود برداشته نمی‌شود تا سطل‌های توکن دو پروسه
+        همزمان برای یک اکانت درخواست نفرستند.
+        """
+        now = time.time()
+        oldest_alive = now - stale_after
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE (state = 'queued' OR (state = 'running' AND heartbeat_at < ?))
+                      AND session_file NOT IN (
+                          SELECT session_file FROM jobs WHERE state = 'running' AND heartbeat_at >= ?)
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (oldest_alive, oldest_alive)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = 'running', worker = ?, heartbeat_at = ? WHERE id = ?",
+                        (worker, now, row['id'])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = self._as_dict(row)
+        if job is not None:
+            job.update(state='running', worker=worker, heartbeat_at=now)
+        return job
+
+    def heartbeat(self, job_id: str, worker: str, progress: dict):
+        """
+        پیشرفت فرآیند را منتشر می‌کند و آخرین دستور ثبت شده برای آن ('pause'، 'resume'
+        یا 'cancel') را (در صورت وجود) برمی‌گرداند و پاک می‌کند.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT control FROM jobs WHERE id = ? AND worker = ?",
+                                         (job_id, worker)).fetchone()
+                self._conn.execute(
+                    "UPDATE jobs SET progress = ?, heartbeat_at = ?, control = NULL WHERE id = ? AND worker = ?",
+                    (json.dumps(progress, ensure_ascii=False), time.time(), job_id, worker)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row['control'] if row is not None else None
+
+    def set_control(self, job_id: str, control: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET control = ? WHERE id = ?", (control, job_id))
+
+    def requeue(self, job_id: str) -> None:
+        """فرآیندی که worker آن در حال خاموش شدن است به صف برمی‌گردد تا worker دیگری ادامه دهد."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'queued', worker = NULL, heartbeat_at = NULL WHERE id = ? AND state = 'running'",
+                (job_id,)
+            )
+
+    def finish(self, job_id: str, progress: dict = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'finished', heartbeat_at = ?, progress = COALESCE(?, progress) WHERE id = ?",
+                (time.time(), json.dumps(progress, ensure_ascii=False) if progress else None, job_id)
+            )
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._as_dict(row)
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def active(self) -> list:
+        """فرآیندهای منتظر یا در حال اجرا توسط workerها."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE state IN ({','.join('?' * len(ACTIVE_STATES))}) ORDER BY created_at",
+                ACTIVE_STATES
+            ).fetchall()
+        return [self._as_dict(row) for row in rows]
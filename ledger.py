@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+
+# حداکثر تعداد کاربرانی که سابقه آن‌ها در یک دستور خوانده می‌شود
+HISTORY_BATCH_SIZE = 400
+
+
+class LikeLedger:
+    """
+    دفتر ثبت لایک‌ها روی دیسک (SQLite).
+    هر لایک موفق و هر پستی که از قبل لایک شده بود به ازای هر اکانت ثبت می‌شود
+    تا اجراهای بعدی بدون ارسال درخواست به اینستاگرام از آن‌ها عبور کنند.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS liked_media (
+                    account    TEXT NOT NULL,
+                    media_pk   TEXT NOT NULL,
+                    user_pk    TEXT,
+                    status     TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (account, media_pk)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS covered_users (
+                    account         TEXT NOT NULL,
+                    user_pk         TEXT NOT NULL,
+                    posts_requested INTEGER NOT NULL,
+                    checked_at      REAL NOT NULL,
+                    PRIMARY KEY (account, user_pk)
+                ) WITHOUT ROWID;
+
+                CREATE INDEX IF NOT EXISTS liked_media_user ON liked_media (user_pk, account);
+                """
+            )
+            self._conn.commit()
+
+    def known_media(self, account: str, media_pks: list) -> set:
+        """از میان `media_pks`، پست‌هایی را که قبلاً برای این اکانت ثبت شده‌اند برمی‌گرداند."""
+        media_pks = [str(pk) for pk in media_pks]
+        known = set()
+        for i in range(0, len(media_pks), HISTORY_BATCH_SIZE):
+            batch = media_pks[i:i + HISTORY_BATCH_SIZE]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT media_pk FROM liked_media WHERE account = ? AND media_pk IN ({','.join('?' * len(batch))})",
+                    (account, *batch),
+                ).fetchall()
+            known.update(row[0] for row in rows)
+        return known
+
+    def record_media(self, account: str, media_pk, user_pk, status: str) -> None:
+        """یک پست لایک شده (liked) یا از قبل لایک شده (already_liked) را ثبت می‌کند."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO liked_media (account, media_pk, user_pk, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (account, str(media_pk), str(user_pk) if user_pk is not None else None, status, time.time()),
+            )
+            self._conn.commit()
+
+    def count_liked_since(self, account: str, since: float) -> int:
+        """تعداد لایک‌های موفق این اکانت از زمان `since` (timestamp) به بعد را برمی‌گرداند."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM liked_media WHERE account = ? AND status = 'liked' AND created_at >= ?",
+                (account, since),
+            ).fetchone()
+        return row[0]
+
+    def user_history(self, accounts: list, user_pks: list) -> dict:
+        """
+        سابقه ثبت شده کاربران برای این اکانت‌ها را برمی‌گرداند:
+        {user_pk: (تعداد پست‌های ثبت شده، تعداد لایک‌های موفق، زمان آخرین ثبت)}.
+        کاربرانی که سابقه‌ای ندارند در خروجی نیستند.
+        """
+        accounts = [str(a) for a in accounts]
+        user_pks = [str(pk) for pk in user_pks]
+        history = {}
+        if not accounts or not user_pks:
+            return history
+        account_marks = ",".join("?" * len(accounts))
+        # تعداد پارامترهای هر دستور SQLite محدود است
+        for i in range(0, len(user_pks), HISTORY_BATCH_SIZE):
+            batch = user_pks[i:i + HISTORY_BATCH_SIZE]
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT user_pk, COUNT(*), SUM(status = 'liked'), MAX(created_at) FROM liked_media "
+                    f"WHERE user_pk IN ({','.join('?' * len(batch))}) AND account IN ({account_marks}) "
+                    "GROUP BY user_pk",
+                    (*batch, *accounts),
+                ).fetchall()
+            for user_pk, total, liked, last_seen in rows:
+                history[user_pk] = (total, liked, last_seen)
+        return history
+
+    def mark_user_covered(self, account: str, user_pk, posts_requested: int) -> None:
+        """ثبت می‌کند که تمام آخرین پست‌های این کاربر (به تعداد درخواستی) پوشش داده شده‌اند."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO covered_users (account, user_pk, posts_requested, checked_at) "
+                "VALUES (?, ?, ?, ?)",
+                (account, str(user_pk), posts_requested, time.time()),
+            )
+            self._conn.commit()
+
+    def is_user_covered(self, account: str, user_pk, posts_per_user: int, max_age: float) -> bool:
+        """
+        اگر کاربر در `max_age` ثانیه گذشته با حداقل `posts_per_user` پست بررسی و
+        کامل پوشش داده شده باشد True برمی‌گرداند.
+        """
+        if max_age <= 0:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM covered_users WHERE account = ? AND user_pk = ? "
+                "AND posts_requested >= ? AND checked_at >= ?",
+                (account, str(user_pk), posts_per_user, time.time() - max_age),
+            ).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,16 +1,27 @@
+from __future__ import annotations
+
+# پیش از سایر import ها تا زمان بارگذاری ماژول‌ها هم در گزارش راه‌اندازی بیاید
+from boot import BOOT_TIMER
 import os
 import logging
-import random
 import asyncio
+import datetime
 import html
+import importlib
 import time
 from dotenv import load_dotenv
 import re
-from functools import wraps
-
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired, MediaNotFound, UserNotFound, BadPassword, TwoFactorRequired
-from instagrapi.types import Media, UserShort
+import signal
+import collections
+import heapq
+import itertools
+from functools import wraps, lru_cache, partial
+from typing import TYPE_CHECKING
+
+# instagrapi (با انواع pydantic اش) بخش عمده زمان import را می‌گیرد؛ فقط در اولین نیاز
+# (بازیابی session ها در پس‌زمینه یا ورود) بارگذاری می‌شود
+if TYPE_CHECKING:
+    from instagrapi import Client
 
 from telegram import Update, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -22,6 +33,30 @@ from telegram.ext import (
     ConversationHandler,
     CallbackQueryHandler,
 )
+from telegram.error import TelegramError
+from telegram.request import HTTPXRequest
+
+from ledger import LikeLedger
+from rate_limiter import AdaptiveTokenBucket, RateLimiterRegistry
+from breaker import CircuitBreaker, CircuitBreakerRegistry
+from checkpoint import JobCheckpoint
+from cache import TTLCache
+from compact import CompactUser
+from session_manager import SessionManager
+from scheduler import JobScheduler, DailyBudget, parse_windows, PRIORITY_NAMES
+from ranking import UserRanker, APPEARANCE_WEIGHT
+from visits import RecentVisitIndex
+from events import EventLog
+from planner import JobPlanner, blend_eta
+from progress import ProgressReporter
+from job_broker import DurableJobQueue, ACTIVE_STATES
+from webhook import start_webhook_server
+import metrics
+from executors import EXECUTORS, call_instagram
+from sources import (MediaPkResolver, FollowingSnapshotStore, iter_following_snapshot, iter_post_likers_pages,
+                     skip_known_users)
+
+BOOT_TIMER.mark("بارگذاری ماژول‌ها")
 
 # --- بارگذاری متغیرهای محیطی ---
 load_dotenv()
@@ -36,6 +71,12 @@ logger = logging.getLogger(__name__)
 if not os.path.exists('sessions'):
     os.makedirs('sessions')
 
+# ایجاد پوشه برای ذخیره داده‌های ماندگار (دفتر لایک‌ها و ...)
+DATA_DIR = 'data'
+JOBS_DIR = os.path.join(DATA_DIR, 'jobs')
+if not os.path.exists(JOBS_DIR):
+    os.makedirs(JOBS_DIR)
+
 # --- اطلاعات حساس و ثابت‌ها ---
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 ADMIN_USER_ID_STR = os.getenv("ADMIN_USER_ID")
@@ -50,19 +91,156 @@ except ValueError:
     logger.error("شناسه ادمین در فایل .env یک عدد صحیح معتبر نیست!")
     exit()
 
+try:
+    LEDGER_USER_TTL = float(os.getenv("LEDGER_USER_TTL_HOURS", "24")) * 3600
+except ValueError:
+    logger.error("مقدار LEDGER_USER_TTL_HOURS در فایل .env یک عدد معتبر نیست!")
+    exit()
+
+try:
+    PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL_HOURS", "24")) * 3600
+    MEDIA_CACHE_TTL = float(os.getenv("MEDIA_CACHE_TTL_HOURS", "6")) * 3600
+except ValueError:
+    logger.error("مقادیر PROFILE_CACHE_TTL_HOURS یا MEDIA_CACHE_TTL_HOURS در فایل .env عدد معتبر نیستند!")
+    exit()
+
+try:
+    VISIT_COOLDOWN = float(os.getenv("VISIT_COOLDOWN_HOURS", "6")) * 3600
+except ValueError:
+    logger.error("مقدار VISIT_COOLDOWN_HOURS در فایل .env یک عدد معتبر نیست!")
+    exit()
+
+# لیست ذخیره شده دنبال‌شوندگان هر اکانت پس از این مدت در پس‌زمینه به طور کامل دوباره دریافت می‌شود
+try:
+    FOLLOWING_FULL_SYNC = float(os.getenv("FOLLOWING_FULL_SYNC_HOURS", "24")) * 3600
+except ValueError:
+    logger.error("مقدار FOLLOWING_FULL_SYNC_HOURS در فایل .env یک عدد معتبر نیست!")
+    exit()
+
+try:
+    PREFETCH_USERS = int(os.getenv("PREFETCH_USERS", "3"))
+except ValueError:
+    logger.error("مقدار PREFETCH_USERS در فایل .env یک عدد صحیح معتبر نیست!")
+    exit()
+
+try:
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+except ValueError:
+    logger.error("مقدار METRICS_PORT در فایل .env یک عدد صحیح معتبر نیست!")
+    exit()
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# با تنظیم WEBHOOK_PORT ربات به جای polling به‌روزرسانی‌ها را از سرور webhook داخلی دریافت می‌کند
+try:
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "0"))
+except ValueError:
+    logger.error("مقدار WEBHOOK_PORT در فایل .env یک عدد صحیح معتبر نیست!")
+    exit()
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PATH = "/" + os.getenv("WEBHOOK_PATH", "telegram").strip("/")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+if WEBHOOK_PORT > 0 and not re.fullmatch(r'[A-Za-z0-9_-]{1,256}', WEBHOOK_SECRET):
+    logger.error("در حالت webhook مقدار WEBHOOK_SECRET (۱ تا ۲۵۶ کاراکتر از A-Z، a-z، 0-9، _ و -) الزامی است!")
+    exit()
+# حداکثر زمان انتظار برای توقف فرآیندهای لایک هنگام خاموش شدن ربات (ثانیه)
+SHUTDOWN_DRAIN_TIMEOUT = 30
+
+try:
+    EVENT_LOG_MAX_BYTES = int(float(os.getenv("EVENT_LOG_MAX_MB", "50")) * 1024 * 1024)
+except ValueError:
+    logger.error("مقدار EVENT_LOG_MAX_MB در فایل .env یک عدد معتبر نیست!")
+    exit()
+
+# با مقدار بزرگ‌تر از صفر، فرآیندها در پروسه‌های جداگانه worker.py اجرا می‌شوند و ربات فقط آن‌ها را در صف ثبت می‌کند
+try:
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0"))
+except ValueError:
+    logger.error("مقدار JOB_WORKERS در فایل .env یک عدد صحیح معتبر نیست!")
+    exit()
+
+try:
+    SESSION_VALIDATE_AFTER = float(os.getenv("SESSION_VALIDATE_HOURS", "12")) * 3600
+except ValueError:
+    logger.error("مقدار SESSION_VALIDATE_HOURS در فایل .env یک عدد معتبر نیست!")
+    exit()
+
+try:
+    EXECUTORS.configure(
+        max_workers=int(os.getenv("INSTAGRAM_WORKERS_PER_ACCOUNT", "4")),
+        timeout=float(os.getenv("INSTAGRAM_CALL_TIMEOUT", "60")),
+        retries=int(os.getenv("INSTAGRAM_CALL_RETRIES", "1")),
+    )
+except ValueError:
+    logger.error("مقادیر INSTAGRAM_WORKERS_PER_ACCOUNT، INSTAGRAM_CALL_TIMEOUT یا INSTAGRAM_CALL_RETRIES در فایل .env معتبر نیستند!")
+    exit()
+
+# پس از خطای سطح اکانت، اکانت این مدت (دو برابر شونده تا BREAKER_MAX_COOLDOWN) متوقف و سپس دوباره وارد می‌شود
+try:
+    BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN_MINUTES", "15")) * 60
+    BREAKER_MAX_TRIPS = int(os.getenv("BREAKER_MAX_TRIPS", "3"))
+except ValueError:
+    logger.error("مقادیر BREAKER_COOLDOWN_MINUTES یا BREAKER_MAX_TRIPS در فایل .env معتبر نیستند!")
+    exit()
+BREAKER_MAX_COOLDOWN = 2 * 3600
+
+# فاصله به‌روزرسانی پیام زنده پیشرفت هر فرآیند (ثانیه)؛ صفر پیام زنده را غیرفعال می‌کند
+try:
+    PROGRESS_UPDATE_SECONDS = float(os.getenv("PROGRESS_UPDATE_SECONDS", "20"))
+except ValueError:
+    logger.error("مقدار PROGRESS_UPDATE_SECONDS در فایل .env معتبر نیست!")
+    exit()
+# حداقل فاصله دو ویرایش پیام پیشرفت، حتی برای تغییرات مهم (محدودیت ویرایش تلگرام در هر چت)
+PROGRESS_MIN_EDIT_INTERVAL = 3
+
+try:
+    like_budget = DailyBudget(int(os.getenv("DAILY_LIKE_BUDGET", "0")), parse_windows(os.getenv("LIKING_WINDOWS", "")))
+except ValueError:
+    logger.error("مقادیر DAILY_LIKE_BUDGET یا LIKING_WINDOWS در فایل .env معتبر نیستند!")
+    exit()
+
+# منطقه زمانی سرور برای زمان‌بندی‌های روزانه
+LOCAL_TZ = datetime.datetime.now().astimezone().tzinfo
+
+# session های ذخیره شده (به ازای نام کاربری) و کلاینت‌های آماده در حافظه
+session_manager = SessionManager('sessions', SESSION_VALIDATE_AFTER)
+# دفتر لایک‌ها برای جلوگیری از بررسی مجدد پست‌ها و کاربرانی که قبلاً پوشش داده شده‌اند
+like_ledger = LikeLedger(os.path.join(DATA_DIR, 'ledger.sqlite3'))
+# کش پروفایل کاربران (خصوصی بودن، داشتن پست، زمان آخرین پست) و لیست آخرین پست‌های آن‌ها
+CACHE_DB_PATH = os.path.join(DATA_DIR, 'cache.sqlite3')
+user_profile_cache = TTLCache(CACHE_DB_PATH, 'user_profiles', PROFILE_CACHE_TTL)
+recent_media_cache = TTLCache(CACHE_DB_PATH, 'recent_media', MEDIA_CACHE_TTL)
+# آخرین زمان بازدید هر کاربر به ازای هر اکانت، برای رد کردن کاربرانی که به تازگی بررسی شده‌اند
+recent_visits = RecentVisitIndex(os.path.join(DATA_DIR, 'visits'), VISIT_COOLDOWN)
+# گزارش ساخت‌یافته رویدادهای فرآیندهای لایک (برای گزارش‌گیری با event_report.py)
+event_log = EventLog(os.path.join(DATA_DIR, 'events'), EVENT_LOG_MAX_BYTES)
+# مدل مدت فرآیندها برای پیش‌نمایش پیش از شروع و تخمین زمان باقی‌مانده در /status
+job_planner = JobPlanner(os.path.join(DATA_DIR, 'planner.json'))
+# صف ماندگار فرآیندها بین ربات و پروسه‌های worker (فقط در حالت JOB_WORKERS)
+job_broker = DurableJobQueue(os.path.join(DATA_DIR, 'workers.sqlite3')) if JOB_WORKERS > 0 else None
+# آخرین لیست دنبال‌شوندگان هر اکانت برای دریافت افزایشی در فرآیندهای بعدی
+following_snapshots = FollowingSnapshotStore(os.path.join(DATA_DIR, 'following'), FOLLOWING_FULL_SYNC)
+# تبدیل لینک پست‌ها به شناسه (محلی و با کش روی دیسک)
+media_pk_resolver = MediaPkResolver(os.path.join(DATA_DIR, 'media_pk_cache.json'))
+# صف فرآیندهای منتظر و زمان‌بندی‌های روزانه
+job_scheduler = JobScheduler(os.path.join(DATA_DIR, 'scheduler.json'))
+# امتیازدهی کاربران از داده‌های محلی برای پردازش بهترین کاربران در ابتدا
+user_ranker = UserRanker(like_ledger, user_profile_cache)
+
 
 # تعریف مراحل مکالمه برای خوانایی بهتر
 (LOGIN_GET_USERNAME, LOGIN_HANDLE_SESSION, LOGIN_GET_PASSWORD, 
  LOGIN_HANDLE_2FA, LOGIN_GET_2FA_CODE) = ("LOGIN_GET_USERNAME", "LOGIN_HANDLE_SESSION", 
                                           "LOGIN_GET_PASSWORD", "LOGIN_HANDLE_2FA", "LOGIN_GET_2FA_CODE")
 
-(POST_LIKING_GET_POST_COUNT, POST_LIKING_GET_DELAY, POST_LIKING_GET_SLEEP) = ("POST_LIKING_GET_POST_COUNT", 
-                                                                            "POST_LIKING_GET_DELAY", 
-                                                                            "POST_LIKING_GET_SLEEP")
+(POST_LIKING_GET_POST_COUNT, POST_LIKING_GET_DELAY, POST_LIKING_GET_SLEEP,
+ POST_LIKING_CONFIRM) = ("POST_LIKING_GET_POST_COUNT", "POST_LIKING_GET_DELAY",
+                         "POST_LIKING_GET_SLEEP", "POST_LIKING_CONFIRM")
 
 (FOLLOWING_GET_USER_COUNT, FOLLOWING_GET_POST_COUNT, 
- FOLLOWING_GET_DELAY, FOLLOWING_GET_SLEEP) = ("FOLLOWING_GET_USER_COUNT", "FOLLOWING_GET_POST_COUNT", 
-                                             "FOLLOWING_GET_DELAY", "FOLLOWING_GET_SLEEP")
+ FOLLOWING_GET_DELAY, FOLLOWING_GET_SLEEP, FOLLOWING_CONFIRM) = ("FOLLOWING_GET_USER_COUNT", "FOLLOWING_GET_POST_COUNT", 
+                                                                "FOLLOWING_GET_DELAY", "FOLLOWING_GET_SLEEP",
+                                                                "FOLLOWING_CONFIRM")
 
 
 # --- Decorator برای محدود کردن دسترسی به ادمین ---
@@ -78,13 +256,6 @@ def admin_only(func):
 
 
 # --- توابع کمکی ---
-def get_session_path_by_chat_id(context: ContextTypes.DEFAULT_TYPE) -> str:
-    """مسیر فایل session را بر اساس شناسه چت تلگرام کاربر برمی‌گرداند."""
-    chat_id = context.user_data.get('chat_id')
-    if chat_id:
-        return os.path.join('sessions', f"{chat_id}.json")
-    return None
-
 async def _perform_login(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """تابع اصلی برای انجام عملیات ورود و مدیریت خطاها."""
     query = update.callback_query
@@ -99,13 +270,16 @@ async def _perform_login(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     password = context.user_data['password']
     verification_code = context.user_data.get('verification_code', '')
 
+    from instagrapi import Client
+    from instagrapi.exceptions import BadPassword, TwoFactorRequired
+
     client = Client()
     try:
-        await asyncio.to_thread(client.login, username_input, password, verification_code=verification_code)
+        await call_instagram(client.login, username_input, password, verification_code=verification_code)
         
         context.user_data['client'] = client
-        session_path = get_session_path_by_chat_id(context)
-        client.dump_settings(session_path)
+        context.user_data['session_file'] = await session_manager.save(client)
+        session_manager.set_active(update.effective_user.id, context.user_data['session_file'])
         
         await msg.edit_text(f"✅ ورود با موفقیت انجام شد!\n\n🎉 خوش آمدید <b>{client.username}</b>.\nاکنون آماده شروع عملیات هستید.", parse_mode='HTML')
         return ConversationHandler.END
@@ -134,7 +308,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "/like_following - 👥 شروع لایک کردن پست‌های دنبال‌شوندگان\n"
         "/login - 🔑 ورود به حساب اینستاگرام\n"
         "/logout - 🚪 خروج از حساب فعلی\n"
+        "/accounts - 👥 انتخاب اکانت‌های کمکی برای تقسیم کار\n"
         "/status - 📊 مشاهده وضعیت عملیات\n"
+        "/pause_liking - ⏸ مکث فرآیند لایک در حال اجرا\n"
+        "/resume_liking - ▶️ ادامه فرآیند در حال مکث یا فرآیندهای ناتمام\n"
+        "/cancel_liking - 🛑 لغو فوری فرآیند لایک\n"
+        "/queue - 📋 مدیریت صف و زمان‌بندی فرآیندها\n"
+        "/schedule - ⏰ اجرای روزانه یک فرآیند در ساعت مشخص\n"
         "/cancel - 🛑 لغو عملیات فعلی\n\n"
         "<i>برای لایک کردن لایک‌کنندگان یک پست، کافیست لینک آن را ارسال کنید.</i>\n\n"
         "ℹ️ همچنین می‌توانید از منوی دستورات (دکمه /) برای دسترسی سریع‌تر استفاده کنید."
@@ -158,9 +338,10 @@ async def login_get_username(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """نام کاربری را دریافت و وجود session را بررسی می‌کند."""
     username = update.message.text.strip().lower()
     context.user_data['instagram_username'] = username
-    session_path = os.path.join('sessions', f"{username}.json")
+    session_file = session_manager.find(username)
 
-    if os.path.exists(session_path):
+    if session_file:
+        context.user_data['session_file'] = session_file
         keyboard = [[InlineKeyboardButton("✔️ بله، با Session وارد شو", callback_data='session_yes'), InlineKeyboardButton("✖️ خیر، با رمز عبور", callback_data='session_no')]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(f"📂 یک Session برای کاربر '<b>{username}</b>' پیدا شد. آیا می‌خواهید با آن وارد شوید؟", reply_markup=reply_markup, parse_mode='HTML')
@@ -175,18 +356,17 @@ async def login_handle_session_choice(update: Update, context: ContextTypes.DEFA
     await query.answer()
     
     if query.data == 'session_yes':
-        session_path = os.path.join('sessions', context.user_data.get('instagram_username') + ".json")
-        client = Client()
+        session_file = context.user_data['session_file']
         try:
-            await asyncio.to_thread(client.load_settings, session_path)
-            await asyncio.to_thread(client.get_timeline_feed)
+            # کلاینت آماده در حافظه بدون درخواست برگردانده می‌شود؛ session کهنه با یک درخواست سبک بررسی می‌شود
+            client = await session_manager.get_client(session_file)
             context.user_data['client'] = client
-            await asyncio.to_thread(client.dump_settings, get_session_path_by_chat_id(context))
-            username = context.user_data.get('instagram_username', 'کاربر')
-            await query.edit_message_text(text=f"✅ ورود با Session موفقیت آمیز بود! خوش آمدید <b>{username}</b>.", parse_mode='HTML')
+            session_manager.set_active(update.effective_user.id, session_file)
+            await query.edit_message_text(text=f"✅ ورود با Session موفقیت آمیز بود! خوش آمدید <b>{client.username}</b>.", parse_mode='HTML')
             return ConversationHandler.END
         except Exception as e:
             logger.error(f"خطا در ورود با session: {e}")
+            context.user_data.pop('session_file', None)
             await query.edit_message_text(text="❌ ورود با Session ناموفق بود. لطفاً رمز عبور را وارد کنید:\n\nبرای لغو، روی /cancel کلیک کنید.")
             return LOGIN_GET_PASSWORD
     else:
@@ -243,9 +423,10 @@ async def handle_logout_confirmation(update: Update, context: ContextTypes.DEFAU
     await query.answer()
     
     if query.data == 'confirm_logout_yes':
-        session_path = get_session_path_by_chat_id(context)
-        if session_path and os.path.exists(session_path):
-            os.remove(session_path)
+        session_file = context.user_data.get('session_file')
+        if session_file:
+            session_manager.remove(session_file)
+        session_manager.clear_active(update.effective_user.id)
         context.user_data.clear()
         await query.edit_message_text("✔️ شما با موفقیت از حساب خود خارج شدید.")
     else: # confirm_logout_no
@@ -260,111 +441,1477 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not job or not job.get('is_running'):
         await update.message.reply_text("💤 در حال حاضر هیچ فرآیند لایکی در حال اجرا نیست.")
         return
+    if job.get('remote'):
+        row = job_broker.get(job['job_id'])
+        if row is None or row['progress'] is None:
+            await update.message.reply_text("⏳ فرآیند لایک در صف workerها منتظر اجراست.")
+            return
+        job = row['progress']
+    else:
+        job = _job_snapshot(job)
+    await update.message.reply_html(_render_status(job, len(job_scheduler.pending(update.effective_chat.id))))
 
+
+def _render_status(job: dict, queued: int = 0, footer: str = "") -> str:
+    """متن وضعیت فرآیند از روی `_job_snapshot` آن، برای /status و پیام زنده پیشرفت."""
     liking_mode = job.get('mode', 'نامشخص')
     title = "لایک از پست" if liking_mode == 'post_likers' else "لایک دنبال‌شوندگان"
     
     total = job.get('total_items', 0)
     processed = job.get('processed_items', 0)
-    start_time = job.get('start_time', 0)
-    
-    elapsed_time = time.monotonic() - start_time
+    elapsed_time = job['elapsed']
     
-    eta_str = "نامشخص"
-    if processed > 0:
-        avg_time_per_item = elapsed_time / processed
-        remaining_items = total - processed
-        eta_seconds = remaining_items * avg_time_per_item
-        eta_str = time.strftime("%H:%M:%S", time.gmtime(eta_seconds))
+    total_str = f"{total}" if job.get('source_complete') else f"{total}+ (در حال دریافت...)"
+    eta_str = _format_duration(job['eta']) if job.get('eta') is not None else "نامشخص"
 
     last_status_raw = job.get('last_status', 'نامشخص')
     last_status_escaped = html.escape(last_status_raw)
     
     percentage = (processed / total) * 100 if total > 0 else 0
 
-    status_message = (
+    accounts_lines = ""
+    job_accounts = job.get('accounts', {})
+    if len(job_accounts) > 1:
+        accounts_lines = "\n<b>اکانت‌ها:</b>\n"
+        for stats in job_accounts.values():
+            state = "🟢" if stats['is_active'] else "⚪️"
+            accounts_lines += (
+                f"{state} <b>{html.escape(stats['username'] or '')}</b>: "
+                f"{stats['processed_items']} کاربر، {stats['likes_done']} لایک، {stats['errors']} خطا\n"
+            )
+
+    paused_line = "⏸ <b>در حالت مکث</b> (ادامه با /resume_liking)\n\n" if job['paused'] else ""
+    for stats in job_accounts.values():
+        # اکانت‌هایی که مدارشان پس از خطای سطح اکانت باز است؛ با توقف همه آن‌ها فرآیند متوقف است
+        if stats.get('paused_until'):
+            resume_at = datetime.datetime.fromtimestamp(stats['paused_until']).strftime('%H:%M')
+            paused_line += (f"🔌 اکانت <b>{html.escape(stats['username'] or '')}</b> پس از خطای اکانت "
+                            f"تا ساعت <b>{resume_at}</b> متوقف است و سپس خودکار دوباره وارد می‌شود.\n\n")
+    error_classes = (f"موقت {job.get('errors_transient', 0)}، کاربر {job.get('errors_user', 0)}، "
+                     f"اکانت {job.get('errors_account', 0)}، مهلک {job.get('errors_fatal', 0)}")
+    queue_line = f"📋 فرآیندهای در صف: <b>{queued}</b> (/queue)\n" if queued else ""
+
+    return (
         f"📊 <b>وضعیت {title}</b>\n\n"
-        f"👥 کاربران بررسی شده: <b>{processed}</b> از <b>{total}</b>\n"
+        f"{paused_line}"
+        f"👥 کاربران بررسی شده: <b>{processed}</b> از <b>{total_str}</b>\n"
         f"📈 درصد پیشرفت: <b>{percentage:.2f}%</b>\n"
-        f"⏳ زمان سپری شده: <b>{time.strftime('%H:%M:%S', time.gmtime(elapsed_time))}</b>\n"
+        f"⏳ زمان سپری شده: <b>{_format_duration(elapsed_time)}</b>\n"
         f"⏱️ تخمین زمان باقی‌مانده (ETA): <b>{eta_str}</b>\n\n"
         f"❤️‍🔥 لایک‌های جدید: <b>{job.get('likes_done', 0)}</b>\n"
         f"🟡 از قبل لایک شده: <b>{job.get('already_liked', 0)}</b>\n"
-        f"❌ خطاها: <b>{job.get('errors', 0)}</b>\n\n"
+        f"⏭️ کاربران رد شده (دفتر لایک): <b>{job.get('skipped_known', 0)}</b>\n"
+        f"🗂 کاربران حذف شده (کش پروفایل): <b>{job.get('filtered_cached', 0)}</b>\n"
+        f"🕒 کاربران رد شده (بازدید اخیر): <b>{job.get('skipped_recent', 0)}</b>\n"
+        f"❌ خطاها: <b>{job.get('errors', 0)}</b>\n"
+        f"🧩 خطاها به تفکیک دسته: {error_classes}\n"
+        f"🐢 محدودیت‌های سرعت: <b>{job.get('throttled', 0)}</b>\n"
+        f"{queue_line}"
+        f"{accounts_lines}\n"
         f"<b>آخرین عملیات:</b>\n<code>{last_status_escaped}</code>"
+        f"{footer}"
     )
-    await update.message.reply_html(status_message)
 
 # --- بخش فرآیند لایک ---
-async def liking_task(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """وظیفه پس‌زمینه که حلقه لایک کردن را اجرا می‌کند."""
-    chat_id = context.user_data['chat_id']
-    cl = context.user_data['client']
-    job = context.user_data['liking_job']
-    
-    users_to_process = job['users_to_process']
+@lru_cache(maxsize=None)
+def account_level_errors() -> tuple:
+    """خطاهایی که نشان می‌دهند خود اکانت (و نه کاربر هدف) از کار افتاده و ممکن است با ورود دوباره بازیابی شود."""
+    from instagrapi.exceptions import (LoginRequired, ChallengeRequired, ClientLoginRequired, ClientUnauthorizedError,
+                                       SentryBlock)
+    return (LoginRequired, ChallengeRequired, ClientLoginRequired, ClientUnauthorizedError, SentryBlock)
+
+@lru_cache(maxsize=None)
+def fatal_errors() -> tuple:
+    """خطاهایی که اکانت با ورود دوباره هم بازیابی نمی‌شود (تعلیق حساب، پراکسی مسدود و ...)."""
+    from instagrapi.exceptions import AccountSuspended, ReloginAttemptExceeded, ProxyAddressIsBlocked, BadPassword
+    return (AccountSuspended, ReloginAttemptExceeded, ProxyAddressIsBlocked, BadPassword)
+
+@lru_cache(maxsize=None)
+def transient_errors() -> tuple:
+    """خطاهای شبکه و پاسخ‌های ناقص که تلاش دوباره برای همان کاربر معمولاً موفق می‌شود."""
+    from instagrapi.exceptions import (ClientConnectionError, ClientRequestTimeout, ClientIncompleteReadError,
+                                       ClientJSONDecodeError)
+    return (ClientConnectionError, ClientRequestTimeout, ClientIncompleteReadError, ClientJSONDecodeError,
+            ConnectionError, TimeoutError)
+
+@lru_cache(maxsize=None)
+def throttle_errors() -> tuple:
+    """نشانه‌های محدودیت سرعت از سمت اینستاگرام."""
+    from instagrapi.exceptions import PleaseWaitFewMinutes, FeedbackRequired, RateLimitError, ClientThrottledError
+    return (PleaseWaitFewMinutes, FeedbackRequired, RateLimitError, ClientThrottledError)
+
+# اگر یک اکانت این تعداد بار پشت سر هم محدود شود مثل خطاهای سطح اکانت متوقف می‌شود
+MAX_THROTTLE_STREAK = 5
+# دسته‌های خطا: موقت (تلاش دوباره)، کاربر هدف، اکانت (قطع مدار و ورود دوباره) و مهلک (خروج اکانت از فرآیند)
+ERROR_CLASSES = ('transient', 'user', 'account', 'fatal')
+# تعداد دفعاتی که یک کاربر پس از خطای موقت دوباره به صف برمی‌گردد
+TRANSIENT_RETRIES = 2
+# تعداد دفعاتی که یک کاربر پس از محدودیت سرعت دوباره به صف برمی‌گردد
+THROTTLE_RETRIES = 3
+# حداکثر مدت هر خواب در انتظار بودجه روزانه لایک (ثانیه)
+BUDGET_RECHECK_SECONDS = 300
+
+# تعداد لایک‌های امروز هر اکانت برای بودجه روزانه: {account: [date, used]}
+like_budget_usage = {}
+
+# سطل‌های توکن تطبیقی به ازای هر اکانت و دسته درخواست ('read' و 'like')
+rate_limiters = RateLimiterRegistry()
+# قطع‌کننده‌های مدار به ازای هر اکانت برای خطاهای سطح اکانت
+circuit_breakers = CircuitBreakerRegistry(BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN, BREAKER_MAX_TRIPS)
+
+
+def classify_error(e: Exception) -> str:
+    """دسته خطا را از ERROR_CLASSES برمی‌گرداند؛ خطاهای ناشناخته مربوط به کاربر هدف فرض می‌شوند."""
+    if isinstance(e, fatal_errors()):
+        return 'fatal'
+    message = str(e).lower()
+    if isinstance(e, account_level_errors()) or 'action blocked' in message or 'action_block' in message:
+        return 'account'
+    if isinstance(e, transient_errors()) or is_throttle_error(e):
+        return 'transient'
+    return 'user'
+
+
+def is_throttle_error(e: Exception) -> bool:
+    """بررسی می‌کند که آیا خطا نشانه محدودیت سرعت (429، feedback_required و ...) است."""
+    if isinstance(e, throttle_errors()):
+        return True
+    # متن خطاهای HTTP آدرس درخواست (با شناسه کاربر یا پست) را دارد؛ کد 429 فقط از خود پاسخ خوانده می‌شود
+    if getattr(getattr(e, 'response', None), 'status_code', None) == 429:
+        return True
+    message = str(e).lower()
+    return 'feedback_required' in message or 'please wait a few minutes' in message
+
+
+class UserWorkQueue:
+    """
+    صف کار مشترک، محدود و اولویت‌دار بین اکانت‌های یک فرآیند لایک.
+    منبع کاربران صفحه به صفحه با `put` صف را پر می‌کند (و در صورت پر بودن صف منتظر
+    می‌ماند تا حافظه محدود بماند). هر کارگر (اکانت) کاربر با بیشترین امتیاز را با `take`
+    برمی‌دارد (کاربران هم‌امتیاز به ترتیب ورود) و در صورت از کار افتادن، کاربرانی را
+    که هنوز پردازش نکرده به صف برمی‌گرداند.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self.maxsize = maxsize
+        # هر ورودی [-score, ترتیب ورود, user] است؛ ورودی‌های جایگزین شده user برابر None دارند
+        self._heap = []
+        self._entries = {}
+        self._order = itertools.count()
+        self._returned = collections.deque()
+        self._closed = False
+        self._available = asyncio.Event()
+        self._space = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._returned)
+
+    async def put(self, user, score: float = 0.0) -> None:
+        """کاربر (هر شیئی با pk، username و is_private) را به شکل فشرده و با امتیاز `score` به صف اضافه می‌کند."""
+        while self.maxsize and len(self._entries) >= self.maxsize:
+            self._space.clear()
+            await self._space.wait()
+        user = CompactUser.from_user(user)
+        previous = self._entries.get(user.pk)
+        if previous is not None:
+            previous[2] = None
+        entry = [-score, next(self._order), user]
+        self._entries[user.pk] = entry
+        heapq.heappush(self._heap, entry)
+        self._available.set()
+
+    def boost(self, user_pk, amount: float) -> None:
+        """امتیاز کاربری را که هنوز در صف منتظر است افزایش می‌دهد."""
+        entry = self._entries.get(int(user_pk))
+        if entry is None:
+            return
+        user, entry[2] = entry[2], None
+        boosted = [entry[0] - amount, entry[1], user]
+        self._entries[user.pk] = boosted
+        heapq.heappush(self._heap, boosted)
+
+    def _pop(self):
+        while True:
+            _, _, user = heapq.heappop(self._heap)
+            if user is not None:
+                del self._entries[user.pk]
+                return user
+
+    def close(self) -> None:
+        """منبع کاربران به پایان رسیده است؛ کارگرها پس از خالی شدن صف متوقف می‌شوند."""
+        self._closed = True
+        self._available.set()
+
+    async def take(self):
+        """کاربر بعدی را برمی‌گرداند، یا None اگر صف بسته و خالی باشد."""
+        while True:
+            if self._returned:
+                return self._returned.popleft()
+            if self._entries:
+                self._space.set()
+                return self._pop()
+            if self._closed:
+                return None
+            self._available.clear()
+            await self._available.wait()
+
+    def give_back(self, user) -> None:
+        self._returned.append(user)
+        self._available.set()
+
+
+# حداکثر تعداد کاربرانی که از منبع دریافت شده و منتظر پردازش در حافظه می‌مانند
+WORK_QUEUE_SIZE = 500
+# تعداد کاربران ذخیره شده‌ای که هنگام ادامه فرآیند با هم امتیازدهی می‌شوند
+RANKING_BATCH_SIZE = 500
+
+# صف‌های کار فرآیندهای در حال اجرا، برای گزارش عمق صف در metrics
+active_work_queues = set()
+metrics.REGISTRY.describe('liking_queue_depth', "Users waiting in the work queues of running jobs")
+metrics.REGISTRY.describe('liking_running_jobs', "Liking jobs currently running")
+metrics.REGISTRY.gauge('liking_queue_depth', lambda: sum(len(queue) for queue in active_work_queues))
+metrics.REGISTRY.gauge('liking_running_jobs', lambda: len(active_work_queues))
+
+# شمارنده‌هایی که در نقطه بازیابی ذخیره و هنگام ادامه فرآیند بازگردانده می‌شوند
+JOB_COUNTERS = ('processed_items', 'likes_done', 'already_liked', 'skipped_known', 'errors', 'throttled',
+                'filtered_cached', 'skipped_recent') + tuple(f'errors_{name}' for name in ERROR_CLASSES)
+
+
+def _count(job: dict, account_stats: dict, key: str) -> None:
+    """یک شمارنده را هم در آمار کلی فرآیند و هم در آمار اکانت افزایش می‌دهد."""
+    job[key] += 1
+    account_stats[key] += 1
+
+
+async def _wait_if_paused(job: dict) -> None:
+    """تا زمانی که فرآیند به حالت مکث رفته است صبر می‌کند؛ در این مدت هیچ درخواستی ارسال نمی‌شود."""
+    await job['resume_event'].wait()
+
+
+def _active_seconds(job: dict) -> float:
+    """زمان سپری شده از شروع فرآیند بدون احتساب مدت‌های مکث."""
+    paused = job['paused_seconds']
+    if job['paused_at'] is not None:
+        paused += time.monotonic() - job['paused_at']
+    return time.monotonic() - job['start_time'] - paused
+
+
+def _format_duration(seconds: float) -> str:
+    """مدت به شکل HH:MM:SS (با تعداد روزها برای مدت‌های بیش از یک روز)."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    clock = f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{days} روز و {clock}" if days else clock
+
+
+def _job_eta(job: dict):
+    """
+    زمان باقی‌مانده فرآیند (ثانیه) از مدل JobPlanner با نرخ‌های مشاهده شده همین فرآیند، ترکیب
+    شده با سرعت واقعی آن؛ اگر تعداد کاربران باقی‌مانده مشخص نباشد None برمی‌گرداند.
+    """
+    config = job['config']
+    active = [account for account, stats in job['accounts'].items() if stats['is_active']]
+    if not active:
+        return None
+    processed = job['processed_items']
+    observed = {key: job[key] - job['counters_at_start'].get(key, 0) for key in JOB_COUNTERS}
+    queued = max(job['total_items'] - processed, 0)
+    not_fetched = 0
+    if not job['source_complete']:
+        if job['mode'] != 'following' or not config.get('users_to_check'):
+            return None
+        # بقیه لیست دنبال‌شوندگان هنوز دریافت نشده است
+        seen = job['total_items'] + job['filtered_cached'] + job['skipped_recent']
+        not_fetched = max(config['users_to_check'] - seen, 0)
+    estimate = partial(job_planner.estimate, job['mode'], config, accounts=active,
+                       prefetch=PREFETCH_USERS > 0, budget=like_budget, observed=observed,
+                       warm=observed['processed_items'] > 0)
+    queued_plan = estimate(queued, prefiltered=True)
+    fetched_plan = estimate(not_fetched) if not_fetched else {'users': 0, 'seconds': 0.0}
+    eta = blend_eta(queued_plan['seconds'] + fetched_plan['seconds'], queued + fetched_plan['users'],
+                    _active_seconds(job), observed['processed_items'])
+    # اگر مدار تمام اکانت‌ها باز باشد، فرآیند تا بازیابی اولین اکانت متوقف است
+    paused_until = [job['accounts'][account].get('paused_until') for account in active]
+    if all(paused_until):
+        eta += max(min(paused_until) - time.time(), 0.0)
+    return eta
+
+
+def _job_snapshot(job: dict) -> dict:
+    """وضعیت قابل نمایش فرآیند برای /status (قابل ذخیره به صورت JSON برای انتشار توسط worker)."""
+    snapshot = {key: job[key] for key in JOB_COUNTERS}
+    snapshot.update(
+        mode=job['mode'],
+        total_items=job['total_items'],
+        source_complete=job['source_complete'],
+        elapsed=_active_seconds(job),
+        eta=_job_eta(job),
+        paused=job['paused_at'] is not None,
+        last_status=job['last_status'],
+        accounts=job['accounts'],
+    )
+    return snapshot
+
+
+def _render_live_status(job: dict) -> str:
+    return _render_status(_job_snapshot(job),
+                          footer=f"\n\n🔄 این پیام هر {PROGRESS_UPDATE_SECONDS:g} ثانیه به‌روز می‌شود (/status).")
+
+
+def _nudge_progress(job: dict) -> None:
+    """تغییر مهم فرآیند (مکث، توقف اکانت، ...) را بدون انتظار برای نوبت بعدی در پیام زنده نشان می‌دهد."""
+    if job.get('reporter') is not None:
+        job['reporter'].nudge()
+
+
+def _control_remote_job(job: dict, control: str) -> bool:
+    """دستور 'pause'، 'resume' یا 'cancel' فرآیندی را که در پروسه worker اجرا می‌شود ثبت می‌کند."""
+    if control != 'cancel' and job['paused'] == (control == 'pause'):
+        return False
+    job['paused'] = control == 'pause'
+    job_broker.set_control(job['job_id'], control)
+    return True
+
+
+def _pause_job(job: dict) -> bool:
+    """فرآیند را به حالت مکث می‌برد؛ اگر از قبل در مکث بوده باشد False برمی‌گرداند."""
+    if job.get('remote'):
+        return _control_remote_job(job, 'pause')
+    if not job['resume_event'].is_set():
+        return False
+    job['resume_event'].clear()
+    job['paused_at'] = time.monotonic()
+    _nudge_progress(job)
+    return True
+
+
+def _unpause_job(job: dict) -> bool:
+    """فرآیند در حال مکث را ادامه می‌دهد؛ اگر در مکث نبوده باشد False برمی‌گرداند."""
+    if job.get('remote'):
+        return _control_remote_job(job, 'resume')
+    if job['resume_event'].is_set():
+        return False
+    job['paused_seconds'] += time.monotonic() - job['paused_at']
+    job['paused_at'] = None
+    job['resume_event'].set()
+    _nudge_progress(job)
+    return True
+
+
+async def _wait_for_like_budget(job: dict, cl: Client, account: str) -> None:
+    """
+    تا مجاز شدن لایک بعدی اکانت طبق بودجه روزانه (DAILY_LIKE_BUDGET) و بازه‌های مجاز
+    (LIKING_WINDOWS) صبر می‌کند. تعداد لایک‌های امروز یک بار از دفتر لایک خوانده می‌شود.
+    """
+    if not like_budget.enabled:
+        return
+    while True:
+        now = datetime.datetime.now()
+        usage = like_budget_usage.get(account)
+        if usage is None or usage[0] != now.date():
+            midnight = datetime.datetime.combine(now.date(), datetime.time()).timestamp()
+            usage = [now.date(), await asyncio.to_thread(like_ledger.count_liked_since, account, midnight)]
+            like_budget_usage[account] = usage
+        wait = like_budget.wait_seconds(usage[1], now)
+        if wait <= 0:
+            return
+        resume_at = (now + datetime.timedelta(seconds=wait)).strftime('%H:%M')
+        job['last_status'] = f"⏳ بودجه لایک {cl.username} فعلاً مصرف شده است؛ ادامه از ساعت {resume_at}"
+        # انتظارهای طولانی تکه تکه انجام می‌شوند تا تغییر روز به موقع دیده شود
+        await asyncio.sleep(min(wait, BUDGET_RECHECK_SECONDS))
+
+
+def _record_budget_like(account: str) -> None:
+    usage = like_budget_usage.get(account)
+    if usage is not None:
+        usage[1] += 1
+
+
+def _cancel_job(job: dict) -> None:
+    """
+    فرآیند را فوراً لغو می‌کند: انتظارهای سطل توکن، مکث و صف کار قطع می‌شوند و
+    درخواست‌های در حال اجرای اینستاگرام رها می‌شوند.
+    """
+    if job.get('remote'):
+        # worker فرآیند را لغو می‌کند؛ تا پایان آن، فرآیند در ربات در حال اجرا باقی می‌ماند
+        _control_remote_job(job, 'cancel')
+        return
+    job['is_running'] = False
+    job['resume_event'].set()
+    if job['workers'] is not None:
+        job['workers'].cancel()
+    if job['reconcile_task'] is not None:
+        job['reconcile_task'].cancel()
+
+
+async def _iter_user_medias(cl: Client, account: str, job: dict, work_queue: UserWorkQueue,
+                            read_limiter: AdaptiveTokenBucket):
+    """
+    کاربران صف کار را به همراه پست‌هایشان به ترتیب برمی‌گرداند.
+    خروجی هر مرحله یک سه‌تایی (user, kind, payload) است که kind یکی از
+    'known' (کاربر در دفتر لایک پوشش داده شده)، 'medias'، 'error' یا 'retry' (درخواست با
+    خطای سطح اکانت ناموفق شد و مدار اکانت باز است؛ کاربر باید به صف برگردد) است.
+    برای 'medias'، payload لیستی از (media_pk, has_liked) است؛ اگر آخرین پست‌های
+    کاربر و وضعیت لایک آن‌ها برای همین اکانت در کش موجود باشد از آن استفاده می‌شود و
+    درخواستی ارسال نمی‌شود.
+    اگر PREFETCH_USERS بزرگ‌تر از صفر باشد، پست‌های K کاربر بعدی در پس‌زمینه
+    (همزمان با خواب بعد از لایک) دریافت می‌شوند. سرعت دریافت‌ها توسط `read_limiter` تنظیم می‌شود.
+    """
+    from instagrapi.exceptions import PrivateAccount
+
     posts_per_user = job['config']['posts_per_user']
-    sleep_range = job['config']['sleep_range']
-    
-    cl.delay_range = job['config']['delay_range']
+    event_fields = {'job': job['checkpoint'].job_id, 'account': account, 'username': cl.username}
+    breaker = circuit_breakers.get(account)
+
+    async def fetch(user):
+        # قبل از هر کاری (کاربران آشنا و کش شده هم در مکث پردازش نمی‌شوند و توکن مصرف نمی‌شود)
+        # و بعد از گرفتن توکن (اگر در حین انتظار مکث شده باشد)
+        await _wait_if_paused(job)
+        # خواندن‌های SQLite (دفتر لایک و کش) event loop را متوقف نمی‌کنند
+        if await asyncio.to_thread(like_ledger.is_user_covered, account, user.pk, posts_per_user, LEDGER_USER_TTL):
+            return user, 'known', None
+
+        cached = await asyncio.to_thread(recent_media_cache.get, user.pk)
+        if cached is not None and (len(cached['pks']) >= posts_per_user or cached['complete']):
+            media_pks = cached['pks'][:posts_per_user]
+            if set(media_pks) <= await asyncio.to_thread(like_ledger.known_media, account, media_pks):
+                return user, 'known', None
+            # وضعیت لایک پست‌ها به اکانت بستگی دارد؛ بدون وضعیت این اکانت پست‌ها دوباره دریافت می‌شوند
+            liked = cached.get('liked', {}).get(account)
+            if liked is not None:
+                return user, 'medias', [(media_pk, media_pk in liked) for media_pk in media_pks]
+
+        async with metrics.timed_wait('read'):
+            await read_limiter.acquire()
+        await _wait_if_paused(job)
+        # تا بازیابی اکانت پس از خطای سطح اکانت هیچ درخواستی ارسال نمی‌شود
+        await breaker.wait_ready()
+        started_at = time.perf_counter()
+        try:
+            user_medias = await call_instagram(cl.user_medias, str(user.pk), amount=posts_per_user)
+        except Exception as e:
+            if is_throttle_error(e):
+                read_limiter.on_throttle()
+            elif isinstance(e, PrivateAccount):
+                # فقط خطای خصوصی بودن همین کاربر؛ خطاهای اکانت، پیدا نشدن و محدودیت در کش ثبت نمی‌شوند
+                await asyncio.to_thread(user_profile_cache.update, user.pk, is_private=True)
+            if classify_error(e) != 'account':
+                return user, 'error', e
+            # مدار همین‌جا باز می‌شود تا دریافت‌های پیش‌دستانه بعدی ارسال نشوند؛ بازیابی بر عهده حلقه اکانت است
+            if not breaker.is_open:
+                job['errors_account'] += 1
+                event_log.emit('error', **event_fields, user_pk=user.pk, error=type(e).__name__,
+                               message=str(e).split('\n')[0], error_class='account')
+                breaker.trip()
+            return user, 'retry', e
+        latency = time.perf_counter() - started_at
+        read_limiter.on_success()
+        breaker.on_success()
+        job_planner.observe_latency(account, 'fetch', latency)
+        recent_visits.record(account, user.pk)
+        event_log.emit('fetch', **event_fields, user_pk=user.pk, medias=len(user_medias), latency=round(latency, 3))
+
+        media_pks = [str(media.pk) for media in user_medias]
+        # وضعیت لایک اکانت‌های دیگر فقط وقتی معتبر می‌ماند که پست‌های کاربر تغییر نکرده باشند
+        liked = cached.get('liked', {}) if cached is not None and cached['pks'] == media_pks else {}
+        liked = {**liked, account: [str(media.pk) for media in user_medias if media.has_liked]}
+
+        def update_caches():
+            recent_media_cache.set(user.pk, {'pks': media_pks, 'complete': len(media_pks) < posts_per_user,
+                                             'liked': liked})
+            user_profile_cache.update(
+                user.pk,
+                has_posts=bool(user_medias),
+                last_post_at=user_medias[0].taken_at.timestamp() if user_medias and user_medias[0].taken_at else None,
+            )
+
+        try:
+            # commit های کش event loop را متوقف نمی‌کنند
+            await asyncio.to_thread(update_caches)
+        except Exception as e:
+            logger.warning(f"به‌روزرسانی کش برای کاربر {user.username} ناموفق بود: {e}")
+        return user, 'medias', [(str(media.pk), media.has_liked) for media in user_medias]
+
+    if PREFETCH_USERS <= 0:
+        while job.get('is_running', False):
+            user = await work_queue.take()
+            if user is None:
+                break
+            yield await fetch(user)
+        return
+
+    queue = asyncio.Queue(maxsize=PREFETCH_USERS)
+    in_flight = []
+
+    async def producer():
+        try:
+            while job.get('is_running', False):
+                user = await work_queue.take()
+                if user is None:
+                    break
+                in_flight.append(user)
+                await queue.put(await fetch(user))
+        except Exception as e:
+            # بدون این پیام پایانی، مصرف‌کننده برای همیشه منتظر صف می‌ماند
+            logger.error(f"خطا در دریافت پیش‌دستانه پست‌ها: {e}")
+        await queue.put(None)
+
+    producer_task = asyncio.create_task(producer())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            in_flight.remove(item[0])
+            yield item
+    finally:
+        producer_task.cancel()
+        # کاربرانی که دریافت شده‌اند ولی هنوز پردازش نشده‌اند به صف مشترک برمی‌گردند
+        for user in in_flight:
+            work_queue.give_back(user)
+
+
+async def _recover_account(cl: Client, job: dict, account_stats: dict, breaker: CircuitBreaker) -> bool:
+    """
+    اکانتی که مدار آن باز است را تا پایان مهلت متوقف نگه می‌دارد و سپس بی‌صدا از session ذخیره
+    شده دوباره وارد می‌کند؛ اگر ورود ناموفق باشد مدار با مهلت طولانی‌تر دوباره باز می‌شود.
+    اگر دفعات باز شدن مدار از BREAKER_MAX_TRIPS بگذرد False برمی‌گرداند تا اکانت از فرآیند خارج شود.
+    """
+    account = str(cl.user_id)
+    event_fields = {'job': job['checkpoint'].job_id, 'account': account, 'username': cl.username}
+    loop = asyncio.get_running_loop()
+    while not breaker.exhausted:
+        wait = max(breaker.open_until - loop.time(), 0.0)
+        account_stats['paused_until'] = time.time() + wait
+        resume_at = (datetime.datetime.now() + datetime.timedelta(seconds=wait)).strftime('%H:%M')
+        logger.warning(f"مدار اکانت {cl.username} برای بار {breaker.trips} باز شد؛ ورود دوباره در ساعت {resume_at}")
+        event_log.emit('breaker_open', **event_fields, trips=breaker.trips, cooldown=round(wait))
+        job['last_status'] = f"🔌 اکانت {cl.username} پس از خطای اکانت تا ساعت {resume_at} متوقف است."
+        _nudge_progress(job)
+        await asyncio.sleep(wait)
+        await _wait_if_paused(job)
+        try:
+            await session_manager.relogin(cl)
+        except Exception as e:
+            logger.warning(f"ورود دوباره اکانت {cl.username} ناموفق بود: {e}")
+            error_summary = str(e).split('\n')[0]
+            job['last_status'] = f"🔌 ورود دوباره اکانت {cl.username} ناموفق بود: {error_summary}"
+            breaker.trip()
+            continue
+        breaker.half_open()
+        account_stats['paused_until'] = None
+        event_log.emit('breaker_recovered', **event_fields, trips=breaker.trips)
+        job['last_status'] = f"🔌 اکانت {cl.username} دوباره وارد شد و ادامه می‌دهد."
+        _nudge_progress(job)
+        return True
+
+    account_stats['paused_until'] = None
+    account_stats['errors'] += 1
+    job['errors'] += 1
+    logger.warning(f"اکانت {cl.username} پس از {BREAKER_MAX_TRIPS} بار تلاش بازیابی نشد و از فرآیند لایک خارج شد.")
+    job['last_status'] = f"⛔ اکانت {cl.username} بازیابی نشد و متوقف شد (نیاز به /login دوباره)."
+    return False
+
+
+async def _account_worker(cl: Client, job: dict, work_queue: UserWorkQueue) -> None:
+    """
+    حلقه لایک یک اکانت؛ هر اکانت زمان‌بندی، شمارنده‌ها و خطاهای مستقل خود را دارد.
+    محدوده‌های delay_range و sleep_range اپراتور به عنوان حد پایین و بالای فاصله
+    درخواست‌های خواندن و لایک در سطل‌های توکن تطبیقی استفاده می‌شوند.
+    """
+    posts_per_user = job['config']['posts_per_user']
+    account = str(cl.user_id)
+    account_stats = job['accounts'][account]
+    read_limiter = rate_limiters.get(account, 'read', *job['config']['delay_range'])
+    like_limiter = rate_limiters.get(account, 'like', *job['config']['sleep_range'])
+    breaker = circuit_breakers.get(account)
+    event_fields = {'job': job['checkpoint'].job_id, 'account': account, 'username': cl.username}
+
+    # فاصله‌گذاری درخواست‌ها در طول فرآیند بر عهده سطل‌های توکن است
+    previous_delay_range = cl.delay_range
+    cl.delay_range = None
+    user_stream = _iter_user_medias(cl, account, job, work_queue, read_limiter)
 
     try:
-        job['total_items'] = len(users_to_process)
+        # اکانتی که در فرآیند قبلی متوقف شده است پیش از اولین درخواست بازیابی می‌شود
+        breaker.allow_retry()
+        if breaker.is_open and not await _recover_account(cl, job, account_stats, breaker):
+            return
 
-        for user in users_to_process:
+        async for user, kind, payload in user_stream:
+            # نتایج دریافت شده پیش از مکث هم تا پایان مکث پردازش نمی‌شوند
+            await _wait_if_paused(job)
             if not job.get('is_running', False):
-                await context.bot.send_message(chat_id, "🛑 عملیات لایک توسط شما لغو شد.")
+                work_queue.give_back(user)
                 break
-            
+            if kind == 'retry':
+                work_queue.give_back(user)
+            if breaker.is_open and not await _recover_account(cl, job, account_stats, breaker):
+                if kind != 'retry':
+                    work_queue.give_back(user)
+                return
+            if kind == 'retry':
+                continue
+
+            requeued = False
             try:
-                user_medias = await asyncio.to_thread(cl.user_medias, user.pk, amount=posts_per_user)
+                if kind == 'known':
+                    _count(job, account_stats, 'skipped_known')
+                    event_log.emit('skip', **event_fields, user_pk=user.pk, reason='known')
+                    job['last_status'] = f"⏭️ رد شد: پست‌های کاربر {user.username} قبلاً پوشش داده شده‌اند."
+                    continue
+                if kind == 'error':
+                    raise payload
+
+                user_medias = payload
                 if not user_medias:
+                    await asyncio.to_thread(like_ledger.mark_user_covered, account, user.pk, posts_per_user)
+                    event_log.emit('skip', **event_fields, user_pk=user.pk, reason='no_posts')
                     job['last_status'] = f"ℹ️ اطلاعات: کاربر {user.username} پستی برای لایک نداشت."
                     continue
 
-                for media in user_medias:
-                    if media.has_liked:
-                        job['already_liked'] += 1
-                        job['last_status'] = f"🟡 قبلاً لایک شده: پست کاربر {media.user.username}"
+                ledger_media = await asyncio.to_thread(like_ledger.known_media, account,
+                                                       [media_pk for media_pk, _ in user_medias])
+                for media_pk, has_liked in user_medias:
+                    if breaker.is_open:
+                        # مدار اکانت در حین پردازش این کاربر (با خطای دریافت پیش‌دستانه) باز شده است
+                        work_queue.give_back(user)
+                        requeued = True
+                        break
+
+                    if media_pk in ledger_media:
+                        _count(job, account_stats, 'already_liked')
+                        event_log.emit('skip', **event_fields, user_pk=user.pk, media_pk=media_pk, reason='ledger')
+                        job['last_status'] = f"🟡 قبلاً لایک شده (دفتر): پست کاربر {user.username}"
                         continue
 
-                    await asyncio.to_thread(cl.media_like, media.pk)
-                    job['likes_done'] += 1
-                    job['last_status'] = f"❤️‍🔥 موفق: پست کاربر {media.user.username} لایک شد."
-                    await asyncio.sleep(random.uniform(sleep_range[0], sleep_range[1]))
+                    if has_liked:
+                        await asyncio.to_thread(like_ledger.record_media, account, media_pk, user.pk,
+                                                'already_liked')
+                        _count(job, account_stats, 'already_liked')
+                        event_log.emit('skip', **event_fields, user_pk=user.pk, media_pk=media_pk, reason='already_liked')
+                        job['last_status'] = f"🟡 قبلاً لایک شده: پست کاربر {user.username}"
+                        continue
 
+                    await _wait_for_like_budget(job, cl, account)
+                    await _wait_if_paused(job)
+                    async with metrics.timed_wait('like'):
+                        await like_limiter.acquire()
+                    await _wait_if_paused(job)
+                    started_at = time.perf_counter()
+                    try:
+                        await call_instagram(cl.media_like, media_pk)
+                    except Exception as e:
+                        if is_throttle_error(e):
+                            like_limiter.on_throttle()
+                        raise
+                    latency = time.perf_counter() - started_at
+                    like_limiter.on_success()
+                    breaker.on_success()
+                    job_planner.observe_latency(account, 'like', latency)
+                    # commit دفتر لایک event loop را متوقف نمی‌کند
+                    await asyncio.to_thread(like_ledger.record_media, account, media_pk, user.pk, 'liked')
+                    _count(job, account_stats, 'likes_done')
+                    _record_budget_like(account)
+                    event_log.emit('like', **event_fields, user_pk=user.pk, media_pk=media_pk,
+                                   latency=round(latency, 3))
+                    metrics.REGISTRY.inc('liking_likes_total', account=cl.username)
+                    job['last_status'] = f"❤️‍🔥 موفق ({cl.username}): پست کاربر {user.username} لایک شد."
+
+                if not requeued:
+                    await asyncio.to_thread(like_ledger.mark_user_covered, account, user.pk, posts_per_user)
+
+            except asyncio.CancelledError:
+                # کاربر نیمه‌کاره پردازش شده در نقطه بازیابی باقی می‌ماند تا پس از ادامه دوباره بررسی شود
+                requeued = True
+                raise
             except Exception as e:
-                job['errors'] += 1
-                logger.warning(f"خطا در پردازش کاربر {user.username}: {e}")
+                error_class = classify_error(e)
                 error_summary = str(e).split('\n')[0]
+                if is_throttle_error(e) and error_class == 'transient':
+                    job['throttled'] += 1
+                    job['throttle_retries'][user.pk] += 1
+                    streak = max(read_limiter.throttle_streak, like_limiter.throttle_streak)
+                    event_log.emit('throttle', **event_fields, user_pk=user.pk, error=type(e).__name__,
+                                   message=error_summary, streak=streak)
+                    logger.warning(f"اکانت {cl.username} توسط اینستاگرام محدود شد ({streak} بار پشت سر هم): {e}")
+                    if streak >= MAX_THROTTLE_STREAK:
+                        # محدودیت‌های پشت سر هم مثل بلاک عملیات با قطع مدار اکانت مدیریت می‌شوند
+                        error_class = 'account'
+                        error_summary = f"{streak} محدودیت سرعت پشت سر هم: {error_summary}"
+                    elif job['throttle_retries'][user.pk] <= THROTTLE_RETRIES:
+                        # سطل مربوطه متوقف شده است؛ کاربر برای تلاش دوباره بعد از مکث به صف برمی‌گردد
+                        work_queue.give_back(user)
+                        requeued = True
+                        job['errors_transient'] += 1
+                        job['last_status'] = f"🐢 محدودیت سرعت برای {cl.username}، کاهش سرعت و مکث: {error_summary}"
+                        continue
+                    else:
+                        # کاربری که بارها با محدودیت سرعت روبرو شده دیگر به صف برنمی‌گردد
+                        error_class = 'user'
+
+                job[f'errors_{error_class}'] += 1
+                event_log.emit('error', **event_fields, user_pk=user.pk, error=type(e).__name__,
+                               message=error_summary, error_class=error_class)
+                if error_class == 'transient' and job['transient_retries'][user.pk] < TRANSIENT_RETRIES:
+                    job['transient_retries'][user.pk] += 1
+                    work_queue.give_back(user)
+                    requeued = True
+                    job['last_status'] = f"🔁 خطای موقت برای کاربر {user.username}، تلاش دوباره: {error_summary}"
+                    continue
+                if error_class == 'account':
+                    # اکانت تا بازیابی (در ابتدای دور بعدی حلقه) متوقف می‌شود و کاربر به صف برمی‌گردد
+                    if not requeued and job['throttle_retries'][user.pk] <= THROTTLE_RETRIES:
+                        work_queue.give_back(user)
+                        requeued = True
+                    if not breaker.is_open:
+                        breaker.trip()
+                    job['last_status'] = f"🔌 خطای اکانت {cl.username}: {error_summary}"
+                    continue
+                if error_class == 'fatal':
+                    # اکانت قابل بازیابی نیست؛ کاربر فعلی به صف برمی‌گردد تا اکانت‌های دیگر ادامه دهند
+                    work_queue.give_back(user)
+                    requeued = True
+                    account_stats['errors'] += 1
+                    job['errors'] += 1
+                    logger.warning(f"اکانت {cl.username} از فرآیند لایک خارج شد: {e}")
+                    job['last_status'] = f"⛔ اکانت {cl.username} متوقف شد: {error_summary}"
+                    return
+                _count(job, account_stats, 'errors')
+                logger.warning(f"خطا در پردازش کاربر {user.username}: {e}")
                 job['last_status'] = f"❌ خطا در پردازش کاربر {user.username}: {error_summary}"
             finally:
-                job['processed_items'] += 1
-        
-        if job.get('is_running', False):
+                if not requeued:
+                    _count(job, account_stats, 'processed_items')
+                    job['checkpoint'].record_processed(user.pk, {key: job[key] for key in JOB_COUNTERS})
+    finally:
+        account_stats['is_active'] = False
+        _nudge_progress(job)
+        await user_stream.aclose()
+        cl.delay_range = previous_delay_range
+
+
+async def _load_pool_clients(context: ContextTypes.DEFAULT_TYPE, job: dict) -> list:
+    """
+    کلاینت اصلی فرآیند و کلاینت‌های session های استخر آن (انتخاب شده با /accounts) را برمی‌گرداند.
+    کلاینت‌های بارگذاری شده برای استفاده مجدد در context نگه داشته می‌شوند.
+    """
+    primary = job['client']
+    clients = [primary]
+    seen_accounts = {str(primary.user_id)}
+    pool_clients = context.user_data.setdefault('pool_clients', {})
+
+    for session_file in job['pool_sessions']:
+        cl = pool_clients.get(session_file)
+        if cl is None:
+            try:
+                cl = await session_manager.get_client(session_file)
+            except Exception as e:
+                logger.warning(f"بارگذاری session {session_file} برای استخر اکانت‌ها ناموفق بود: {e}")
+                continue
+            pool_clients[session_file] = cl
+
+        account = str(cl.user_id)
+        if not cl.user_id or account in seen_accounts:
+            continue
+        seen_accounts.add(account)
+        clients.append(cl)
+    return clients
+
+
+def _make_user_source(cl: Client, job: dict, repeats: collections.Counter = None):
+    """
+    منبع صفحه‌بندی شده کاربران را بر اساس نوع فرآیند می‌سازد.
+    در حالت لایک از پست، تکرار کاربران در لایک‌کنندگان چند پست در `repeats` شمرده می‌شود.
+    دریافت کامل پس‌زمینه لیست دنبال‌شوندگان از سطل خواندن و مدار اکانت پیروی می‌کند، در مکث
+    فرآیند متوقف می‌شود و وظیفه آن در `job['reconcile_task']` نگه داشته می‌شود تا با لغو فرآیند لغو شود.
+    """
+    config = job['config']
+    if job['mode'] == 'post_likers':
+        from instagrapi.exceptions import MediaNotFound
+        return iter_post_likers_pages(cl, config['post_urls'], media_pk_resolver, skip_errors=(MediaNotFound,),
+                                      repeats=repeats)
+
+    account = str(cl.user_id)
+    read_limiter = rate_limiters.get(account, 'read', *config['delay_range'])
+    breaker = circuit_breakers.get(account)
+
+    async def before_reconcile_request():
+        await _wait_if_paused(job)
+        async with metrics.timed_wait('read'):
+            await read_limiter.acquire()
+        await _wait_if_paused(job)
+        await breaker.wait_ready()
+
+    def on_reconcile(task):
+        job['reconcile_task'] = task
+
+    return iter_following_snapshot(cl, following_snapshots, amount=config['users_to_check'],
+                                   before_reconcile_request=before_reconcile_request, on_reconcile=on_reconcile)
+
+def _start_liking_job(context: ContextTypes.DEFAULT_TYPE, mode: str, config: dict, checkpoint: JobCheckpoint,
+                      users: list = None, counters: dict = None, total_items: int = None,
+                      client: Client = None, pool_sessions: list = None,
+                      source_complete: bool = False, known_pks: set = None, user_id: int = None) -> None:
+    """
+    فرآیند لایک را در context ثبت و وظیفه پس‌زمینه آن را اجرا می‌کند.
+    `users` کاربرانی هستند که از قبل در نقطه بازیابی ذخیره شده‌اند. اگر `source_complete`
+    نباشد، منبع صفحه‌بندی شده کاربران (بدون کاربران `known_pks`) با اکانت اصلی ساخته
+    می‌شود تا کاربران جدید را در طول فرآیند تحویل دهد.
+    `client` و `pool_sessions` (برای فرآیندهای صف) به طور پیش‌فرض اکانت فعلی و استخر انتخاب شده هستند.
+    در حالت JOB_WORKERS فرآیند فقط برای اجرا توسط workerها در صف ماندگار ثبت می‌شود.
+    """
+    client = client or context.user_data['client']
+    if pool_sessions is None:
+        pool_sessions = context.user_data.get('pool_sessions', [])
+    if job_broker is not None and 'worker_job_id' not in context.user_data:
+        _submit_to_workers(context, mode, checkpoint, client, pool_sessions, user_id)
+        return
+
+    users = users or []
+    job = {
+        'is_running': True,
+        'mode': mode,
+        'client': client,
+        'pool_sessions': list(pool_sessions),
+        'accounts': {},
+        'start_time': time.monotonic(),
+        'last_status': "در حال آماده‌سازی...",
+        'users_to_process': users,
+        'user_source': None,
+        'source_repeats': collections.Counter(),
+        'source_complete': source_complete,
+        'total_items': total_items if total_items is not None else len(users),
+        'config': config,
+        'checkpoint': checkpoint,
+        # در حالت مکث پاک می‌شود؛ تمام درخواست‌ها پیش از ارسال منتظر آن می‌مانند
+        'resume_event': asyncio.Event(),
+        'paused_at': None,
+        'paused_seconds': 0.0,
+        # gather وظایف اکانت‌ها که هنگام لغو cancel می‌شود
+        'workers': None,
+        # دریافت کامل پس‌زمینه لیست دنبال‌شوندگان که هنگام لغو cancel می‌شود
+        'reconcile_task': None,
+        # هنگام خاموش شدن ربات True می‌شود تا نقطه بازیابی برای ادامه حفظ شود
+        'shutting_down': False,
+        # پیام زنده پیشرفت فرآیند (ProgressReporter) در صورت فعال بودن
+        'reporter': None,
+        # تعداد تلاش‌های دوباره هر کاربر پس از خطای موقت
+        'transient_retries': collections.Counter(),
+        # تعداد دفعاتی که پردازش هر کاربر با محدودیت سرعت متوقف شده است
+        'throttle_retries': collections.Counter(),
+    }
+    job['resume_event'].set()
+    if not source_complete:
+        job['user_source'] = _make_user_source(client, job, job['source_repeats'])
+        if known_pks:
+            job['user_source'] = skip_known_users(job['user_source'], known_pks)
+    for key in JOB_COUNTERS:
+        job[key] = (counters or {}).get(key, 0)
+    # شمارنده‌های اجراهای قبلی فرآیند ادامه داده شده در سابقه برنامه‌ریز تکرار نمی‌شوند
+    job['counters_at_start'] = dict(counters or {})
+    context.user_data['liking_job'] = job
+    job['task'] = asyncio.create_task(liking_task(context))
+
+def _submit_to_workers(context: ContextTypes.DEFAULT_TYPE, mode: str, checkpoint: JobCheckpoint,
+                       client: Client, pool_sessions: list, user_id: int = None) -> None:
+    """فرآیند را در صف ماندگار workerها ثبت و به جای آن یک نماینده در context نگه می‌دارد."""
+    chat_id = context.user_data['chat_id']
+    checkpoint.close()
+    session_file = session_manager.file_of(client) or context.user_data['session_file']
+    # در چت خصوصی ربات شناسه چت و کاربر یکی است
+    job_broker.submit(checkpoint.job_id, chat_id, user_id or chat_id, session_file, list(pool_sessions), mode)
+    context.user_data['liking_job'] = _remote_job(checkpoint.job_id, chat_id, mode)
+
+def _remote_job(job_id: str, chat_id: int, mode: str, paused: bool = False) -> dict:
+    """نماینده فرآیندی که در پروسه worker اجرا می‌شود؛ /status و دستورهای کنترلی از طریق صف ماندگار کار می‌کنند."""
+    return {'remote': True, 'job_id': job_id, 'chat_id': chat_id, 'mode': mode, 'is_running': True, 'paused': paused}
+
+def _filter_cached_profiles(job: dict, users: list) -> list:
+    """
+    کاربرانی را که طبق کش پروفایل‌ها پستی ندارند (یا در حالت لایک از پست خصوصی هستند)
+    و کاربرانی را که تمام اکانت‌های فرآیند در بازه VISIT_COOLDOWN_HOURS بازدید کرده‌اند حذف می‌کند.
+    """
+    accounts = list(job['accounts'])
+    now = time.time()
+    kept = []
+    for user in users:
+        profile = user_profile_cache.get(user.pk)
+        if profile and (profile.get('has_posts') is False
+                        or (job['mode'] == 'post_likers' and profile.get('is_private'))):
+            job['filtered_cached'] += 1
+            event_log.emit('skip', job=job['checkpoint'].job_id, user_pk=user.pk, reason='cached_profile')
+            continue
+        if recent_visits.enabled and all(recent_visits.visited_recently(a, user.pk, now) for a in accounts):
+            job['skipped_recent'] += 1
+            event_log.emit('skip', job=job['checkpoint'].job_id, user_pk=user.pk, reason='recent_visit')
+            continue
+        kept.append(user)
+    return kept
+
+async def _put_ranked(job: dict, work_queue: UserWorkQueue, users: list) -> None:
+    """امتیاز کاربران را از داده‌های محلی (بدون درخواست) محاسبه و آن‌ها را به صف کار اضافه می‌کند."""
+    if not users:
+        return
+    try:
+        scores = await asyncio.to_thread(user_ranker.score_page, list(job['accounts']), users)
+    except Exception as e:
+        # بدون امتیاز، کاربران به ترتیب منبع پردازش می‌شوند
+        logger.warning(f"امتیازدهی کاربران ناموفق بود: {e}")
+        scores = [0.0] * len(users)
+    for user, score in zip(users, scores):
+        await work_queue.put(user, score)
+
+async def _feed_work_queue(context: ContextTypes.DEFAULT_TYPE, job: dict, work_queue: UserWorkQueue) -> None:
+    """
+    کاربران ذخیره شده و سپس صفحات منبع را به صف کار منتقل می‌کند.
+    هر صفحه جدید پیش از ورود به صف در نقطه بازیابی ثبت می‌شود.
+    """
+    checkpoint = job['checkpoint']
+    try:
+        batch = []
+        for user in job.pop('users_to_process'):
+            batch.append(user)
+            if len(batch) >= RANKING_BATCH_SIZE:
+                await _put_ranked(job, work_queue, batch)
+                batch = []
+        await _put_ranked(job, work_queue, batch)
+
+        if job['user_source'] is not None:
+            async for page in job['user_source']:
+                page = _filter_cached_profiles(job, page)
+                await asyncio.to_thread(checkpoint.add_users, page)
+                job['total_items'] += len(page)
+                # کاربرانی که در لایک‌کنندگان پست‌های دیگر هم دیده شده‌اند جلوتر می‌روند
+                for user_pk, count in job['source_repeats'].items():
+                    work_queue.boost(user_pk, APPEARANCE_WEIGHT * count)
+                job['source_repeats'].clear()
+                await _put_ranked(job, work_queue, page)
+                # صفحه بعدی منبع در حالت مکث درخواست نمی‌شود
+                await _wait_if_paused(job)
+            checkpoint.mark_source_complete()
+            job['source_complete'] = True
+    except Exception as e:
+        logger.error(f"خطا در دریافت لیست کاربران: {e}")
+        error_summary = str(e).split('\n')[0]
+        job['last_status'] = f"🚨 خطا در دریافت لیست کاربران: {error_summary}"
+        await context.bot.send_message(
+            context.user_data['chat_id'],
+            f"🚨 دریافت ادامه لیست کاربران با خطا متوقف شد: {e}\n"
+            "کاربران دریافت شده پردازش می‌شوند و بعداً می‌توانید با /resume_liking ادامه دهید."
+        )
+    finally:
+        work_queue.close()
+
+async def liking_task(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """وظیفه پس‌زمینه که حلقه لایک کردن را با تمام اکانت‌های استخر اجرا می‌کند."""
+    chat_id = context.user_data['chat_id']
+    job = context.user_data['liking_job']
+
+    checkpoint = job['checkpoint']
+    feeder_task = None
+    work_queue = None
+
+    try:
+        clients = await _load_pool_clients(context, job)
+        job['accounts'] = {
+            str(cl.user_id): {
+                'username': cl.username,
+                'is_active': True,
+                'processed_items': 0,
+                'likes_done': 0,
+                'already_liked': 0,
+                'skipped_known': 0,
+                'errors': 0,
+                # زمان (unix) پایان توقف اکانت پس از باز شدن مدار آن
+                'paused_until': None,
+            }
+            for cl in clients
+        }
+
+        for account in job['accounts']:
+            await asyncio.to_thread(recent_visits.load, account)
+        event_log.emit('job_start', job=checkpoint.job_id, mode=job['mode'],
+                       accounts=[cl.username for cl in clients], resumed_users=job['total_items'])
+        if PROGRESS_UPDATE_SECONDS > 0:
+            reporter = ProgressReporter(context.bot, chat_id, partial(_render_live_status, job),
+                                        PROGRESS_UPDATE_SECONDS, PROGRESS_MIN_EDIT_INTERVAL)
+            try:
+                await reporter.start()
+                job['reporter'] = reporter
+            except TelegramError as e:
+                logger.warning(f"ارسال پیام زنده پیشرفت ناموفق بود: {e}")
+
+        work_queue = UserWorkQueue(maxsize=WORK_QUEUE_SIZE)
+        active_work_queues.add(work_queue)
+        feeder_task = asyncio.create_task(_feed_work_queue(context, job, work_queue))
+        job['workers'] = asyncio.gather(*(_account_worker(cl, job, work_queue) for cl in clients))
+        try:
+            await job['workers']
+        except asyncio.CancelledError:
+            # لغو توسط کاربر؛ در غیر این صورت خود وظیفه لغو شده است
+            if job.get('is_running', False):
+                raise
+
+        if job['shutting_down'] and 'worker_job_id' in context.user_data:
+            # فرآیند به صف workerها برمی‌گردد و worker دیگری آن را از نقطه بازیابی ادامه می‌دهد
+            checkpoint.close()
+        elif job['shutting_down']:
+            checkpoint.close()
+            await context.bot.send_message(
+                chat_id,
+                f"⏸ ربات در حال خاموش شدن است؛ فرآیند لایک پس از بررسی <b>{job['processed_items']}</b> کاربر ذخیره شد.\n"
+                "پس از راه‌اندازی مجدد، با /resume_liking می‌توانید آن را ادامه دهید.",
+                parse_mode='HTML'
+            )
+        elif not job.get('is_running', False):
+            checkpoint.finish()
+            await context.bot.send_message(chat_id, "🛑 عملیات لایک توسط شما لغو شد.")
+        elif not job['source_complete'] or job['processed_items'] < job['total_items']:
+            # تمام اکانت‌ها یا منبع کاربران پیش از پایان صف متوقف شده‌اند؛ نقطه بازیابی برای ادامه حفظ می‌شود
+            checkpoint.close()
+            await context.bot.send_message(
+                chat_id,
+                f"⚠️ فرآیند لایک پس از بررسی <b>{job['processed_items']}</b> از <b>{job['total_items']}</b> کاربر متوقف شد.\n"
+                f"❤️‍🔥 لایک‌های موفق: <b>{job['likes_done']}</b>\n\n"
+                "پس از رفع مشکل اکانت، با /resume_liking می‌توانید فرآیند را ادامه دهید.",
+                parse_mode='HTML'
+            )
+        else:
+            checkpoint.finish()
             final_report = (
                 f"🎉 <b>گزارش نهایی عملیات</b> 🎉\n\n"
-                f"تعداد کل کاربران بررسی شده: <b>{job['total_items']}</b>\n"
+                f"تعداد کل کاربران بررسی شده: <b>{job['processed_items']}</b> از <b>{job['total_items']}</b>\n"
+                f"👤 تعداد اکانت‌ها: <b>{len(clients)}</b>\n"
                 f"❤️‍🔥 لایک‌های موفق: <b>{job['likes_done']}</b>\n"
                 f"🟡 از قبل لایک شده: <b>{job['already_liked']}</b>\n"
+                f"⏭️ کاربران رد شده (دفتر لایک): <b>{job['skipped_known']}</b>\n"
+                f"🕒 کاربران رد شده (بازدید اخیر): <b>{job['skipped_recent']}</b>\n"
                 f"❌ خطاها: <b>{job['errors']}</b>"
             )
             await context.bot.send_message(chat_id, final_report, parse_mode='HTML')
 
     except Exception as e:
         logger.error(f"خطای جدی در وظیفه پس‌زمینه لایک: {e}")
-        await context.bot.send_message(chat_id, f"🚨 یک خطای جدی در وظیفه لایک رخ داد: {e}")
+        checkpoint.close()
+        await context.bot.send_message(chat_id, f"🚨 یک خطای جدی در وظیفه لایک رخ داد: {e}\nبرای ادامه از /resume_liking استفاده کنید.")
     finally:
-        if 'liking_job' in context.user_data:
+        # خطوط پیشرفتی که هنوز روی دیسک نوشته نشده‌اند (حتی اگر خود وظیفه لغو شده باشد)
+        checkpoint.close()
+        if job['reporter'] is not None:
+            await job['reporter'].close(
+                _render_status(_job_snapshot(job), footer="\n\n🏁 به‌روزرسانی این پیام متوقف شد."))
+        event_log.emit('job_end', job=checkpoint.job_id, cancelled=not job.get('is_running', False),
+                       shutting_down=job['shutting_down'], **{key: job[key] for key in JOB_COUNTERS})
+        try:
+            job_planner.record_job(job['mode'], {key: job[key] - job['counters_at_start'].get(key, 0)
+                                                 for key in JOB_COUNTERS}, job['config']['posts_per_user'])
+            await asyncio.to_thread(job_planner.save)
+        except Exception as e:
+            logger.warning(f"ذخیره سابقه برنامه‌ریز فرآیندها ناموفق بود: {e}")
+        if feeder_task is not None:
+            feeder_task.cancel()
+        active_work_queues.discard(work_queue)
+        if context.user_data.get('liking_job') is job:
             del context.user_data['liking_job']
+        # در پروسه worker صف چت‌ها در اختیار ربات است
+        if not job['shutting_down'] and 'worker_job_id' not in context.user_data:
+            try:
+                await _start_next_queued_job(context, chat_id)
+            except Exception as e:
+                logger.error(f"خطا در شروع فرآیند بعدی صف: {e}")
 
-@admin_only
-async def liking_from_post_setup_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """شروع مکالمه برای تنظیمات لایک از پست."""
+
+# --- بخش صف و زمان‌بندی فرآیندها ---
+def _queue_note(context: ContextTypes.DEFAULT_TYPE) -> str:
+    """توضیح سرنوشت فرآیندی که در حال تنظیم است (زمان‌بندی، صف یا شروع فوری)."""
+    if 'schedule_at' in context.user_data:
+        return f"⏰ این فرآیند پس از تنظیم هر روز ساعت <b>{context.user_data['schedule_at']}</b> اجرا می‌شود.\n\n"
     if context.user_data.get('liking_job', {}).get('is_running'):
-        await update.message.reply_text("⏳ یک فرآیند لایک دیگر در حال اجراست.")
+        return "📋 یک فرآیند لایک دیگر در حال اجراست؛ این فرآیند پس از تنظیم به صف اضافه می‌شود.\n\n"
+    return ""
+
+async def _recent_visits_note(context: ContextTypes.DEFAULT_TYPE) -> str:
+    """تعداد کاربرانی که اکانت فعلی به تازگی بازدید کرده و در فرآیند بدون درخواست رد می‌شوند."""
+    if not recent_visits.enabled:
+        return ""
+    account = str(context.user_data['client'].user_id)
+    await asyncio.to_thread(recent_visits.load, account)
+    count = await asyncio.to_thread(recent_visits.count_recent, account)
+    if not count:
+        return ""
+    return (f"🕒 <b>{count}</b> کاربر در {VISIT_COOLDOWN / 3600:g} ساعت گذشته بررسی شده‌اند "
+            "و در این فرآیند بدون درخواست رد می‌شوند.\n\n")
+
+async def _following_snapshot_note(context: ContextTypes.DEFAULT_TYPE) -> str:
+    """اندازه و زمان لیست ذخیره شده دنبال‌شوندگان اکانت فعلی که فرآیند از آن شروع می‌کند."""
+    account = str(context.user_data['client'].user_id)
+    snapshot = await asyncio.to_thread(following_snapshots.load, account)
+    if not snapshot or not snapshot['users']:
+        return ""
+    synced_at = datetime.datetime.fromtimestamp(snapshot['synced_at']).strftime('%Y-%m-%d %H:%M')
+    scope = "" if snapshot['complete'] else "ابتدای "
+    return (f"📇 {scope}لیست دنبال‌شوندگان (<b>{len(snapshot['users'])}</b> کاربر، دریافت شده در {synced_at}) "
+            "ذخیره شده است؛ فقط دنبال‌شدگان جدید از اینستاگرام دریافت می‌شوند.\n\n")
+
+async def _queue_or_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE, mode: str, config: dict) -> bool:
+    """
+    اگر با /schedule ساعتی انتخاب شده باشد فرآیند را زمان‌بندی و اگر فرآیند دیگری در حال
+    اجرا باشد آن را به صف اضافه می‌کند. در غیر این صورت False برمی‌گرداند تا فرآیند همین حالا شروع شود.
+    """
+    chat_id = update.effective_chat.id
+    schedule_at = context.user_data.pop('schedule_at', None)
+    if schedule_at is None and not context.user_data.get('liking_job', {}).get('is_running'):
+        return False
+    if not context.user_data.get('session_file'):
+        # فرآیندهای صف و زمان‌بندی بعداً با session ذخیره شده اکانت اجرا می‌شوند
+        await context.bot.send_message(
+            chat_id,
+            "🚨 session این اکانت ذخیره نشده است و فرآیند را نمی‌توان به صف اضافه یا زمان‌بندی کرد.\n"
+            "لطفاً دوباره با /login وارد شوید یا پس از پایان فرآیند فعلی دوباره تلاش کنید."
+        )
+        return True
+    entry = dict(
+        chat_id=chat_id,
+        user_id=update.effective_user.id,
+        session_file=context.user_data['session_file'],
+        mode=mode,
+        config=config,
+        pool_sessions=context.user_data.get('pool_sessions', []),
+    )
+    if schedule_at is not None:
+        schedule = job_scheduler.add_schedule(at=schedule_at, **entry)
+        _register_schedule(context.job_queue, schedule)
+        await context.bot.send_message(
+            chat_id,
+            f"⏰ این فرآیند هر روز ساعت <b>{schedule_at}</b> به صف اضافه و اجرا می‌شود.\n"
+            "برای مشاهده و حذف زمان‌بندی‌ها از /queue استفاده کنید.",
+            parse_mode='HTML'
+        )
+        return True
+
+    queued = job_scheduler.enqueue(**entry)
+    position = job_scheduler.pending(chat_id).index(queued) + 1
+    await context.bot.send_message(
+        chat_id,
+        f"📋 فرآیند در جایگاه <b>{position}</b> صف قرار گرفت و پس از پایان فرآیند فعلی به صورت خودکار شروع می‌شود.\n"
+        "برای تغییر اولویت یا حذف آن از /queue استفاده کنید.",
+        parse_mode='HTML'
+    )
+    return True
+
+async def _start_next_queued_job(context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> None:
+    """اگر فرآیندی در حال اجرا نباشد، فرآیند بعدی صف چت را با session ثبت شده آن شروع می‌کند."""
+    while not context.user_data.get('liking_job', {}).get('is_running'):
+        entry = job_scheduler.pop_next(chat_id)
+        if entry is None:
+            return
+        username = "-"
+        try:
+            username = session_manager.username_of(entry['session_file'])
+            cl = await session_manager.get_client(entry['session_file'])
+            checkpoint = await asyncio.to_thread(JobCheckpoint.create, JOBS_DIR, chat_id, entry['mode'], entry['config'])
+        except Exception as e:
+            logger.error(f"شروع فرآیند صف برای اکانت {username} ناموفق بود: {e}")
+            await context.bot.send_message(chat_id, f"🚨 شروع فرآیند صف برای اکانت {username} ناموفق بود: {e}")
+            continue
+
+        context.user_data['chat_id'] = chat_id
+        _start_liking_job(context, entry['mode'], entry['config'], checkpoint,
+                          client=cl, pool_sessions=entry['pool_sessions'], user_id=entry['user_id'])
+        title = "لایک از پست" if entry['mode'] == 'post_likers' else "لایک دنبال‌شوندگان"
+        await context.bot.send_message(
+            chat_id,
+            f"🚀 فرآیند <b>{title}</b> از صف برای اکانت <b>{html.escape(cl.username or username)}</b> شروع شد.\n"
+            f"📋 فرآیندهای باقی‌مانده در صف: <b>{len(job_scheduler.pending(chat_id))}</b>\n"
+            "برای لغو از /cancel_liking استفاده کنید.",
+            parse_mode='HTML'
+        )
+
+def _register_schedule(job_queue, schedule: dict) -> None:
+    """زمان‌بندی روزانه را در JobQueue ربات ثبت می‌کند."""
+    at = datetime.datetime.strptime(schedule['at'], '%H:%M').time().replace(tzinfo=LOCAL_TZ)
+    job_queue.run_daily(run_scheduled_job, at, data=schedule['id'], name=f"schedule:{schedule['id']}",
+                        chat_id=schedule['chat_id'], user_id=schedule['user_id'])
+
+async def run_scheduled_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """فرآیند یک زمان‌بندی روزانه را به صف اضافه و در صورت آزاد بودن صف شروع می‌کند."""
+    schedule = job_scheduler.get_schedule(context.job.data)
+    if schedule is None:
+        context.job.schedule_removal()
+        return
+    if job_scheduler.is_queued(schedule['id']):
+        # اجرای دیروز هنوز در صف منتظر است؛ اجرای تکراری اضافه نمی‌شود
+        logger.info(f"زمان‌بندی {schedule['id']} از اجرای قبلی هنوز در صف است.")
+        return
+    job_scheduler.enqueue(schedule['chat_id'], schedule['user_id'], schedule['session_file'], schedule['mode'],
+                          schedule['config'], priority=schedule['priority'],
+                          pool_sessions=schedule['pool_sessions'], schedule_id=schedule['id'])
+    await _start_next_queued_job(context, schedule['chat_id'])
+
+def _describe_entry(entry: dict, label: str) -> str:
+    """خلاصه یک فرآیند صف یا زمان‌بندی برای نمایش در /queue."""
+    title = "لایک از پست" if entry['mode'] == 'post_likers' else "لایک دنبال‌شوندگان"
+    config = entry['config']
+    if entry['mode'] == 'post_likers':
+        target = f"{len(config['post_urls'])} لینک"
+    else:
+        target = f"{config['users_to_check'] or 'تمام'} دنبال‌شونده"
+    pool = f" (+{len(entry['pool_sessions'])} اکانت کمکی)" if entry['pool_sessions'] else ""
+    return (
+        f"{label} <b>{title}</b>\n"
+        f"👤 اکانت: <b>{html.escape(session_manager.username_of(entry['session_file']))}</b>{pool}\n"
+        f"🎯 {target}، {config['posts_per_user']} پست از هر کاربر\n"
+        f"⭐️ اولویت: <b>{PRIORITY_NAMES[entry['priority']]}</b>"
+    )
+
+def _entry_keyboard(entry: dict) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("⬆️ اولویت", callback_data=f"queue_up:{entry['id']}"),
+        InlineKeyboardButton("⬇️ اولویت", callback_data=f"queue_down:{entry['id']}"),
+        InlineKeyboardButton("🗑 حذف", callback_data=f"queue_remove:{entry['id']}"),
+    ]])
+
+def _entry_label(entry: dict, chat_id: int) -> str:
+    if 'at' in entry:
+        return f"⏰ هر روز ساعت {entry['at']}:"
+    pending = job_scheduler.pending(chat_id)
+    return f"📋 جایگاه {pending.index(entry) + 1} صف:" if entry in pending else "📋"
+
+@admin_only
+async def show_queue(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """فرآیندهای صف و زمان‌بندی‌های روزانه این چت را برای مدیریت نمایش می‌دهد."""
+    chat_id = update.effective_chat.id
+    context.user_data['chat_id'] = chat_id
+    entries = job_scheduler.pending(chat_id) + job_scheduler.chat_schedules(chat_id)
+    if not entries:
+        await update.message.reply_text(
+            "📭 صف فرآیندها خالی است و هیچ زمان‌بندی‌ای ثبت نشده است.\n"
+            "فرآیندهایی که هنگام اجرای یک فرآیند دیگر تنظیم شوند به صف اضافه می‌شوند و با /schedule "
+            "می‌توانید یک فرآیند روزانه بسازید."
+        )
+        return
+    for entry in entries:
+        await update.message.reply_html(_describe_entry(entry, _entry_label(entry, chat_id)),
+                                        reply_markup=_entry_keyboard(entry))
+
+@admin_only
+async def handle_queue_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """تغییر اولویت یا حذف یک فرآیند صف یا زمان‌بندی را مدیریت می‌کند."""
+    query = update.callback_query
+    await query.answer()
+
+    action, entry_id = query.data.split(':', 1)
+    entry = job_scheduler.get(entry_id)
+    if entry is None:
+        await query.edit_message_text("🤔 این فرآیند دیگر در صف نیست.")
+        return
+
+    if action == 'queue_remove':
+        job_scheduler.remove(entry_id)
+        for scheduled in context.job_queue.get_jobs_by_name(f"schedule:{entry_id}"):
+            scheduled.schedule_removal()
+        await query.edit_message_text("🗑 از صف حذف شد.")
+        return
+
+    job_scheduler.set_priority(entry_id, entry['priority'] + (1 if action == 'queue_up' else -1))
+    await query.edit_message_text(_describe_entry(entry, _entry_label(entry, update.effective_chat.id)),
+                                  reply_markup=_entry_keyboard(entry), parse_mode='HTML')
+
+@admin_only
+async def schedule_liking(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """ساعت اجرای روزانه فرآیندی را که در ادامه تنظیم می‌شود ثبت می‌کند (مثال: /schedule 08:30)."""
+    if 'client' not in context.user_data:
+        await update.message.reply_text("🔒 شما هنوز وارد حساب اینستاگرام خود نشده‌اید. لطفاً ابتدا از دستور /login استفاده کنید.")
+        return
+    try:
+        at = datetime.datetime.strptime(context.args[0], '%H:%M').strftime('%H:%M')
+    except (IndexError, ValueError):
+        await update.message.reply_html(
+            "⏰ ساعت اجرای روزانه را همراه دستور وارد کنید (مثال: <code>/schedule 08:30</code>).\n"
+            "سپس فرآیند را مثل همیشه با /like_following یا ارسال لینک پست‌ها تنظیم کنید؛ "
+            "به جای شروع فوری، هر روز در همین ساعت با اکانت فعلی اجرا می‌شود."
+        )
+        return
+    context.user_data['schedule_at'] = at
+    await update.message.reply_html(
+        f"⏰ فرآیند بعدی که تنظیم کنید هر روز ساعت <b>{at}</b> اجرا می‌شود.\n"
+        "اکنون از /like_following استفاده کنید یا لینک پست‌ها را ارسال کنید. برای انصراف /cancel را بزنید."
+    )
+
+async def start_scheduler(application: Application) -> None:
+    """زمان‌بندی‌های ذخیره شده را ثبت و صف چت‌هایی را که فرآیند ناتمامی ندارند شروع می‌کند."""
+    for schedule in job_scheduler.schedules:
+        _register_schedule(application.job_queue, schedule)
+    for chat_id, user_id in job_scheduler.chats_with_pending():
+        if _unfinished_checkpoints(chat_id):
+            # ابتدا فرآیند ناتمام باید با /resume_liking ادامه داده یا حذف شود
+            continue
+        context = ContextTypes.DEFAULT_TYPE(application, chat_id=chat_id, user_id=user_id)
+        try:
+            await _start_next_queued_job(context, chat_id)
+        except Exception as e:
+            logger.error(f"شروع صف فرآیندهای چت {chat_id} ناموفق بود: {e}")
+
+
+# --- بخش پیش‌نمایش فرآیند ---
+# حداکثر تعداد پست‌هایی که تعداد لایک‌هایشان برای پیش‌نمایش درخواست می‌شود؛ بقیه برون‌یابی می‌شوند
+PREVIEW_MEDIA_LOOKUPS = 5
+# فرآیندهای طولانی‌تر از این مدت (ثانیه) در پیش‌نمایش با هشدار نمایش داده می‌شوند
+PREVIEW_LONG_JOB = 12 * 3600
+
+async def _expected_users(cl: Client, mode: str, config: dict) -> int:
+    """تعداد کاربران منبع فرآیند برای پیش‌نمایش (حداکثر چند درخواست سبک)."""
+    if mode == 'following':
+        if config['users_to_check']:
+            return config['users_to_check']
+        snapshot = await asyncio.to_thread(following_snapshots.load, str(cl.user_id))
+        if snapshot and snapshot['complete']:
+            return len(snapshot['users'])
+        user = await call_instagram(cl.user_info, str(cl.user_id))
+        return user.following_count
+    urls = config['post_urls']
+    like_counts = []
+    for url in urls[:PREVIEW_MEDIA_LOOKUPS]:
+        media_pk = await media_pk_resolver.resolve(cl, url)
+        media = await call_instagram(cl.media_info, media_pk)
+        like_counts.append(media.like_count)
+    return round(sum(like_counts) / len(like_counts) * len(urls))
+
+async def _plan_preview(context: ContextTypes.DEFAULT_TYPE, mode: str, config: dict) -> str:
+    """پیش‌نمایش مدت، لایک‌ها و درخواست‌های فرآیند پیش از تایید اپراتور (بدون شروع آن)."""
+    cl = context.user_data['client']
+    pool_clients = context.user_data.get('pool_clients', {})
+    accounts = {str(cl.user_id)}
+    for session_file in context.user_data.get('pool_sessions', []):
+        pool_client = pool_clients.get(session_file)
+        accounts.add(str(pool_client.user_id) if pool_client is not None else session_file)
+    estimate = partial(job_planner.estimate, mode, config, accounts=sorted(accounts),
+                       prefetch=PREFETCH_USERS > 0, budget=like_budget)
+
+    try:
+        users = await _expected_users(cl, mode, config)
+    except Exception as e:
+        logger.warning(f"دریافت تعداد کاربران برای پیش‌نمایش فرآیند ناموفق بود: {e}")
+        users = None
+    if users is None:
+        plan = estimate(100)
+        return (
+            "🧮 <b>پیش‌نمایش فرآیند</b>\n\n"
+            "👥 تعداد کاربران از پیش مشخص نیست.\n"
+            f"⏱️ هر ۱۰۰ کاربر: حدود <b>{_format_duration(plan['seconds'])}</b> "
+            f"و <b>{plan['requests']}</b> درخواست با <b>{plan['accounts']}</b> اکانت\n\n"
+        )
+
+    plan = estimate(users)
+    notes = ""
+    if plan['limited_by'] == 'budget':
+        notes += "📅 مدت فرآیند به دلیل بودجه روزانه لایک (DAILY_LIKE_BUDGET) طولانی‌تر شده است.\n"
+    elif plan['limited_by'] == 'windows':
+        notes += "🕰 لایک فقط در بازه‌های مجاز روز (LIKING_WINDOWS) انجام می‌شود.\n"
+    if plan['seconds'] > PREVIEW_LONG_JOB:
+        notes += ("⚠️ این فرآیند طولانی است؛ برای کوتاه‌تر شدن آن تعداد کاربران یا پست‌ها را کم کنید "
+                  "یا با /accounts اکانت‌های بیشتری به استخر اضافه کنید.\n")
+    return (
+        "🧮 <b>پیش‌نمایش فرآیند</b>\n\n"
+        f"👥 کاربران برای بررسی: حدود <b>{plan['users']}</b> از <b>{users}</b>\n"
+        f"❤️‍🔥 لایک‌های مورد انتظار: حدود <b>{plan['likes']}</b>\n"
+        f"📨 درخواست‌ها به اینستاگرام: حدود <b>{plan['requests']}</b>\n"
+        f"👤 تعداد اکانت‌ها: <b>{plan['accounts']}</b>\n"
+        f"⏱️ مدت تخمینی: <b>{_format_duration(plan['seconds'])}</b>\n\n"
+        f"{notes}"
+    )
+
+async def _send_plan_preview(update: Update, context: ContextTypes.DEFAULT_TYPE, mode: str) -> None:
+    """تنظیمات کامل شده را با پیش‌نمایش فرآیند و دکمه‌های تایید/لغو برای اپراتور می‌فرستد."""
+    context.user_data['liking_job_mode'] = mode
+    keyboard = InlineKeyboardMarkup([[
+        InlineKeyboardButton("🚀 شروع فرآیند", callback_data='liking_start'),
+        InlineKeyboardButton("✖️ لغو", callback_data='liking_abort'),
+    ]])
+    preview = await _plan_preview(context, mode, context.user_data['liking_job_config'])
+    await update.message.reply_text(f"{preview}آیا فرآیند با این تنظیمات شروع شود؟",
+                                    parse_mode='HTML', reply_markup=keyboard)
+
+@admin_only
+async def handle_liking_confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """پاسخ اپراتور به پیش‌نمایش را مدیریت و در صورت تایید فرآیند را شروع (یا زمان‌بندی یا صف) می‌کند."""
+    query = update.callback_query
+    await query.answer()
+    mode = context.user_data.pop('liking_job_mode', None)
+    config = context.user_data.pop('liking_job_config', None)
+    if query.data == 'liking_abort' or config is None:
+        context.user_data.pop('schedule_at', None)
+        await query.edit_message_text("🛑 فرآیند شروع نشد.")
         return ConversationHandler.END
 
+    await query.edit_message_reply_markup(reply_markup=None)
+    chat_id = update.effective_chat.id
+    title = "لایک از پست" if mode == 'post_likers' else "لایک دنبال‌شوندگان"
+    try:
+        if await _queue_or_schedule(update, context, mode, config):
+            return ConversationHandler.END
+        checkpoint = await asyncio.to_thread(JobCheckpoint.create, JOBS_DIR, chat_id, mode, config)
+        _start_liking_job(context, mode, config, checkpoint, user_id=update.effective_user.id)
+        if mode == 'post_likers':
+            started = (f"🚀 شروع فرآیند لایک برای لایک‌کنندگان <b>{len(config['post_urls'])}</b> لینک...\n"
+                       "لایک کردن با رسیدن لایک‌کنندگان اولین پست شروع می‌شود و بقیه در پس‌زمینه دریافت می‌شوند.\n")
+        else:
+            started = ("🚀 شروع فرآیند لایک دنبال‌شوندگان...\n"
+                       "لایک کردن با رسیدن اولین صفحه از لیست دنبال‌شوندگان شروع می‌شود و بقیه در پس‌زمینه دریافت می‌شوند.\n")
+        await context.bot.send_message(chat_id, f"{started}برای لغو از /cancel_liking استفاده کنید.", parse_mode='HTML')
+    except Exception as e:
+        logger.error(f"خطا در شروع فرآیند {title}: {e}")
+        await context.bot.send_message(chat_id, f"🚨 خطایی در شروع فرآیند {title} رخ داد: {e}")
+    return ConversationHandler.END
+
+
+# --- بخش مدیریت استخر اکانت‌ها ---
+def _accounts_keyboard(context: ContextTypes.DEFAULT_TYPE) -> InlineKeyboardMarkup:
+    """کیبورد انتخاب session ها برای اضافه شدن به استخر اکانت‌ها را می‌سازد."""
+    selected = set(context.user_data.get('pool_sessions', []))
+    keyboard = []
+    for session_file in session_manager.list_files():
+        mark = "✅" if session_file in selected else "⬜️"
+        label = session_manager.username_of(session_file)
+        keyboard.append([InlineKeyboardButton(f"{mark} {label}", callback_data=f"pool_toggle:{session_file}")])
+    return InlineKeyboardMarkup(keyboard)
+
+@admin_only
+async def accounts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """لیست session های ذخیره شده را برای اضافه کردن به فرآیندهای لایک نمایش می‌دهد."""
+    context.user_data['chat_id'] = update.effective_chat.id
+    if not session_manager.list_files():
+        await update.message.reply_text("🤔 هیچ session ذخیره شده‌ای پیدا نشد.")
+        return
+
+    await update.message.reply_text(
+        "👥 session هایی که باید در کنار اکانت فعلی در فرآیندهای لایک استفاده شوند را انتخاب کنید.\n"
+        "کاربران بین تمام اکانت‌های انتخاب شده تقسیم می‌شوند.",
+        reply_markup=_accounts_keyboard(context)
+    )
+
+@admin_only
+async def handle_accounts_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """انتخاب یا حذف یک session از استخر اکانت‌ها را مدیریت می‌کند."""
+    query = update.callback_query
+    await query.answer()
+
+    session_file = query.data.split(':', 1)[1]
+    pool_sessions = context.user_data.setdefault('pool_sessions', [])
+    if session_file in pool_sessions:
+        pool_sessions.remove(session_file)
+        context.user_data.get('pool_clients', {}).pop(session_file, None)
+    elif session_file in session_manager.list_files():
+        pool_sessions.append(session_file)
+    session_manager.set_active(update.effective_user.id, pool_sessions=pool_sessions)
+
+    await query.edit_message_reply_markup(reply_markup=_accounts_keyboard(context))
+
+@admin_only
+async def liking_from_post_setup_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """شروع مکالمه برای تنظیمات لایک از پست."""
     if 'client' not in context.user_data:
         await update.message.reply_text("🔒 شما هنوز وارد حساب اینستاگرام خود نشده‌اید. لطفاً ابتدا از دستور /login استفاده کنید.")
         return ConversationHandler.END
@@ -381,6 +1928,8 @@ async def liking_from_post_setup_start(update: Update, context: ContextTypes.DEF
     
     context.user_data['liking_job_config'] = {'post_urls': valid_urls}
     await update.message.reply_text(
+        f"{_queue_note(context)}"
+        f"{await _recent_visits_note(context)}"
         f"✅ <b>{len(valid_urls)}</b> لینک معتبر شناسایی شد.\n\n"
         "⚙️ لطفاً تنظیمات زیر را مشخص کنید:\n\n"
         "<b>مرحله ۱ از ۳:</b>\n"
@@ -399,7 +1948,8 @@ async def liking_from_post_get_post_count(update: Update, context: ContextTypes.
         await update.message.reply_text(
             "👍 بسیار خب.\n\n"
             "<b>مرحله ۲ از ۳:</b>\n"
-            "⏱️ محدوده تاخیر بین درخواست‌ها را وارد کنید (مثال: <code>2,5</code>):\n\n"
+            "⏱️ محدوده تاخیر بین درخواست‌ها را وارد کنید (مثال: <code>2,5</code>):\n"
+            "<i>ربات سرعت را بسته به پاسخ اینستاگرام بین این حداقل و حداکثر تنظیم می‌کند.</i>\n\n"
             "برای لغو، روی /cancel کلیک کنید.",
             parse_mode='HTML'
         )
@@ -417,7 +1967,8 @@ async def liking_from_post_get_delay(update: Update, context: ContextTypes.DEFAU
         await update.message.reply_text(
             "👍 عالی!\n\n"
             "<b>مرحله ۳ از ۳:</b>\n"
-            "😴 در آخر، محدوده زمان انتظار (به ثانیه) بعد از هر لایک را وارد کنید (مثال: <code>5,15</code>):\n\n"
+            "😴 در آخر، محدوده زمان انتظار (به ثانیه) بین لایک‌ها را وارد کنید (مثال: <code>5,15</code>):\n"
+            "<i>ربات سرعت را بسته به پاسخ اینستاگرام بین این حداقل و حداکثر تنظیم می‌کند.</i>\n\n"
             "برای لغو، روی /cancel کلیک کنید.",
             parse_mode='HTML'
         )
@@ -427,7 +1978,7 @@ async def liking_from_post_get_delay(update: Update, context: ContextTypes.DEFAU
         return POST_LIKING_GET_DELAY
 
 async def liking_from_post_get_sleep_and_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """محدوده خواب را دریافت و فرآیند لایک را شروع می‌کند."""
+    """محدوده خواب را دریافت و پیش‌نمایش فرآیند را برای تایید نمایش می‌دهد."""
     try:
         parts = [int(p.strip()) for p in update.message.text.split(',')]
         if len(parts) != 2: raise ValueError
@@ -436,65 +1987,21 @@ async def liking_from_post_get_sleep_and_start(update: Update, context: ContextT
         await update.message.reply_text("❌ ورودی نامعتبر است. لطفاً دو عدد را با کاما جدا کنید (مثال: <code>5,15</code>).", parse_mode='HTML')
         return POST_LIKING_GET_SLEEP
 
-    chat_id = update.effective_chat.id
-    cl = context.user_data['client']
-    urls = context.user_data['liking_job_config']['post_urls']
-    msg = await context.bot.send_message(chat_id, f"⏳ در حال پردازش <b>{len(urls)}</b> لینک... لطفاً صبر کنید.", parse_mode='HTML')
-    
-    try:
-        all_likers = {}
-        for i, url in enumerate(urls):
-            await msg.edit_text(f"📄 در حال دریافت لایک‌کنندگان از لینک <b>{i+1}</b> از <b>{len(urls)}</b>...", parse_mode='HTML')
-            media_pk = await asyncio.to_thread(cl.media_pk_from_url, url)
-            likers = await asyncio.to_thread(cl.media_likers, media_pk)
-            for liker in likers:
-                all_likers[liker.pk] = liker
-
-        await msg.edit_text(f"👥 تعداد کل لایک‌کنندگان منحصر به فرد: <b>{len(all_likers)}</b>. در حال فیلتر کردن اکانت‌های عمومی...", parse_mode='HTML')
-
-        public_users = [user for user in all_likers.values() if not user.is_private]
-        
-        context.user_data['liking_job'] = {
-            'is_running': True,
-            'mode': 'post_likers',
-            'processed_items': 0,
-            'likes_done': 0,
-            'already_liked': 0,
-            'errors': 0,
-            'start_time': time.monotonic(),
-            'last_status': "در حال آماده‌سازی...",
-            'users_to_process': public_users,
-            'config': context.user_data.pop('liking_job_config')
-        }
-
-        await msg.edit_text(f"🚀 تعداد کاربران عمومی: <b>{len(public_users)}</b>. شروع فرآیند لایک...\nبرای لغو از /cancel_liking استفاده کنید.", parse_mode='HTML')
-        asyncio.create_task(liking_task(context))
-        return ConversationHandler.END
-
-    except (MediaNotFound, LoginRequired, Exception) as e:
-        error_message = f"🚨 خطای پیش‌بینی نشده: {e}"
-        if isinstance(e, MediaNotFound):
-            error_message = "❌ خطا: پستی با این لینک پیدا نشد."
-        elif isinstance(e, LoginRequired):
-            error_message = "🔑 خطا: نیاز به ورود مجدد است. لطفاً با /login وارد شوید."
-            context.user_data.clear()
-        
-        await msg.edit_text(error_message)
-        return ConversationHandler.END
+    await _send_plan_preview(update, context, 'post_likers')
+    return POST_LIKING_CONFIRM
 
 @admin_only
 async def liking_following_setup_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """شروع مکالمه برای تنظیمات لایک دنبال‌شوندگان."""
-    if context.user_data.get('liking_job', {}).get('is_running'):
-        await update.message.reply_text("⏳ یک فرآیند لایک دیگر در حال اجراست.")
-        return ConversationHandler.END
-
     if 'client' not in context.user_data:
         await update.message.reply_text("🔒 شما هنوز وارد حساب اینستاگرام خود نشده‌اید. لطفاً ابتدا از دستور /login استفاده کنید.")
         return ConversationHandler.END
     
     context.user_data['liking_job_config'] = {}
     await update.message.reply_text(
+        f"{_queue_note(context)}"
+        f"{await _recent_visits_note(context)}"
+        f"{await _following_snapshot_note(context)}"
         "⚙️ لطفاً تنظیمات <b>لایک دنبال‌شوندگان</b> را مشخص کنید:\n\n"
         "<b>مرحله ۱ از ۴:</b>\n"
         "👥 چه تعداد از آخرین دنبال‌شوندگان شما بررسی شوند؟ (مثال: <code>50</code>)\n"
@@ -531,7 +2038,8 @@ async def liking_following_get_post_count(update: Update, context: ContextTypes.
         await update.message.reply_text(
             "👍 بسیار خب.\n\n"
             "<b>مرحله ۳ از ۴:</b>\n"
-            "⏱️ محدوده تاخیر بین درخواست‌ها را وارد کنید (مثال: <code>2,5</code>):\n\n"
+            "⏱️ محدوده تاخیر بین درخواست‌ها را وارد کنید (مثال: <code>2,5</code>):\n"
+            "<i>ربات سرعت را بسته به پاسخ اینستاگرام بین این حداقل و حداکثر تنظیم می‌کند.</i>\n\n"
             "برای لغو، روی /cancel کلیک کنید.",
             parse_mode='HTML'
         )
@@ -549,7 +2057,8 @@ async def liking_following_get_delay(update: Update, context: ContextTypes.DEFAU
         await update.message.reply_text(
             "👍 عالی!\n\n"
             "<b>مرحله ۴ از ۴:</b>\n"
-            "😴 در آخر، محدوده زمان انتظار (به ثانیه) بعد از هر لایک را وارد کنید (مثال: <code>5,15</code>):\n\n"
+            "😴 در آخر، محدوده زمان انتظار (به ثانیه) بین لایک‌ها را وارد کنید (مثال: <code>5,15</code>):\n"
+            "<i>ربات سرعت را بسته به پاسخ اینستاگرام بین این حداقل و حداکثر تنظیم می‌کند.</i>\n\n"
             "برای لغو، روی /cancel کلیک کنید.",
             parse_mode='HTML'
         )
@@ -559,7 +2068,7 @@ async def liking_following_get_delay(update: Update, context: ContextTypes.DEFAU
         return FOLLOWING_GET_DELAY
 
 async def liking_following_get_sleep_and_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """محدوده خواب را دریافت و فرآیند لایک دنبال‌شوندگان را شروع می‌کند."""
+    """محدوده خواب را دریافت و پیش‌نمایش فرآیند لایک دنبال‌شوندگان را برای تایید نمایش می‌دهد."""
     try:
         parts = [int(p.strip()) for p in update.message.text.split(',')]
         if len(parts) != 2: raise ValueError
@@ -568,36 +2077,8 @@ async def liking_following_get_sleep_and_start(update: Update, context: ContextT
         await update.message.reply_text("❌ ورودی نامعتبر است. لطفاً دو عدد را با کاما جدا کنید (مثال: <code>5,15</code>).", parse_mode='HTML')
         return FOLLOWING_GET_SLEEP
 
-    chat_id = update.effective_chat.id
-    cl = context.user_data['client']
-    msg = await context.bot.send_message(chat_id, "⏳ در حال دریافت لیست دنبال‌شوندگان... لطفاً صبر کنید.")
-    
-    try:
-        users_to_check = context.user_data['liking_job_config']['users_to_check']
-        amount = users_to_check if users_to_check > 0 else 0
-        following_dict = await asyncio.to_thread(cl.user_following, cl.user_id, amount=amount)
-        users_to_process = list(following_dict.values())
-
-        context.user_data['liking_job'] = {
-            'is_running': True,
-            'mode': 'following',
-            'processed_items': 0,
-            'likes_done': 0,
-            'already_liked': 0,
-            'errors': 0,
-            'start_time': time.monotonic(),
-            'last_status': "در حال آماده‌سازی...",
-            'users_to_process': users_to_process,
-            'config': context.user_data.pop('liking_job_config')
-        }
-
-        await msg.edit_text(f"🚀 تعداد کاربران برای بررسی: <b>{len(users_to_process)}</b>. شروع فرآیند لایک...\nبرای لغو از /cancel_liking استفاده کنید.", parse_mode='HTML')
-        asyncio.create_task(liking_task(context))
-        return ConversationHandler.END
-    except Exception as e:
-        await msg.edit_text(f"🚨 خطایی در دریافت لیست دنبال‌شوندگان رخ داد: {e}")
-        return ConversationHandler.END
-
+    await _send_plan_preview(update, context, 'following')
+    return FOLLOWING_CONFIRM
 
 @admin_only
 async def cancel_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -607,7 +2088,8 @@ async def cancel_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE
     await update.message.reply_text("🛑 عملیات فعلی لغو شد.", reply_markup=ReplyKeyboardRemove())
     
     # پاکسازی داده‌های موقت برای جلوگیری از تداخل
-    for key in ['instagram_username', 'password', 'verification_code', 'liking_job_config']:
+    for key in ['instagram_username', 'password', 'verification_code', 'liking_job_config', 'liking_job_mode',
+                'schedule_at']:
         if key in context.user_data:
             del context.user_data[key]
             
@@ -636,7 +2118,7 @@ async def handle_cancel_liking_confirmation(update: Update, context: ContextType
 
     if query.data == 'confirm_cancel_yes':
         if context.user_data.get('liking_job', {}).get('is_running'):
-            context.user_data['liking_job']['is_running'] = False
+            _cancel_job(context.user_data['liking_job'])
             await query.edit_message_text("✋ فرآیند لایک در حال اجرا لغو شد.")
         else:
             await query.edit_message_text("🤔 فرآیند قبلاً متوقف شده بود.")
@@ -644,9 +2126,294 @@ async def handle_cancel_liking_confirmation(update: Update, context: ContextType
         await query.edit_message_text("👍 بسیار خب. عملیات ادامه پیدا می‌کند.")
 
 
+@admin_only
+async def pause_liking(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """فرآیند لایک در حال اجرا را بدون از دست دادن پیشرفت آن به حالت مکث می‌برد."""
+    job = context.user_data.get('liking_job', {})
+    if not job.get('is_running'):
+        await update.message.reply_text("🤔 هیچ فرآیند لایکی برای مکث در حال اجرا نیست.")
+    elif _pause_job(job):
+        await update.message.reply_text(
+            "⏸ فرآیند لایک متوقف موقت شد. درخواست‌های در حال ارسال تمام می‌شوند و درخواست جدیدی ارسال نمی‌شود.\n"
+            "برای ادامه از /resume_liking و برای لغو از /cancel_liking استفاده کنید."
+        )
+    else:
+        await update.message.reply_text("⏸ فرآیند لایک از قبل در حالت مکث است.")
+
+
+# --- بخش ادامه فرآیندهای ناتمام ---
+def _unfinished_checkpoints(chat_id: int = None) -> list:
+    """نقاط بازیابی فرآیندهای ناتمام، به جز فرآیندهایی که در اختیار workerها هستند."""
+    checkpoints = JobCheckpoint.find_unfinished(JOBS_DIR, chat_id)
+    if job_broker is None:
+        return checkpoints
+    worker_jobs = {job['id'] for job in job_broker.active()}
+    return [c for c in checkpoints if c.job_id not in worker_jobs]
+
+@admin_only
+async def resume_liking(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    فرآیند در حال مکث را ادامه می‌دهد؛ در غیر این صورت فرآیندهای لایک ناتمام
+    این چت را برای ادامه یا حذف نمایش می‌دهد.
+    """
+    chat_id = update.effective_chat.id
+    context.user_data['chat_id'] = chat_id
+    job = context.user_data.get('liking_job', {})
+    if job.get('is_running'):
+        if _unpause_job(job):
+            await update.message.reply_text("▶️ فرآیند لایک از همان نقطه ادامه پیدا کرد.")
+        else:
+            await update.message.reply_text("⏳ یک فرآیند لایک دیگر در حال اجراست.")
+        return
+
+    checkpoints = _unfinished_checkpoints(chat_id)
+    if not checkpoints:
+        await update.message.reply_text("🤔 هیچ فرآیند ناتمامی برای ادامه پیدا نشد.")
+        return
+
+    for checkpoint in checkpoints:
+        meta, remaining_users, counters = await asyncio.to_thread(checkpoint.load)
+        title = "لایک از پست" if meta['mode'] == 'post_likers' else "لایک دنبال‌شوندگان"
+        started_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(meta['created_at']))
+        keyboard = [[
+            InlineKeyboardButton("▶️ ادامه", callback_data=f"resume_job:{checkpoint.job_id}"),
+            InlineKeyboardButton("🗑 حذف", callback_data=f"discard_job:{checkpoint.job_id}"),
+        ]]
+        await update.message.reply_html(
+            f"⏸ <b>{title}</b> (شروع: {started_at})\n"
+            f"👥 باقی‌مانده: <b>{len(remaining_users)}</b> از <b>{meta['total_items']}</b> کاربر\n"
+            f"❤️‍🔥 لایک‌های انجام شده: <b>{counters.get('likes_done', 0)}</b>",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+
+@admin_only
+async def handle_resume_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """پاسخ کاربر برای ادامه یا حذف یک فرآیند ناتمام را مدیریت می‌کند."""
+    query = update.callback_query
+    await query.answer()
+
+    action, job_id = query.data.split(':', 1)
+    chat_id = update.effective_chat.id
+    checkpoint = next((c for c in _unfinished_checkpoints(chat_id) if c.job_id == job_id), None)
+    if checkpoint is None:
+        await query.edit_message_text("🤔 این فرآیند دیگر وجود ندارد.")
+        return
+
+    if action == 'discard_job':
+        checkpoint.finish()
+        await query.edit_message_text("🗑 فرآیند ناتمام حذف شد.")
+        if not _unfinished_checkpoints(chat_id):
+            await _start_next_queued_job(context, chat_id)
+        return
+
+    if context.user_data.get('liking_job', {}).get('is_running'):
+        await query.edit_message_text("⏳ یک فرآیند لایک دیگر در حال اجراست.")
+        return
+    if 'client' not in context.user_data:
+        await query.edit_message_text("🔒 برای ادامه فرآیند ابتدا با /login وارد شوید و سپس دوباره /resume_liking را بزنید.")
+        return
+
+    context.user_data['chat_id'] = chat_id
+    meta, users, counters = await asyncio.to_thread(checkpoint.load)
+    # اگر منبع کاربران قبلاً تا انتها خوانده نشده بود، ادامه آن بدون کاربران ذخیره شده دریافت می‌شود
+    _start_liking_job(context, meta['mode'], meta['config'], checkpoint,
+                      users=users, counters=counters, total_items=meta['total_items'],
+                      source_complete=meta['source_complete'], known_pks=meta['known_pks'],
+                      user_id=update.effective_user.id)
+    await query.edit_message_text(
+        f"▶️ فرآیند با <b>{len(users)}</b> کاربر باقی‌مانده ادامه پیدا کرد.\nبرای لغو از /cancel_liking استفاده کنید.",
+        parse_mode='HTML'
+    )
+
+# --- بخش فرآیندهای workerها ---
+# فاصله بررسی پایان فرآیندهای workerها برای شروع فرآیند بعدی صف (ثانیه)
+WORKER_POLL_SECONDS = 5
+
+async def attach_worker_jobs(application: Application) -> None:
+    """
+    در حالت JOB_WORKERS، فرآیندهایی را که (مثلاً پیش از راه‌اندازی مجدد ربات) در اختیار
+    workerها هستند به اپراتورهایشان متصل و پیگیری پایان آن‌ها را شروع می‌کند.
+    """
+    if job_broker is None:
+        return
+    for row in job_broker.active():
+        user_data = application.user_data[row['user_id']]
+        user_data['chat_id'] = row['chat_id']
+        user_data['liking_job'] = _remote_job(row['id'], row['chat_id'], row['mode'],
+                                              paused=bool((row['progress'] or {}).get('paused')))
+    application.job_queue.run_repeating(watch_worker_jobs, interval=WORKER_POLL_SECONDS, first=WORKER_POLL_SECONDS)
+
+async def watch_worker_jobs(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """فرآیندهای پایان یافته workerها را از اپراتورها جدا و صف چت آن‌ها را ادامه می‌دهد."""
+    application = context.application
+    for user_id, user_data in list(application.user_data.items()):
+        job = user_data.get('liking_job')
+        if not job or not job.get('remote'):
+            continue
+        row = job_broker.get(job['job_id'])
+        if row is not None and row['state'] in ACTIVE_STATES:
+            continue
+        del user_data['liking_job']
+        job_broker.remove(job['job_id'])
+        chat_context = ContextTypes.DEFAULT_TYPE(application, chat_id=job['chat_id'], user_id=user_id)
+        try:
+            await _start_next_queued_job(chat_context, job['chat_id'])
+        except Exception as e:
+            logger.error(f"شروع فرآیند بعدی صف چت {job['chat_id']} ناموفق بود: {e}")
+
+class InstrumentedHTTPXRequest(HTTPXRequest):
+    """درخواست‌های ربات به API تلگرام را (به تفکیک متد) در metrics ثبت می‌کند."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        started_at = time.perf_counter()
+        outcome = 'error'
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+            outcome = str(code)
+            return code, payload
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            metrics.REGISTRY.inc('telegram_requests_total', method=api_method, outcome=outcome)
+            metrics.REGISTRY.observe('telegram_request_seconds', time.perf_counter() - started_at, method=api_method)
+
+async def start_metrics(application: Application) -> None:
+    """در صورت تنظیم METRICS_PORT، سرور metrics را روی همان event loop ربات اجرا می‌کند."""
+    if METRICS_PORT <= 0:
+        return
+    try:
+        application.bot_data['metrics_server'] = await metrics.start_metrics_server(METRICS_HOST, METRICS_PORT)
+    except OSError as e:
+        logger.error(f"راه‌اندازی سرور metrics روی پورت {METRICS_PORT} ناموفق بود: {e}")
+
+async def post_init(application: Application) -> None:
+    BOOT_TIMER.mark("اتصال به تلگرام")
+    await start_metrics(application)
+    await attach_worker_jobs(application)
+    await notify_unfinished_jobs(application)
+    await start_scheduler(application)
+    BOOT_TIMER.mark("post_init")
+    BOOT_TIMER.ready()
+    application.bot_data['restore_task'] = asyncio.create_task(restore_sessions(application))
+
+async def restore_sessions(application: Application) -> None:
+    """
+    پس از شروع به کار ربات، تمام session های ذخیره شده را همزمان در پس‌زمینه بازیابی و
+    session فعال و استخر اکانت‌های هر اپراتور را دوباره در اختیار او قرار می‌دهد تا پس از
+    راه‌اندازی مجدد نیازی به /login نباشد. در پایان گزارش زمان‌بندی راه‌اندازی ثبت می‌شود.
+    """
+    try:
+        started_at = time.perf_counter()
+        # در thread جداگانه تا ربات در این مدت به دستورات پاسخ دهد
+        await asyncio.to_thread(importlib.import_module, 'instagrapi')
+        BOOT_TIMER.record("بارگذاری instagrapi", time.perf_counter() - started_at)
+
+        started_at = time.perf_counter()
+        clients, failures = await session_manager.restore_all()
+        for session_file, e in failures.items():
+            logger.warning(f"بازیابی session {session_file} ناموفق بود: {e}")
+
+        session_files = set(session_manager.list_files())
+        restored_operators = 0
+        for user_id, active in session_manager.active_operators().items():
+            client = clients.get(active['session_file'])
+            user_data = application.user_data[user_id]
+            # اپراتوری که در این فاصله خودش وارد شده است دست نمی‌خورد
+            if client is None or 'client' in user_data:
+                continue
+            user_data['client'] = client
+            user_data['session_file'] = active['session_file']
+            user_data.setdefault('pool_sessions', [f for f in active.get('pool_sessions', []) if f in session_files])
+            restored_operators += 1
+        BOOT_TIMER.record(
+            "بازیابی session ها", time.perf_counter() - started_at,
+            f"{len(clients)} از {len(session_files)} session، {restored_operators} اپراتور"
+        )
+    except Exception as e:
+        logger.error(f"بازیابی session ها ناموفق بود: {e}")
+    logger.info(BOOT_TIMER.report())
+
+async def drain_liking_jobs(application: Application) -> None:
+    """
+    هنگام خاموش شدن ربات، فرآیندهای لایک در حال اجرا را در نقطه امن متوقف می‌کند.
+    نقطه بازیابی فرآیندها حفظ می‌شود تا پس از راه‌اندازی مجدد با /resume_liking ادامه یابند.
+    """
+    tasks = []
+    for user_data in application.user_data.values():
+        job = user_data.get('liking_job')
+        # فرآیندهای workerها با خاموش شدن ربات ادامه پیدا می‌کنند
+        if job and job.get('is_running') and not job.get('remote'):
+            job['shutting_down'] = True
+            _cancel_job(job)
+            tasks.append(job['task'])
+    if tasks:
+        logger.info(f"در انتظار توقف {len(tasks)} فرآیند لایک پیش از خاموش شدن...")
+        await asyncio.wait(tasks, timeout=SHUTDOWN_DRAIN_TIMEOUT)
+
+async def post_stop(application: Application) -> None:
+    await drain_liking_jobs(application)
+    await event_log.close()
+
+async def run_webhook(application: Application) -> None:
+    """
+    ربات را به جای polling با سرور webhook داخلی اجرا می‌کند. اگر WEBHOOK_URL تنظیم شده
+    باشد، آدرس در تلگرام ثبت می‌شود؛ در غیر این صورت (مثلاً برای آزمایش محلی یا چند
+    پروسه پشت یک آدرس) ثبت آن بر عهده شماست.
+    با SIGINT/SIGTERM ابتدا دریافت به‌روزرسانی جدید قطع می‌شود، سپس به‌روزرسانی‌های
+    دریافت شده پردازش و فرآیندهای لایک در نقطه امن متوقف می‌شوند.
+    """
+    stop_signal = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_signal.set)
+
+    await application.initialize()
+    await application.post_init(application)
+    if WEBHOOK_URL:
+        await application.bot.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET, allowed_updates=Update.ALL_TYPES)
+    await application.start()
+    server = await start_webhook_server(application, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET)
+    try:
+        await stop_signal.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await application.stop()
+        await application.post_stop(application)
+        await application.shutdown()
+
+async def notify_unfinished_jobs(application: Application) -> None:
+    """هنگام راه‌اندازی، صاحبان فرآیندهای ناتمام را برای ادامه آن‌ها مطلع می‌کند."""
+    notified_chats = set()
+    for checkpoint in _unfinished_checkpoints():
+        chat_id = int(checkpoint.job_id.rsplit('-', 1)[0])
+        if chat_id in notified_chats:
+            continue
+        notified_chats.add(chat_id)
+        try:
+            await application.bot.send_message(
+                chat_id,
+                "♻️ ربات دوباره راه‌اندازی شد و فرآیند لایک ناتمامی پیدا شد.\n"
+                "اکانت‌های ذخیره شده خودکار بازیابی می‌شوند؛ با /resume_liking می‌توانید فرآیند را از همان نقطه "
+                "ادامه دهید (اگر اکانت بازیابی نشد، ابتدا با /login وارد شوید)."
+            )
+        except Exception as e:
+            logger.warning(f"ارسال اعلان فرآیند ناتمام به چت {chat_id} ناموفق بود: {e}")
+
+
 def main() -> None:
     """ربات را راه‌اندازی و اجرا می‌کند."""
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    BOOT_TIMER.mark("تنظیمات و داده‌های محلی")
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(InstrumentedHTTPXRequest(connection_pool_size=256))
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .build()
+    )
 
     cancel_conv_handler = CommandHandler('cancel', cancel_conversation)
 
@@ -669,6 +2436,7 @@ def main() -> None:
             POST_LIKING_GET_POST_COUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, liking_from_post_get_post_count)],
             POST_LIKING_GET_DELAY: [MessageHandler(filters.TEXT & ~filters.COMMAND, liking_from_post_get_delay)],
             POST_LIKING_GET_SLEEP: [MessageHandler(filters.TEXT & ~filters.COMMAND, liking_from_post_get_sleep_and_start)],
+            POST_LIKING_CONFIRM: [CallbackQueryHandler(handle_liking_confirmation, pattern=r'^liking_(start|abort)$')],
         },
         fallbacks=[cancel_conv_handler],
         per_message=False
@@ -681,6 +2449,7 @@ def main() -> None:
             FOLLOWING_GET_POST_COUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, liking_following_get_post_count)],
             FOLLOWING_GET_DELAY: [MessageHandler(filters.TEXT & ~filters.COMMAND, liking_following_get_delay)],
             FOLLOWING_GET_SLEEP: [MessageHandler(filters.TEXT & ~filters.COMMAND, liking_following_get_sleep_and_start)],
+            FOLLOWING_CONFIRM: [CallbackQueryHandler(handle_liking_confirmation, pattern=r'^liking_(start|abort)$')],
         },
         fallbacks=[cancel_conv_handler],
         per_message=False
@@ -690,14 +2459,26 @@ def main() -> None:
     application.add_handler(CommandHandler("logout", request_logout))
     application.add_handler(CallbackQueryHandler(handle_logout_confirmation, pattern=r'^confirm_logout_'))
     application.add_handler(CommandHandler("status", status))
+    application.add_handler(CommandHandler("accounts", accounts))
+    application.add_handler(CommandHandler("pause_liking", pause_liking))
+    application.add_handler(CommandHandler("resume_liking", resume_liking))
+    application.add_handler(CallbackQueryHandler(handle_resume_choice, pattern=r'^(resume|discard)_job:'))
+    application.add_handler(CallbackQueryHandler(handle_accounts_toggle, pattern=r'^pool_toggle:'))
     application.add_handler(CommandHandler("cancel_liking", request_cancel_liking))
+    application.add_handler(CommandHandler("queue", show_queue))
+    application.add_handler(CommandHandler("schedule", schedule_liking))
+    application.add_handler(CallbackQueryHandler(handle_queue_action, pattern=r'^queue_(up|down|remove):'))
     application.add_handler(CallbackQueryHandler(handle_cancel_liking_confirmation, pattern=r'^confirm_cancel_'))
     application.add_handler(login_handler)
     application.add_handler(liking_following_handler)
     application.add_handler(liking_post_handler)
 
 
-    application.run_polling()
+    BOOT_TIMER.mark("ساخت برنامه و handler ها")
+    if WEBHOOK_PORT > 0:
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling()
     print("Bot is now running. Press Ctrl+C to stop.")
 
 if __name__ == '__main__':
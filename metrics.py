@@ -0,0 +1,176 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# تعداد آخرین نمونه‌هایی که برای محاسبه صدک‌های تاخیر هر endpoint نگه داشته می‌شود
+LATENCY_WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencySummary:
+    """تعداد، مجموع و صدک‌های تاخیر (روی پنجره‌ای از آخرین نمونه‌ها) برای یک endpoint."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self._samples = collections.deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self._samples.append(seconds)
+
+    def quantiles(self) -> dict:
+        if not self._samples:
+            return {q: 0.0 for q in QUANTILES}
+        ordered = sorted(self._samples)
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class MetricsRegistry:
+    """
+    شمارنده‌ها، خلاصه‌های تاخیر و gauge های ربات که با فرمت متنی Prometheus ارائه می‌شوند.
+    همه متدها از چند thread قابل فراخوانی هستند.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = collections.defaultdict(float)
+        self._summaries = {}
+        self._gauges = {}
+        self._help = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = LatencySummary()
+            summary.observe(seconds)
+
+    def gauge(self, name: str, callback) -> None:
+        """
+        یک gauge ثبت می‌کند که مقدار آن هنگام خواندن metrics از `callback` گرفته می‌شود.
+        `callback` می‌تواند یک عدد یا دیکشنری {((label, value), ...): عدد} برگرداند.
+        """
+        self._gauges[name] = callback
+
+    @staticmethod
+    def _format_labels(labels, extra=()) -> str:
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in items) + "}"
+
+    def render(self) -> str:
+        """تمام metrics را با فرمت متنی Prometheus برمی‌گرداند."""
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name in declared:
+                return
+            declared.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(self._summaries.items(), key=lambda item: item[0])
+            summary_values = [(key, s.count, s.total, s.quantiles()) for key, s in summaries]
+
+        for (name, labels), value in counters:
+            declare(name, 'counter')
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for (name, labels), count, total, quantiles in summary_values:
+            declare(name, 'summary')
+            for q, value in quantiles.items():
+                lines.append(f"{name}{self._format_labels(labels, [('quantile', q)])} {value}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+
+        for name, callback in sorted(self._gauges.items()):
+            try:
+                value = callback()
+            except Exception as e:
+                logger.warning(f"خواندن gauge {name} ناموفق بود: {e}")
+                continue
+            declare(name, 'gauge')
+            if isinstance(value, dict):
+                for labels, labeled_value in sorted(value.items()):
+                    lines.append(f"{name}{self._format_labels(labels)} {labeled_value}")
+            else:
+                lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe('instagram_calls_total', "Instagram API calls by endpoint and outcome")
+REGISTRY.describe('instagram_call_seconds', "Instagram API call latency in seconds")
+REGISTRY.describe('instagram_call_queue_seconds', "Time a call waited for a free executor thread")
+REGISTRY.describe('telegram_requests_total', "Telegram Bot API requests by method and outcome")
+REGISTRY.describe('telegram_request_seconds', "Telegram Bot API request latency in seconds")
+REGISTRY.describe('liking_likes_total', "Successful likes by account")
+REGISTRY.describe('liking_sleep_seconds_total', "Time spent waiting on rate limiters by endpoint class")
+
+
+class timed_wait:
+    """context manager async برای ثبت مدت انتظار (خواب) در شمارنده liking_sleep_seconds_total."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    async def __aenter__(self):
+        self._started_at = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        REGISTRY.inc('liking_sleep_seconds_total', time.perf_counter() - self._started_at, kind=self.kind)
+        return False
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # بقیه هدرهای درخواست خوانده و نادیده گرفته می‌شوند
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, body = '200 OK', REGISTRY.render().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            status, body, content_type = '404 Not Found', b'not found\n', 'text/plain'
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    """سرور HTTP محلی که metrics را در مسیر /metrics ارائه می‌کند راه‌اندازی می‌کند."""
+    server = await asyncio.start_server(_handle_http, host, port)
+    logger.info(f"metrics در آدرس http://{host}:{port}/metrics در دسترس است.")
+    return server
@@ -0,0 +1,189 @@
+import json
+import logging
+import math
+import os
+import threading
+
+from rate_limiter import SUCCESS_STEP_FRACTION, THROTTLE_BASE_PAUSE
+from sources import FOLLOWING_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 3600
+# شمارنده‌های فرآیند که نرخ‌های مدل از آن‌ها محاسبه می‌شوند؛ post_slots تعداد پست‌های درخواست شده است
+OUTCOME_KEYS = ('processed_items', 'likes_done', 'already_liked', 'skipped_known', 'errors', 'throttled',
+                'filtered_cached', 'skipped_recent', 'post_slots')
+# سابقه فرآیندهای قبلی با پایان هر فرآیند جدید این ضریب از وزنش را نگه می‌دارد
+HISTORY_DECAY = 0.5
+# وزن سابقه (یا پیش‌فرض‌ها) در برابر مشاهدات فرآیند فعلی، بر حسب تعداد کاربر
+PRIOR_USERS = 50
+# وزن هر اندازه‌گیری جدید در میانگین نمایی زمان پاسخ درخواست‌ها
+LATENCY_ALPHA = 0.05
+# پیش‌فرض‌ها پیش از اولین فرآیند: نتیجه فرضی بررسی ۱۰۰ کاربر با یک پست برای هر کاربر
+DEFAULT_COUNTERS = {
+    'processed_items': 90, 'likes_done': 60, 'already_liked': 10, 'skipped_known': 10, 'errors': 2,
+    'throttled': 0.2, 'filtered_cached': 5, 'skipped_recent': 5, 'post_slots': 80,
+}
+DEFAULT_LATENCY = {'fetch': 1.0, 'like': 1.0}
+
+
+def _rates(counters: dict) -> dict:
+    """نرخ‌های مدل (کسر کاربران رد شده، لایک به ازای هر پست درخواست شده، ...) را از شمارنده‌ها محاسبه می‌کند."""
+    processed = counters['processed_items']
+    raw = processed + counters['filtered_cached'] + counters['skipped_recent']
+    fetched = max(processed - counters['skipped_known'], 0)
+    return {
+        'prefilter': (raw - processed) / raw if raw else 0.0,
+        'known': counters['skipped_known'] / processed if processed else 0.0,
+        'like_fraction': counters['likes_done'] / counters['post_slots'] if counters['post_slots'] else 0.0,
+        'throttle': counters['throttled'] / (fetched + counters['likes_done']) if fetched else 0.0,
+    }
+
+
+def _mean_interval(floor: float, ceiling: float, count: float, warm: bool) -> float:
+    """
+    میانگین فاصله `count` درخواست یک سطل توکن تطبیقی که از `ceiling` شروع و با هر
+    درخواست موفق به اندازه SUCCESS_STEP_FRACTION از بازه به `floor` نزدیک می‌شود.
+    سطل `warm` از قبل به `floor` رسیده است.
+    """
+    if warm or ceiling <= floor or count <= 0:
+        return floor
+    step = (ceiling - floor) * SUCCESS_STEP_FRACTION
+    ramp = min(count, math.ceil((ceiling - floor) / step))
+    ramp_total = ramp * ceiling - step * ramp * (ramp - 1) / 2
+    return (ramp_total + (count - ramp) * floor) / count
+
+
+def blend_eta(model_seconds: float, remaining: float, elapsed: float, processed: int) -> float:
+    """
+    زمان باقی‌مانده فرآیند در حال اجرا: تخمین مدل برای هر کاربر با سرعت مشاهده شده فرآیند
+    ترکیب می‌شود و با افزایش کاربران بررسی شده وزن سرعت مشاهده شده بیشتر می‌شود.
+    """
+    if remaining <= 0:
+        return 0.0
+    if processed <= 0:
+        return model_seconds
+    weight = processed / (processed + PRIOR_USERS)
+    per_user = (model_seconds / remaining) * (1 - weight) + (elapsed / processed) * weight
+    return remaining * per_user
+
+
+class JobPlanner:
+    """
+    مدل مدت و تعداد درخواست‌های یک فرآیند لایک از روی تنظیمات آن.
+    فاصله درخواست‌ها از delay_range و sleep_range (با شروع سطل توکن از حد بالا)، زمان
+    پاسخ درخواست‌ها از میانگین اندازه‌گیری شده هر اکانت، و نرخ رد شدن کاربران، لایک
+    پست‌ها و محدودیت‌های سرعت از سابقه فرآیندهای قبلی هر نوع فرآیند برآورد می‌شوند.
+    سابقه روی دیسک ذخیره می‌شود تا پیش‌نمایش فرآیندهای بعدی دقیق‌تر شود.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._history = {}
+        self._latency = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                self._history = data.get('history', {})
+                self._latency = data.get('latency', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"خواندن سابقه برنامه‌ریز فرآیندها ناموفق بود: {e}")
+
+    def observe_latency(self, account: str, phase: str, seconds: float) -> None:
+        """زمان پاسخ یک درخواست ('fetch' یا 'like') اکانت را در میانگین نمایی آن ثبت می‌کند."""
+        with self._lock:
+            latency = self._latency.setdefault(account, {})
+            previous = latency.get(phase)
+            latency[phase] = seconds if previous is None else previous + LATENCY_ALPHA * (seconds - previous)
+
+    def record_job(self, mode: str, counters: dict, posts_per_user: int) -> None:
+        """شمارنده‌های یک فرآیند پایان یافته را به سابقه نوع فرآیند اضافه می‌کند."""
+        counters = dict(counters)
+        counters['post_slots'] = max(counters['processed_items'] - counters['skipped_known'], 0) * posts_per_user
+        with self._lock:
+            history = self._history.get(mode, {})
+            self._history[mode] = {key: history.get(key, 0) * HISTORY_DECAY + counters.get(key, 0)
+                                   for key in OUTCOME_KEYS}
+
+    def save(self) -> None:
+        with self._lock:
+            text = json.dumps({'history': self._history, 'latency': self._latency})
+        # پروسه‌های worker هم در همین فایل می‌نویسند
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+    def _combined(self, mode: str, observed: dict = None) -> dict:
+        """سابقه (یا پیش‌فرض‌ها) با وزن PRIOR_USERS کاربر به علاوه مشاهدات فرآیند فعلی."""
+        prior = self._history.get(mode) or DEFAULT_COUNTERS
+        raw = prior['processed_items'] + prior['filtered_cached'] + prior['skipped_recent']
+        scale = PRIOR_USERS / raw if raw else 0.0
+        observed = observed or {}
+        return {key: prior.get(key, 0) * scale + observed.get(key, 0) for key in OUTCOME_KEYS}
+
+    def _account_latency(self, accounts: list, phase: str) -> float:
+        known = [self._latency[a][phase] for a in accounts if phase in self._latency.get(a, {})]
+        if not known:
+            known = [latency[phase] for latency in self._latency.values() if phase in latency]
+        return sum(known) / len(known) if known else DEFAULT_LATENCY[phase]
+
+    def estimate(self, mode: str, config: dict, users: int, accounts: list, prefiltered: bool = False,
+                 prefetch: bool = True, budget=None, observed: dict = None, warm: bool = False) -> dict:
+        """
+        مدت (ثانیه)، تعداد لایک‌ها و تعداد درخواست‌های مورد انتظار برای بررسی `users` کاربر با
+        اکانت‌های `accounts` را برمی‌گرداند. اگر `prefiltered` نباشد، کاربرانی که با کش پروفایل
+        یا بازدید اخیر بدون درخواست حذف می‌شوند از `users` کم می‌شوند. `observed` شمارنده‌های
+        فرآیند در حال اجرا است و `budget` (DailyBudget) سقف لایک روزانه و بازه‌های مجاز را اعمال می‌کند.
+        """
+        with self._lock:
+            if observed is not None:
+                observed = dict(observed)
+                observed['post_slots'] = (max(observed['processed_items'] - observed['skipped_known'], 0)
+                                          * config['posts_per_user'])
+            rates = _rates(self._combined(mode, observed))
+            fetch_latency = self._account_latency(accounts, 'fetch')
+            like_latency = self._account_latency(accounts, 'like')
+
+        n_accounts = max(len(accounts), 1)
+        queued = users if prefiltered else users * (1 - rates['prefilter'])
+        fetches = queued * (1 - rates['known'])
+        likes = fetches * config['posts_per_user'] * rates['like_fraction']
+        source_requests = 0
+        if not prefiltered:
+            source_requests = (len(config['post_urls']) if mode == 'post_likers'
+                               else math.ceil(users / FOLLOWING_PAGE_SIZE))
+
+        # هر اکانت سهم برابری از کاربران را با سطل‌های توکن خودش پردازش می‌کند
+        account_fetches = fetches / n_accounts
+        account_likes = likes / n_accounts
+        read_cycle = max(_mean_interval(*config['delay_range'], account_fetches, warm), fetch_latency)
+        like_cycle = max(_mean_interval(*config['sleep_range'], account_likes, warm), like_latency)
+        read_seconds = account_fetches * read_cycle
+        like_seconds = account_likes * like_cycle
+        if prefetch:
+            # پست‌های کاربران بعدی همزمان با لایک‌ها دریافت می‌شوند
+            seconds = max(read_seconds, like_seconds)
+        else:
+            seconds = max(read_seconds, account_fetches * fetch_latency + like_seconds)
+        seconds += (account_fetches + account_likes) * rates['throttle'] * THROTTLE_BASE_PAUSE
+
+        limited_by = None
+        if budget is not None and budget.enabled:
+            in_windows = seconds * DAY_SECONDS / budget.total
+            by_budget = account_likes / budget.likes_per_day * DAY_SECONDS if budget.likes_per_day > 0 else 0.0
+            if by_budget > max(in_windows, seconds):
+                seconds, limited_by = by_budget, 'budget'
+            elif in_windows > seconds:
+                seconds, limited_by = in_windows, 'windows'
+
+        return {
+            'users': round(queued),
+            'likes': round(likes),
+            'requests': round(fetches + likes + source_requests),
+            'seconds': seconds,
+            'accounts': n_accounts,
+            'limited_by': limited_by,
+        }
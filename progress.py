@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+import logging
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+# حداکثر انتظار برای ویرایش نهایی پیام پس از پایان فرآیند (ثانیه)
+FINAL_EDIT_MAX_WAIT = 60
+
+
+def _now() -> float:
+    # ساعت event loop (در بنچمارک با ساعت مجازی جایگزین می‌شود)
+    return asyncio.get_running_loop().time()
+
+
+def _retry_seconds(e: RetryAfter) -> float:
+    retry_after = e.retry_after
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class ProgressReporter:
+    """
+    پیام زنده پیشرفت یک فرآیند تا اپراتور مجبور به فرستادن /status مکرر نباشد.
+    یک پیام (در صورت امکان سنجاق شده) ارسال و متن آن هر `refresh_interval` ثانیه با
+    خروجی `render` ویرایش می‌شود؛ `nudge` ویرایش را برای تغییرات مهم جلو می‌اندازد.
+    درخواست‌های پشت سر هم در یک ویرایش ادغام می‌شوند، فاصله دو ویرایش از `min_interval`
+    کمتر نیست، متن تغییر نکرده دوباره ارسال نمی‌شود و پس از flood wait تلگرام
+    (RetryAfter) تا پایان مهلت آن ویرایشی ارسال نمی‌شود.
+    """
+
+    def __init__(self, bot, chat_id: int, render, refresh_interval: float, min_interval: float, pin: bool = True):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.render = render
+        self.refresh_interval = refresh_interval
+        self.min_interval = min_interval
+        self.pin = pin
+        self.message_id = None
+        self._text = None
+        self._pinned = False
+        self._last_edit = 0.0
+        # زودترین زمان مجاز ویرایش بعدی (ساعت event loop)
+        self._next_edit = 0.0
+        self._dirty = asyncio.Event()
+        self._task = None
+        # wait_for ممکن است cancel همزمان با پایان مهلتش را نادیده بگیرد؛ حلقه با این پرچم هم متوقف می‌شود
+        self._closed = False
+
+    async def start(self) -> None:
+        """پیام پیشرفت را ارسال و سنجاق می‌کند و به‌روزرسانی آن را در پس‌زمینه شروع می‌کند."""
+        text = self.render()
+        message = await self.bot.send_message(self.chat_id, text, parse_mode='HTML', disable_notification=True)
+        self.message_id = message.message_id
+        self._text = text
+        self._last_edit = _now()
+        self._next_edit = self._last_edit + self.min_interval
+        if self.pin:
+            try:
+                await self.bot.pin_chat_message(self.chat_id, self.message_id, disable_notification=True)
+                self._pinned = True
+            except TelegramError as e:
+                # مثلاً ربات در گروه اجازه سنجاق کردن ندارد؛ پیام بدون سنجاق به‌روز می‌شود
+                logger.info(f"سنجاق کردن پیام پیشرفت ناموفق بود: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    def nudge(self) -> None:
+        """تغییر مهمی رخ داده است؛ پیام در اولین زمان مجاز (نه زودتر از `min_interval`) به‌روز می‌شود."""
+        self._dirty.set()
+
+    async def _run(self) -> None:
+        while not self._closed and self.message_id is not None:
+            timeout = max(self._last_edit + self.refresh_interval - _now(), 0)
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            wait = self._next_edit - _now()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if self._closed:
+                return
+            # درخواست‌هایی که در این فاصله رسیده‌اند با همین ویرایش پوشش داده می‌شوند
+            self._dirty.clear()
+            await self._edit(self.render())
+
+    async def _edit(self, text: str) -> None:
+        self._last_edit = _now()
+        self._next_edit = self._last_edit + self.min_interval
+        if text == self._text:
+            return
+        try:
+            await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id,
+                                             parse_mode='HTML')
+        except RetryAfter as e:
+            # تلگرام ویرایش‌های این چت را محدود کرده است؛ متن جدید پس از مهلت ارسال می‌شود
+            self._next_edit = _now() + _retry_seconds(e)
+            return
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                # پیام حذف شده یا دیگر قابل ویرایش نیست؛ به‌روزرسانی زنده متوقف می‌شود
+                logger.info(f"ویرایش پیام پیشرفت ناموفق بود و به‌روزرسانی آن متوقف شد: {e}")
+                self.message_id = None
+                return
+        except TelegramError as e:
+            logger.warning(f"ویرایش پیام پیشرفت ناموفق بود: {e}")
+            return
+        self._text = text
+
+    async def close(self, final_text: str = None) -> None:
+        """به‌روزرسانی پس‌زمینه را متوقف، متن نهایی را (با رعایت مهلت‌ها) ثبت و پیام را از سنجاق خارج می‌کند."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self.message_id is None:
+            return
+        wait = self._next_edit - _now()
+        if 0 < wait <= FINAL_EDIT_MAX_WAIT:
+            await asyncio.sleep(wait)
+        await self._edit(final_text if final_text is not None else self.render())
+        if self._pinned:
+            try:
+                await self.bot.unpin_chat_message(self.chat_id, self.message_id)
+            except TelegramError as e:
+                logger.info(f"برداشتن سنجاق پیام پیشرفت ناموفق بود: {e}")
@@ -0,0 +1,60 @@
+import time
+
+# نیمه‌عمر امتیاز فعالیت بر اساس فاصله از آخرین پست (روز)
+ACTIVITY_HALF_LIFE_DAYS = 30
+# امتیاز فعالیت کاربری که هنوز اطلاعاتی از آخرین پستش نداریم
+UNKNOWN_ACTIVITY = 0.5
+# حداقل امتیاز فعالیت کاربری که مدت‌هاست پستی نگذاشته است
+MIN_ACTIVITY = 0.2
+# احتمال پست لایک نشده برای کاربری که بعد از آخرین پستش بررسی شده است
+SEEN_SINCE_LAST_POST = 0.05
+# امتیاز اضافه به ازای هر بار دیده شدن کاربر در لایک‌کنندگان یک پست دیگر
+APPEARANCE_WEIGHT = 0.25
+
+
+def activity_score(profile, now: float) -> float:
+    """هر چه آخرین پست کاربر تازه‌تر باشد امتیاز به ۱ نزدیک‌تر است."""
+    last_post_at = (profile or {}).get('last_post_at')
+    if last_post_at is None:
+        return UNKNOWN_ACTIVITY
+    age_days = max(0.0, now - last_post_at) / 86400
+    return MIN_ACTIVITY + (1 - MIN_ACTIVITY) * 0.5 ** (age_days / ACTIVITY_HALF_LIFE_DAYS)
+
+
+def novelty_score(profile, history) -> float:
+    """
+    احتمال تقریبی اینکه کاربر پستی داشته باشد که هنوز لایک نشده است.
+    کاربری که بعد از آخرین پستش بررسی شده تقریباً صفر است و کاربری که پست‌هایش
+    بیشتر از قبل لایک شده بودند (و نه توسط ربات) امتیاز کمتری می‌گیرد.
+    """
+    if history is None:
+        return 1.0
+    total, liked, last_seen = history
+    last_post_at = (profile or {}).get('last_post_at')
+    if last_post_at is not None and last_seen >= last_post_at:
+        return SEEN_SINCE_LAST_POST
+    return (liked + 1) / (total + 2)
+
+
+def score_user(profile, history, now: float = None) -> float:
+    """
+    امتیاز یک کاربر از داده‌های محلی: فعالیت اخیر (کش پروفایل) ضربدر احتمال
+    وجود پست لایک نشده (دفتر لایک). تکرار در لایک‌کنندگان چند پست در این امتیاز
+    نیست؛ صف کار آن را جداگانه (UserWorkQueue.boost با APPEARANCE_WEIGHT) اعمال می‌کند.
+    """
+    now = time.time() if now is None else now
+    return activity_score(profile, now) * novelty_score(profile, history)
+
+
+class UserRanker:
+    """امتیاز کاربران یک صفحه از منبع را بدون هیچ درخواستی از کش پروفایل‌ها و دفتر لایک محاسبه می‌کند."""
+
+    def __init__(self, ledger, profile_cache):
+        self.ledger = ledger
+        self.profile_cache = profile_cache
+
+    def score_page(self, accounts: list, users: list) -> list:
+        """امتیاز هر کاربر `users` را (به همان ترتیب) برای اکانت‌های `accounts` برمی‌گرداند."""
+        history = self.ledger.user_history(accounts, [user.pk for user in users])
+        now = time.time()
+        return [score_user(self.profile_cache.get(user.pk), history.get(str(user.pk)), now) for user in users]
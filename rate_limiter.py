@@ -0,0 +1,101 @@
+import asyncio
+import random
+
+# بعد از هر درخواست موفق، فاصله بین درخواست‌ها به اندازه این کسر از بازه مجاز کم می‌شود
+SUCCESS_STEP_FRACTION = 0.05
+# مکث پایه بعد از اولین محدودیت (ثانیه) که با هر محدودیت پشت سر هم دو برابر می‌شود
+THROTTLE_BASE_PAUSE = 60
+THROTTLE_MAX_PAUSE = 30 * 60
+
+
+def _now() -> float:
+    # ساعت event loop (به طور پیش‌فرض همان time.monotonic)؛ در بنچمارک با ساعت مجازی جایگزین می‌شود
+    return asyncio.get_running_loop().time()
+
+
+class AdaptiveTokenBucket:
+    """
+    سطل توکن تطبیقی برای یک اکانت و یک دسته از درخواست‌ها (خواندن یا لایک).
+    فاصله بین درخواست‌ها بین `floor` و `ceiling` ثانیه نگه داشته می‌شود؛ با هر
+    درخواست موفق به سمت `floor` می‌رود و با هر نشانه محدودیت از سمت اینستاگرام
+    به `ceiling` برمی‌گردد و سطل برای مدتی (با افزایش نمایی) متوقف می‌شود.
+    """
+
+    def __init__(self, floor: float, ceiling: float, capacity: int = 1):
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.floor = 0.0
+        self.ceiling = 0.0
+        self.set_bounds(floor, ceiling)
+        self.interval = self.ceiling
+        self.throttle_streak = 0
+        self.paused_until = 0.0
+        self._updated_at = _now()
+        self._lock = asyncio.Lock()
+
+    def set_bounds(self, floor: float, ceiling: float) -> None:
+        """حد پایین و بالای فاصله بین درخواست‌ها را (از تنظیمات اپراتور) به‌روز می‌کند."""
+        self.floor = max(0.0, float(min(floor, ceiling)))
+        self.ceiling = max(0.0, float(max(floor, ceiling)))
+        if hasattr(self, 'interval'):
+            self.interval = min(max(self.interval, self.floor), self.ceiling)
+
+    def _refill(self, now: float) -> None:
+        if self.interval <= 0:
+            self.tokens = float(self.capacity)
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) / self.interval)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """تا زمانی که یک توکن در دسترس باشد (و سطل متوقف نباشد) صبر می‌کند."""
+        async with self._lock:
+            while True:
+                now = _now()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                # تصادفی بودن فقط فاصله را (تا سقف ceiling) بیشتر می‌کند و زمان آن توکن نمی‌سازد،
+                # پس فاصله دو درخواست هرگز از interval (و floor) کمتر نمی‌شود
+                jitter = min(self.interval * random.uniform(0, 0.2), max(self.ceiling - self.interval, 0.0))
+                await asyncio.sleep((1 - self.tokens) * self.interval + jitter)
+                self._updated_at += jitter
+
+    def on_success(self) -> None:
+        """بعد از یک درخواست موفق سرعت را کمی افزایش می‌دهد."""
+        self.throttle_streak = 0
+        step = (self.ceiling - self.floor) * SUCCESS_STEP_FRACTION
+        self.interval = max(self.floor, self.interval - step)
+
+    def on_throttle(self) -> float:
+        """
+        بعد از دریافت نشانه محدودیت، سرعت را به حداقل می‌رساند و سطل را متوقف می‌کند.
+        مدت توقف (ثانیه) را برمی‌گرداند.
+        """
+        self.throttle_streak += 1
+        self.interval = self.ceiling
+        self.tokens = 0.0
+        pause = min(THROTTLE_BASE_PAUSE * 2 ** (self.throttle_streak - 1), THROTTLE_MAX_PAUSE)
+        self.paused_until = _now() + pause
+        self._updated_at = self.paused_until
+        return pause
+
+
+class RateLimiterRegistry:
+    """سطل‌های توکن را به ازای (اکانت، دسته درخواست) نگه می‌دارد تا سرعت یاد گرفته شده بین فرآیندها حفظ شود."""
+
+    def __init__(self):
+        self._buckets = {}
+
+    def get(self, account: str, endpoint: str, floor: float, ceiling: float) -> AdaptiveTokenBucket:
+        bucket = self._buckets.get((account, endpoint))
+        if bucket is None:
+            bucket = AdaptiveTokenBucket(floor, ceiling)
+            self._buckets[(account, endpoint)] = bucket
+        else:
+            bucket.set_bounds(floor, ceiling)
+        return bucket
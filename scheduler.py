@@ -0,0 +1,198 @@
+import datetime
+import json
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 3600
+
+# اولویت فرآیندهای صف؛ فرآیند با اولویت بالاتر زودتر اجرا می‌شود
+PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH = -1, 0, 1
+PRIORITY_NAMES = {PRIORITY_LOW: 'پایین', PRIORITY_NORMAL: 'عادی', PRIORITY_HIGH: 'بالا'}
+
+
+def parse_clock(text: str) -> int:
+    """ساعت به شکل HH:MM را به تعداد ثانیه از ابتدای روز تبدیل می‌کند (24:00 هم مجاز است)."""
+    hours, minutes = (int(part) for part in text.strip().split(':'))
+    if not (0 <= minutes < 60 and (0 <= hours < 24 or (hours == 24 and minutes == 0))):
+        raise ValueError(f"invalid time of day: {text!r}")
+    return hours * 3600 + minutes * 60
+
+
+def parse_windows(text: str) -> list:
+    """
+    بازه‌های مجاز لایک به شکل "08:00-12:00,18:00-23:30" را به لیست مرتب
+    (شروع، پایان) بر حسب ثانیه از ابتدای روز تبدیل می‌کند. رشته خالی یعنی تمام روز.
+    """
+    windows = []
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        start, end = (parse_clock(t) for t in part.split('-'))
+        if end <= start:
+            raise ValueError(f"window must end after it starts: {part!r}")
+        windows.append((start, end))
+    windows.sort()
+    for (_, previous_end), (start, _) in zip(windows, windows[1:]):
+        if start < previous_end:
+            raise ValueError("windows must not overlap")
+    return windows or [(0, DAY_SECONDS)]
+
+
+class DailyBudget:
+    """
+    بودجه روزانه لایک هر اکانت که به نسبت زمان در بازه‌های مجاز روز پخش می‌شود.
+    تا هر لحظه فقط سهمی از بودجه که متناسب با زمان سپری شده از بازه‌هاست مجاز است،
+    بنابراین لایک‌ها به جای مصرف شدن در ساعات اول، در تمام بازه‌ها پخش می‌شوند.
+    """
+
+    def __init__(self, likes_per_day: int, windows: list = None):
+        self.likes_per_day = likes_per_day
+        self.windows = windows or [(0, DAY_SECONDS)]
+        self.total = sum(end - start for start, end in self.windows)
+
+    @property
+    def enabled(self) -> bool:
+        return self.likes_per_day > 0 or self.windows != [(0, DAY_SECONDS)]
+
+    def _clock_at(self, window_seconds: float) -> float:
+        """زمانی از روز که `window_seconds` ثانیه از بازه‌ها در آن سپری شده است."""
+        for start, end in self.windows:
+            if window_seconds <= end - start:
+                return start + window_seconds
+            window_seconds -= end - start
+        return self.windows[-1][1]
+
+    def wait_seconds(self, used_today: int, now: datetime.datetime) -> float:
+        """
+        مدت انتظار (ثانیه) تا مجاز شدن لایک بعدی را برمی‌گرداند؛ صفر یعنی همین حالا.
+        اگر بودجه امروز تمام شده باشد، تا شروع اولین بازه فردا صبر می‌شود.
+        """
+        t = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+        until_tomorrow = DAY_SECONDS - t + self.windows[0][0]
+        if self.likes_per_day > 0 and used_today >= self.likes_per_day:
+            return until_tomorrow
+        if not any(start <= t < end for start, end in self.windows):
+            later = [start for start, _ in self.windows if start > t]
+            return later[0] - t if later else until_tomorrow
+        if self.likes_per_day <= 0:
+            return 0.0
+        due = self._clock_at(used_today * self.total / self.likes_per_day)
+        return max(0.0, due - t)
+
+
+class JobScheduler:
+    """
+    صف فرآیندهای لایک و زمان‌بندی‌های روزانه، ذخیره شده در یک فایل JSON.
+    از صف هر چت همیشه فرآیند با بالاترین اولویت انتخاب می‌شود؛ بین فرآیندهای هم‌اولویت،
+    اکانتی که زمان بیشتری از آخرین اجرایش گذشته جلو می‌افتد تا اکانت‌ها به نوبت اجرا
+    شوند و صف یک اکانت بقیه را پشت سر خود نگه ندارد.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queue = []
+        self.schedules = []
+        self.last_started = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    state = json.load(f)
+                self.queue = state.get('queue', [])
+                self.schedules = state.get('schedules', [])
+                self.last_started = state.get('last_started', {})
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"خواندن صف فرآیندها ناموفق بود: {e}")
+
+    def _save(self) -> None:
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'queue': self.queue, 'schedules': self.schedules, 'last_started': self.last_started},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _new_entry(chat_id: int, user_id: int, session_file: str, mode: str, config: dict,
+                   priority: int, pool_sessions: list) -> dict:
+        return {
+            'id': uuid.uuid4().hex[:8],
+            'chat_id': chat_id,
+            'user_id': user_id,
+            'session_file': session_file,
+            'pool_sessions': list(pool_sessions or []),
+            'mode': mode,
+            'config': config,
+            'priority': priority,
+            'created_at': time.time(),
+        }
+
+    def enqueue(self, chat_id: int, user_id: int, session_file: str, mode: str, config: dict,
+                priority: int = PRIORITY_NORMAL, pool_sessions: list = None, schedule_id: str = None) -> dict:
+        """یک فرآیند را به صف چت اضافه می‌کند و ورودی ساخته شده را برمی‌گرداند."""
+        entry = self._new_entry(chat_id, user_id, session_file, mode, config, priority, pool_sessions)
+        entry['schedule_id'] = schedule_id
+        self.queue.append(entry)
+        self._save()
+        return entry
+
+    def _order_key(self, entry: dict):
+        return (-entry['priority'], self.last_started.get(entry['session_file'], 0), entry['created_at'])
+
+    def pending(self, chat_id: int) -> list:
+        """فرآیندهای صف یک چت را به ترتیبی که اجرا خواهند شد برمی‌گرداند."""
+        return sorted((e for e in self.queue if e['chat_id'] == chat_id), key=self._order_key)
+
+    def chats_with_pending(self) -> set:
+        return {(e['chat_id'], e['user_id']) for e in self.queue}
+
+    def pop_next(self, chat_id: int):
+        """فرآیند بعدی صف چت را (در صورت وجود) از صف خارج و اجرای آن را ثبت می‌کند."""
+        pending = self.pending(chat_id)
+        if not pending:
+            return None
+        entry = pending[0]
+        self.queue.remove(entry)
+        self.last_started[entry['session_file']] = time.time()
+        self._save()
+        return entry
+
+    def is_queued(self, schedule_id: str) -> bool:
+        return any(e.get('schedule_id') == schedule_id for e in self.queue)
+
+    def add_schedule(self, chat_id: int, user_id: int, session_file: str, mode: str, config: dict,
+                     at: str, priority: int = PRIORITY_NORMAL, pool_sessions: list = None) -> dict:
+        """یک فرآیند تکرارشونده که هر روز در ساعت `at` (HH:MM) به صف اضافه می‌شود ثبت می‌کند."""
+        schedule = self._new_entry(chat_id, user_id, session_file, mode, config, priority, pool_sessions)
+        schedule['at'] = at
+        self.schedules.append(schedule)
+        self._save()
+        return schedule
+
+    def get_schedule(self, schedule_id: str):
+        return next((s for s in self.schedules if s['id'] == schedule_id), None)
+
+    def chat_schedules(self, chat_id: int) -> list:
+        return sorted((s for s in self.schedules if s['chat_id'] == chat_id), key=lambda s: s['at'])
+
+    def get(self, entry_id: str):
+        """ورودی صف یا زمان‌بندی با این شناسه را برمی‌گرداند."""
+        return next((e for e in self.queue + self.schedules if e['id'] == entry_id), None)
+
+    def remove(self, entry_id: str) -> bool:
+        """یک ورودی صف یا زمان‌بندی را حذف می‌کند."""
+        for entries in (self.queue, self.schedules):
+            for entry in entries:
+                if entry['id'] == entry_id:
+                    entries.remove(entry)
+                    self._save()
+                    return True
+        return False
+
+    def set_priority(self, entry_id: str, priority: int) -> bool:
+        entry = self.get(entry_id)
+        if entry is None:
+            return False
+        entry['priority'] = max(PRIORITY_LOW, min(PRIORITY_HIGH, priority))
+        self._save()
+        return True
@@ -0,0 +1,226 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+
+from executors import call_instagram
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = '.index.json'
+# session فعال و استخر اکانت‌های هر اپراتور ربات برای بازیابی پس از راه‌اندازی مجدد
+ACTIVE_FILE = '.active.json'
+# قفل بین پروسه‌ای به‌روزرسانی فهرست‌ها (ربات و پروسه‌های worker در آن‌ها می‌نویسند)
+LOCK_FILE = '.lock'
+
+
+class SessionManager:
+    """
+    مدیریت session های ذخیره شده در پوشه sessions.
+    هر session با نام `{username}.json` ذخیره و در یک فهرست (نام فایل ← نام کاربری،
+    شناسه اکانت و زمان آخرین اعتبارسنجی) نگه داشته می‌شود. کلاینت‌های بارگذاری شده
+    در حافظه می‌مانند و فقط وقتی از آخرین اعتبارسنجی بیش از `validate_after` ثانیه
+    گذشته باشد با سبک‌ترین درخواست ممکن (اطلاعات حساب فعلی) بررسی می‌شوند.
+    فهرست‌ها زیر قفل فایل دوباره خوانده و سپس تغییر داده می‌شوند تا تغییرات پروسه‌های دیگر از بین نروند.
+    """
+
+    def __init__(self, directory: str, validate_after: float):
+        self.directory = directory
+        self.validate_after = validate_after
+        self._clients = {}
+        self._locks = {}
+        self._index = {}
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"خواندن فهرست session ها ناموفق بود: {e}")
+        self._active = {}
+        active_path = os.path.join(directory, ACTIVE_FILE)
+        if os.path.exists(active_path):
+            try:
+                with open(active_path, encoding='utf-8') as f:
+                    self._active = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"خواندن session های فعال ناموفق بود: {e}")
+
+    def _update(self, name: str, change) -> dict:
+        """
+        فایل JSON `name` را زیر قفل انحصاری دوباره می‌خواند، `change` را روی آن اعمال و در صورت
+        تغییر (برگرداندن مقدار درست) ذخیره می‌کند. محتوای به‌روز فایل را برمی‌گرداند.
+        """
+        path = os.path.join(self.directory, name)
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = {}
+            if os.path.exists(path):
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.warning(f"خواندن {name} ناموفق بود: {e}")
+            if change(data):
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+        return data
+
+    def _path(self, session_file: str) -> str:
+        return os.path.join(self.directory, session_file)
+
+    def list_files(self) -> list:
+        """نام فایل تمام session های ذخیره شده را برمی‌گرداند."""
+        return sorted(f for f in os.listdir(self.directory) if f.endswith('.json') and not f.startswith('.'))
+
+    def find(self, username: str):
+        """نام فایل session یک نام کاربری را (در صورت وجود) برمی‌گرداند."""
+        username = username.strip().lower()
+        session_file = f"{username}.json"
+        if os.path.exists(self._path(session_file)):
+            return session_file
+        for indexed_file, entry in self._index.items():
+            if entry.get('username') == username and os.path.exists(self._path(indexed_file)):
+                return indexed_file
+        return None
+
+    def file_of(self, client):
+        """نام فایل session کلاینتی که در حافظه نگه داشته شده است (در صورت وجود)."""
+        return next((f for f, c in self._clients.items() if c is client), None)
+
+    def username_of(self, session_file: str) -> str:
+        return self._index.get(session_file, {}).get('username') or os.path.splitext(session_file)[0]
+
+    def _is_stale(self, session_file: str) -> bool:
+        validated_at = self._index.get(session_file, {}).get('validated_at', 0)
+        return time.time() - validated_at > self.validate_after
+
+    def _remember(self, session_file: str, client, validated: bool) -> None:
+        def change(index: dict) -> bool:
+            entry = index.setdefault(session_file, {})
+            entry['username'] = (client.username or '').lower() or entry.get('username')
+            entry['user_id'] = str(client.user_id) if client.user_id else entry.get('user_id')
+            if validated:
+                entry['validated_at'] = time.time()
+            return True
+
+        self._index = self._update(INDEX_FILE, change)
+        self._clients[session_file] = client
+
+    async def get_client(self, session_file: str, validate: bool = True):
+        """
+        کلاینت session را برمی‌گرداند؛ در صورت وجود از حافظه و بدون هیچ درخواستی.
+        اگر `validate` درست باشد و session کهنه شده باشد، قبل از برگرداندن اعتبارسنجی می‌شود.
+        خطاهای بارگذاری یا اعتبارسنجی به فراخواننده برگردانده می‌شوند.
+        """
+        lock = self._locks.setdefault(session_file, asyncio.Lock())
+        async with lock:
+            client = self._clients.get(session_file)
+            if client is None:
+                # instagrapi سنگین است و فقط در اولین نیاز بارگذاری می‌شود
+                from instagrapi import Client
+                client = Client()
+                await call_instagram(client.load_settings, self._path(session_file))
+                client.username = self.username_of(session_file)
+
+            if validate and self._is_stale(session_file):
+                try:
+                    account = await call_instagram(client.account_info)
+                except Exception:
+                    self._clients.pop(session_file, None)
+                    raise
+                client.username = account.username
+                self._remember(session_file, client, validated=True)
+                await call_instagram(client.dump_settings, self._path(session_file))
+            else:
+                self._clients[session_file] = client
+            return client
+
+    async def relogin(self, client) -> None:
+        """
+        کلاینتی که اینستاگرام session آن را رد کرده بدون رمز عبور دوباره وارد می‌کند: تنظیمات
+        session از دیسک (که ممکن است با ورود دیگری تازه شده باشد) در همان کلاینت بارگذاری و با
+        شناسه session آن اعتبارسنجی می‌شود. خطاها به فراخواننده برگردانده می‌شوند.
+        """
+        session_file = self.file_of(client)
+        if session_file is None:
+            await call_instagram(client.account_info)
+            return
+        async with self._locks.setdefault(session_file, asyncio.Lock()):
+            await call_instagram(client.load_settings, self._path(session_file))
+            sessionid = client.settings.get('cookies', {}).get('sessionid')
+            if sessionid:
+                await call_instagram(client.login_by_sessionid, sessionid)
+            else:
+                await call_instagram(client.account_info)
+            self._remember(session_file, client, validated=True)
+            await call_instagram(client.dump_settings, self._path(session_file))
+
+    async def save(self, client) -> str:
+        """session کلاینتی که تازه با رمز عبور وارد شده را ذخیره و در حافظه نگه می‌دارد."""
+        session_file = f"{client.username.lower()}.json"
+        await call_instagram(client.dump_settings, self._path(session_file))
+        self._remember(session_file, client, validated=True)
+        return session_file
+
+    def remove(self, session_file: str) -> None:
+        """session را از دیسک، فهرست و حافظه حذف می‌کند."""
+        self._clients.pop(session_file, None)
+        self._index = self._update(INDEX_FILE, lambda index: index.pop(session_file, None) is not None)
+
+        def change(all_active: dict) -> bool:
+            changed = False
+            for user_id, active in list(all_active.items()):
+                if active.get('session_file') == session_file:
+                    del all_active[user_id]
+                    changed = True
+                elif session_file in active.get('pool_sessions', []):
+                    active['pool_sessions'].remove(session_file)
+                    changed = True
+            return changed
+
+        self._active = self._update(ACTIVE_FILE, change)
+        path = self._path(session_file)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def set_active(self, user_id: int, session_file: str = None, pool_sessions: list = None) -> None:
+        """
+        session فعال و/یا استخر اکانت‌های یک اپراتور را برای بازیابی پس از راه‌اندازی
+        مجدد ثبت می‌کند؛ مقادیری که None باشند تغییر نمی‌کنند.
+        """
+        def change(all_active: dict) -> bool:
+            active = all_active.setdefault(str(user_id), {})
+            if session_file is not None:
+                active['session_file'] = session_file
+            if pool_sessions is not None:
+                active['pool_sessions'] = list(pool_sessions)
+            return True
+
+        self._active = self._update(ACTIVE_FILE, change)
+
+    def clear_active(self, user_id: int) -> None:
+        self._active = self._update(ACTIVE_FILE, lambda all_active: all_active.pop(str(user_id), None) is not None)
+
+    def active_operators(self) -> dict:
+        """{user_id: {'session_file': ..., 'pool_sessions': [...]}} اپراتورهایی که session فعال دارند."""
+        return {int(user_id): active for user_id, active in self._active.items() if active.get('session_file')}
+
+    async def restore_all(self) -> tuple:
+        """
+        تمام session های ذخیره شده را به طور همزمان (هر کدام روی pool اکانت خودش) بارگذاری و
+        در صورت کهنه بودن اعتبارسنجی می‌کند. (کلاینت‌ها بر اساس نام فایل، خطاها بر اساس نام فایل) را برمی‌گرداند.
+        """
+        session_files = self.list_files()
+        results = await asyncio.gather(*(self.get_client(f) for f in session_files), return_exceptions=True)
+        clients, failures = {}, {}
+        for session_file, result in zip(session_files, results):
+            if isinstance(result, Exception):
+                failures[session_file] = result
+            else:
+                clients[session_file] = result
+        return clients, failures
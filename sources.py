@@ -0,0 +1,311 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+import re
+import time
+
+from compact import CompactUser
+from executors import call_instagram
+
+logger = logging.getLogger(__name__)
+
+# تعداد تقریبی کاربرانی که در هر درخواست از لیست دنبال‌شوندگان دریافت می‌شود
+FOLLOWING_PAGE_SIZE = 200
+# حداکثر تعداد پست‌هایی که لایک‌کنندگان آن‌ها همزمان دریافت می‌شوند
+LIKERS_CONCURRENCY = 3
+# حداکثر تعداد لینک‌هایی که شناسه پست آن‌ها نگه داشته می‌شود (LRU)
+MEDIA_PK_CACHE_SIZE = 10000
+# لینک‌های تبدیل شده در این فاصله (ثانیه) یکجا روی دیسک ذخیره می‌شوند
+MEDIA_PK_SAVE_DELAY = 5
+
+SHORTCODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+SHORTCODE_PATTERN = re.compile(r'instagram\.com/(?:[\w.]+/)?(?:p|post|reel|reels|tv)/([A-Za-z0-9_-]+)')
+
+
+def shortcode_to_pk(code: str) -> str:
+    """شناسه عددی پست را بدون ارسال درخواست از روی shortcode آن محاسبه می‌کند."""
+    # فقط ۱۱ کاراکتر اول شناسه پست را مشخص می‌کند (shortcode پست‌های خصوصی طولانی‌تر است)
+    code = code[:11]
+    pk = 0
+    for char in code:
+        pk = pk * 64 + SHORTCODE_ALPHABET.index(char)
+    return str(pk)
+
+
+class MediaPkResolver:
+    """
+    تبدیل لینک پست به شناسه عددی آن.
+    لینک‌های استاندارد به صورت محلی (از روی shortcode) تبدیل می‌شوند و فقط سایر
+    لینک‌ها به اینستاگرام ارسال می‌شوند. نتایج (حداکثر `max_entries` لینک اخیر) با
+    تاخیر MEDIA_PK_SAVE_DELAY ثانیه، یکجا و خارج از event loop روی دیسک ذخیره می‌شوند.
+    """
+
+    def __init__(self, path: str, max_entries: int = MEDIA_PK_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self._cache = collections.OrderedDict()
+        self._save_task = None
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._cache.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"خواندن کش شناسه پست‌ها ناموفق بود: {e}")
+        self._trim()
+
+    def _trim(self) -> None:
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _write(self, text: str) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+    async def _save_later(self) -> None:
+        await asyncio.sleep(MEDIA_PK_SAVE_DELAY)
+        self._save_task = None
+        text = json.dumps(self._cache)
+        try:
+            await asyncio.to_thread(self._write, text)
+        except OSError as e:
+            logger.warning(f"ذخیره کش شناسه پست‌ها ناموفق بود: {e}")
+
+    async def resolve(self, cl, url: str) -> str:
+        url = url.strip()
+        media_pk = self._cache.get(url)
+        if media_pk is not None:
+            self._cache.move_to_end(url)
+            return media_pk
+
+        match = SHORTCODE_PATTERN.search(url)
+        if match:
+            media_pk = shortcode_to_pk(match.group(1))
+        else:
+            media_pk = str(await call_instagram(cl.media_pk_from_url, url))
+
+        self._cache[url] = media_pk
+        self._trim()
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_later())
+        return media_pk
+
+
+async def iter_following_pages(cl, user_id, amount: int = 0, page_size: int = FOLLOWING_PAGE_SIZE,
+                               before_request=None):
+    """
+    دنبال‌شوندگان یک کاربر را صفحه به صفحه (لیستی از UserShort) برمی‌گرداند.
+    اگر `amount` بزرگ‌تر از صفر باشد، فقط همین تعداد کاربر برگردانده می‌شود.
+    `before_request` (در صورت وجود) پیش از دریافت هر صفحه منتظر می‌ماند.
+    """
+    max_id = ""
+    remaining = amount
+    while True:
+        chunk_size = min(page_size, remaining) if amount else page_size
+        if before_request is not None:
+            await before_request()
+        users, max_id = await call_instagram(cl.user_following_v1_chunk, str(user_id), chunk_size, max_id)
+        if amount:
+            users = users[:remaining]
+            remaining -= len(users)
+        if users:
+            yield users
+        if not max_id or (amount and remaining <= 0):
+            return
+
+
+class FollowingSnapshotStore:
+    """
+    آخرین لیست دنبال‌شوندگان هر اکانت روی دیسک (`{user_id}.json`) تا هر فرآیند لیست را
+    دوباره صفحه به صفحه دریافت نکند. لیست دنبال‌شوندگان از جدیدترین شروع می‌شود، پس در
+    هر فرآیند فقط صفحات ابتدای آن تا رسیدن به کاربری که در snapshot هست دریافت می‌شوند.
+    دنبال نکردن‌ها فقط با دریافت کامل لیست دیده می‌شوند که اگر از آخرین دریافت کامل بیش
+    از `full_sync_after` ثانیه گذشته باشد در پس‌زمینه انجام می‌شود.
+    """
+
+    def __init__(self, directory: str, full_sync_after: float):
+        self.directory = directory
+        self.full_sync_after = full_sync_after
+        os.makedirs(directory, exist_ok=True)
+        # وظایف دریافت کامل در حال اجرا به ازای اکانت
+        self._reconciling = {}
+
+    def _path(self, account: str) -> str:
+        return os.path.join(self.directory, f"{account}.json")
+
+    def load(self, account: str):
+        """
+        snapshot اکانت را (در صورت وجود) برمی‌گرداند: {'users': [[pk, username, is_private], ...],
+        'complete': آیا کل لیست است یا فقط ابتدای آن، 'synced_at': زمان آخرین دریافت کامل}.
+        """
+        path = self._path(account)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"خواندن لیست ذخیره شده دنبال‌شوندگان {account} ناموفق بود: {e}")
+            return None
+
+    def save(self, account: str, users: list, complete: bool, synced_at: float) -> None:
+        snapshot = {
+            'users': [[int(user.pk), user.username, bool(getattr(user, 'is_private', False))] for user in users],
+            'complete': complete,
+            'synced_at': synced_at,
+        }
+        path = self._path(account)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def is_stale(self, synced_at: float) -> bool:
+        return time.time() - synced_at > self.full_sync_after
+
+    def schedule_reconcile(self, cl, before_request=None) -> asyncio.Task:
+        """
+        دریافت کامل لیست دنبال‌شوندگان اکانت را (اگر در حال اجرا نباشد) در پس‌زمینه شروع می‌کند
+        و وظیفه آن را برمی‌گرداند. `before_request` پیش از دریافت هر صفحه منتظر می‌ماند.
+        """
+        account = str(cl.user_id)
+        task = self._reconciling.get(account)
+        if task is not None:
+            return task
+        task = asyncio.create_task(self._reconcile(cl, account, before_request))
+        self._reconciling[account] = task
+        task.add_done_callback(lambda _: self._reconciling.pop(account, None))
+        return task
+
+    async def _reconcile(self, cl, account: str, before_request=None) -> None:
+        started_at = time.time()
+        users = []
+        try:
+            async for page in iter_following_pages(cl, account, before_request=before_request):
+                users.extend(CompactUser.from_user(user) for user in page)
+        except Exception as e:
+            logger.warning(f"دریافت کامل لیست دنبال‌شوندگان {cl.username} ناموفق بود: {e}")
+            return
+        await asyncio.to_thread(self.save, account, users, True, started_at)
+        logger.info(f"لیست دنبال‌شوندگان {cl.username} به طور کامل به‌روز شد ({len(users)} کاربر).")
+
+
+async def iter_following_snapshot(cl, store: FollowingSnapshotStore, amount: int = 0,
+                                  page_size: int = FOLLOWING_PAGE_SIZE, before_reconcile_request=None,
+                                  on_reconcile=None):
+    """
+    مانند iter_following_pages، ولی از snapshot ذخیره شده اکانت: فقط دنبال‌شدگان جدید (صفحات
+    ابتدای لیست تا اولین کاربر آشنا) دریافت می‌شوند و بقیه بدون درخواست از snapshot برگردانده
+    می‌شوند. اگر snapshot وجود نداشته باشد یا برای `amount` کاربر کافی نباشد، لیست مثل قبل
+    دریافت و ذخیره می‌شود. snapshot کهنه در پس‌زمینه به طور کامل دوباره دریافت می‌شود؛
+    درخواست‌های آن منتظر `before_reconcile_request` می‌مانند و وظیفه آن به `on_reconcile` داده می‌شود.
+    """
+    account = str(cl.user_id)
+    snapshot = await asyncio.to_thread(store.load, account)
+    if snapshot is None or not (snapshot['complete'] or amount and len(snapshot['users']) >= amount):
+        started_at = time.time()
+        fetched = []
+        async for page in iter_following_pages(cl, account, amount, page_size):
+            fetched.extend(CompactUser.from_user(user) for user in page)
+            yield page
+        # با `amount` فقط ابتدای لیست دریافت شده است، مگر این که لیست زودتر تمام شده باشد
+        complete = not amount or len(fetched) < amount
+        await asyncio.to_thread(store.save, account, fetched, complete, started_at)
+        return
+
+    known = {user[0] for user in snapshot['users']}
+    new_users = []
+    overlapped = False
+    pages = iter_following_pages(cl, account, 0, page_size)
+    try:
+        async for page in pages:
+            for user in page:
+                if int(user.pk) in known:
+                    overlapped = True
+                    break
+                new_users.append(CompactUser.from_user(user))
+            if overlapped:
+                break
+    finally:
+        await pages.aclose()
+
+    if overlapped:
+        new_pks = {user.pk for user in new_users}
+        users = new_users + [CompactUser(*user) for user in snapshot['users'] if user[0] not in new_pks]
+        complete, synced_at = snapshot['complete'], snapshot['synced_at']
+    else:
+        # هیچ کاربر آشنایی در لیست نبود؛ لیست دریافت شده خودش لیست کامل است
+        users, complete, synced_at = new_users, True, time.time()
+    await asyncio.to_thread(store.save, account, users, complete, synced_at)
+    if store.is_stale(synced_at):
+        task = store.schedule_reconcile(cl, before_reconcile_request)
+        if on_reconcile is not None:
+            on_reconcile(task)
+
+    if amount:
+        users = users[:amount]
+    for start in range(0, len(users), page_size):
+        yield users[start:start + page_size]
+
+
+async def iter_post_likers_pages(cl, urls: list, resolver: MediaPkResolver, skip_errors: tuple = (),
+                                 concurrency: int = LIKERS_CONCURRENCY, repeats=None):
+    """
+    لایک‌کنندگان عمومی پست‌ها را (بدون تکرار) به ازای هر پست برمی‌گرداند.
+    لایک‌کنندگان حداکثر `concurrency` پست همزمان دریافت می‌شوند و هر پستی که
+    زودتر آماده شود زودتر تحویل داده می‌شود تا لایک کردن بلافاصله شروع شود.
+    خطاهای موجود در `skip_errors` (مثلاً پست پیدا نشد) فقط همان لینک را رد می‌کنند.
+    اگر `repeats` (یک Counter) داده شود، تعداد دفعاتی که هر کاربرِ قبلاً تحویل داده شده
+    در لایک‌کنندگان پست‌های بعدی دوباره دیده می‌شود در آن شمرده می‌شود.
+    """
+    media_pks = {}
+    for url in urls:
+        try:
+            media_pk = await resolver.resolve(cl, url)
+        except skip_errors as e:
+            logger.warning(f"تبدیل لینک {url} به شناسه پست ناموفق بود: {e}")
+            continue
+        media_pks.setdefault(media_pk, url)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_likers(media_pk, url):
+        async with semaphore:
+            try:
+                return await call_instagram(cl.media_likers, media_pk)
+            except skip_errors as e:
+                logger.warning(f"دریافت لایک‌کنندگان لینک {url} ناموفق بود: {e}")
+                return []
+
+    tasks = [asyncio.create_task(fetch_likers(media_pk, url)) for media_pk, url in media_pks.items()]
+    # شناسه‌ها به صورت عدد نگه داشته می‌شوند که حافظه کمتری از رشته مصرف می‌کند
+    seen = set()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            likers = await next_done
+            page = []
+            for liker in likers:
+                pk = int(liker.pk)
+                if pk in seen:
+                    if repeats is not None:
+                        repeats[pk] += 1
+                    continue
+                seen.add(pk)
+                if not liker.is_private:
+                    page.append(liker)
+            if page:
+                yield page
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def skip_known_users(source, known_pks: set):
+    """صفحات `source` را بدون کاربرانی که شناسه آن‌ها در `known_pks` است برمی‌گرداند."""
+    async for page in source:
+        page = [user for user in page if int(user.pk) not in known_pks]
+        if page:
+            yield page
@@ -0,0 +1,143 @@
+import contextlib
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+
+from compact import CompactTimestampIndex
+
+logger = logging.getLogger(__name__)
+
+# هر بازدید یک رکورد ۱۲ بایتی (شناسه کاربر، زمان) در انتهای فایل اکانت است
+RECORD = struct.Struct('<qI')
+# اگر تعداد رکوردهای فایل بیش از این ضریب از کاربران معتبر باشد، فایل بازنویسی می‌شود
+COMPACT_RATIO = 2
+
+
+class RecentVisitIndex:
+    """
+    فهرست ماندگار آخرین زمان بازدید (دریافت پست‌های) هر کاربر به ازای هر اکانت.
+    کاربری که در `cooldown` ثانیه گذشته بازدید شده دوباره درخواستی نمی‌گیرد.
+    بازدیدها به انتهای یک فایل باینری برای هر اکانت اضافه می‌شوند و هنگام بارگذاری
+    در یک CompactTimestampIndex خوانده می‌شوند؛ بازدیدهای منقضی شده هنگام بارگذاری
+    کنار گذاشته می‌شوند و فایل در صورت بزرگ شدن بیش از حد بازنویسی می‌شود.
+    ربات و پروسه‌های worker همزمان در فایل‌ها می‌نویسند: اضافه کردن رکورد با قفل مشترک و
+    بازنویسی با قفل انحصاری فایل `{account}.lock` انجام می‌شود.
+    """
+
+    def __init__(self, directory: str, cooldown: float):
+        self.directory = directory
+        self.cooldown = cooldown
+        self._indexes = {}
+        self._files = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.cooldown > 0
+
+    def _path(self, account: str) -> str:
+        return os.path.join(self.directory, f"{account}.bin")
+
+    @contextlib.contextmanager
+    def _file_lock(self, account: str, exclusive: bool):
+        with open(os.path.join(self.directory, f"{account}.lock"), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _read(self, account: str) -> tuple:
+        """(فهرست بازدیدهای معتبر، تعداد کل رکوردها) فایل اکانت را برمی‌گرداند."""
+        index = CompactTimestampIndex()
+        path = self._path(account)
+        records = 0
+        if os.path.exists(path):
+            oldest = time.time() - self.cooldown
+            with open(path, 'rb') as f:
+                data = f.read()
+            # رکورد آخر ممکن است هنگام قطع شدن ناقص نوشته شده باشد
+            usable = len(data) - len(data) % RECORD.size
+            for pk, visited_at in RECORD.iter_unpack(memoryview(data)[:usable]):
+                records += 1
+                if visited_at >= oldest:
+                    index.set(pk, visited_at)
+        return index, records
+
+    def load(self, account: str) -> None:
+        """بازدیدهای معتبر اکانت را (در صورتی که قبلاً بارگذاری نشده باشد) از دیسک می‌خواند."""
+        if not self.enabled or account in self._indexes:
+            return
+        index, records = self._read(account)
+        if records > COMPACT_RATIO * len(index):
+            index = self._rewrite(account)
+        with self._lock:
+            self._indexes.setdefault(account, index)
+
+    def _rewrite(self, account: str) -> CompactTimestampIndex:
+        """
+        فایل اکانت را فقط با بازدیدهای معتبر بازنویسی می‌کند. فایل زیر قفل انحصاری دوباره
+        خوانده می‌شود تا رکوردهایی که پروسه‌های دیگر در این فاصله اضافه کرده‌اند از دست نروند.
+        """
+        path = self._path(account)
+        with self._file_lock(account, exclusive=True):
+            index, _ = self._read(account)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                for pk, visited_at in index.items():
+                    f.write(RECORD.pack(pk, visited_at))
+            os.replace(tmp_path, path)
+        return index
+
+    def _append_file(self, account: str):
+        """فایل اکانت برای اضافه کردن رکورد؛ اگر پروسه دیگری آن را بازنویسی کرده باشد دوباره باز می‌شود."""
+        path = self._path(account)
+        f = self._files.get(account)
+        if f is not None:
+            try:
+                if os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            f.close()
+        f = self._files[account] = open(path, 'ab')
+        return f
+
+    def visited_recently(self, account: str, user_pk, now: float = None) -> bool:
+        """بررسی می‌کند که آیا کاربر در بازه cooldown توسط این اکانت بازدید شده است."""
+        index = self._indexes.get(account)
+        if index is None:
+            return False
+        visited_at = index.get(user_pk)
+        now = time.time() if now is None else now
+        return visited_at is not None and now - visited_at < self.cooldown
+
+    def record(self, account: str, user_pk, now: float = None) -> None:
+        """بازدید کاربر را در حافظه و انتهای فایل اکانت ثبت می‌کند."""
+        if not self.enabled:
+            return
+        visited_at = int(time.time() if now is None else now)
+        with self._lock:
+            index = self._indexes.get(account)
+            if index is None:
+                index = self._indexes[account] = CompactTimestampIndex()
+            index.set(user_pk, visited_at)
+            with self._file_lock(account, exclusive=False):
+                f = self._append_file(account)
+                f.write(RECORD.pack(int(user_pk), visited_at))
+                f.flush()
+
+    def count_recent(self, account: str) -> int:
+        """تعداد کاربرانی که این اکانت در حال حاضر در بازه cooldown آن‌ها را بازدید کرده است."""
+        index = self._indexes.get(account)
+        if index is None:
+            return 0
+        oldest = time.time() - self.cooldown
+        return sum(1 for _, visited_at in index.items() if visited_at >= oldest)
+
+    def close(self) -> None:
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
@@ -0,0 +1,99 @@
+import asyncio
+import hmac
+import json
+import logging
+
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+# به‌روزرسانی‌های تلگرام بسیار کوچک‌تر از این هستند
+MAX_BODY_BYTES = 1 << 20
+READ_TIMEOUT = 10
+
+
+class BadRequest(ValueError):
+    """درخواست HTTP نامعتبر است (400)."""
+
+
+class PayloadTooLarge(ValueError):
+    """بدنه درخواست از MAX_BODY_BYTES بزرگ‌تر است (413)."""
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """خط درخواست، هدرها (با نام کوچک شده) و بدنه یک درخواست HTTP را می‌خواند."""
+    request_line = await asyncio.wait_for(reader.readline(), timeout=READ_TIMEOUT)
+    headers = {}
+    while True:
+        line = await asyncio.wait_for(reader.readline(), timeout=READ_TIMEOUT)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise BadRequest("malformed Content-Length") from None
+    if length < 0:
+        raise BadRequest("malformed Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise PayloadTooLarge("request body too large")
+    body = await asyncio.wait_for(reader.readexactly(length), timeout=READ_TIMEOUT) if length else b''
+    return request_line.decode('latin-1').split(), headers, body
+
+
+async def _respond(writer: asyncio.StreamWriter, status: str, body: bytes = b'') -> None:
+    writer.write(
+        f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+
+
+def _make_handler(application, path: str, secret: str):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                parts, headers, body = await _read_request(reader)
+            except PayloadTooLarge:
+                await _respond(writer, '413 Payload Too Large')
+                return
+            except BadRequest:
+                await _respond(writer, '400 Bad Request')
+                return
+            if len(parts) < 2 or parts[1].split('?')[0] != path:
+                await _respond(writer, '404 Not Found', b'not found\n')
+                return
+            if parts[0] != 'POST':
+                await _respond(writer, '405 Method Not Allowed')
+                return
+            if not hmac.compare_digest(headers.get(SECRET_HEADER, '').encode(), secret.encode()):
+                logger.warning("درخواست webhook با secret token نامعتبر رد شد.")
+                await _respond(writer, '403 Forbidden')
+                return
+            try:
+                update = Update.de_json(json.loads(body), application.bot)
+            except (ValueError, TypeError, KeyError) as e:
+                logger.warning(f"به‌روزرسانی webhook نامعتبر است: {e}")
+                await _respond(writer, '400 Bad Request')
+                return
+            # پردازش در صف به‌روزرسانی‌های ربات انجام می‌شود تا پاسخ تلگرام معطل نماند
+            await application.update_queue.put(update)
+            await _respond(writer, '200 OK')
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def start_webhook_server(application, host: str, port: int, path: str, secret: str) -> asyncio.AbstractServer:
+    """
+    سرور HTTP داخلی webhook را راه‌اندازی می‌کند. درخواست‌های POST به `path` که هدر
+    secret token آن‌ها با `secret` برابر باشد به صف به‌روزرسانی‌های `application` سپرده می‌شوند.
+    """
+    server = await asyncio.start_server(_make_handler(application, path, secret), host, port)
+    logger.info(f"webhook در آدرس http://{host}:{port}{path} منتظر به‌روزرسانی‌هاست.")
+    return server
@@ -0,0 +1,152 @@
+"""
+پروسه‌های worker برای اجرای فرآیندهای لایک جدا از ربات تلگرام.
+
+با JOB_WORKERS بزرگ‌تر از صفر، ربات فرآیندها را فقط در صف ماندگار (data/workers.sqlite3)
+ثبت می‌کند. هر پروسه worker فرآیندهای آماده را برمی‌دارد، با همان موتور لایک ربات اجرا
+می‌کند، پیام‌های فرآیند را مستقیماً به تلگرام می‌فرستد و پیشرفت را برای /status منتشر
+می‌کند. راه‌اندازی مجدد ربات روی فرآیندهای در حال اجرا اثری ندارد؛ worker ای که خاموش
+شود فرآیندهایش را به صف برمی‌گرداند تا worker دیگری از نقطه بازیابی ادامه دهد.
+
+مثال:
+    python worker.py                    # JOB_WORKERS پروسه
+    python worker.py --processes 8 --jobs-per-process 2
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# فاصله انتشار پیشرفت و دریافت دستورهای مکث/ادامه/لغو (ثانیه)
+PUBLISH_INTERVAL = 2
+# فرآیندی که worker آن این مدت پیشرفتی منتشر نکرده باشد توسط worker دیگری برداشته می‌شود
+STALE_AFTER = 60
+# فاصله بررسی صف وقتی فرآیند آماده‌ای وجود ندارد (ثانیه)
+CLAIM_INTERVAL = 2
+
+
+async def run_claimed_job(main, bot, worker_id: str, row: dict, stop: asyncio.Event) -> None:
+    """یک فرآیند برداشته شده را از نقطه بازیابی آن اجرا و پیشرفتش را تا پایان منتشر می‌کند."""
+    chat_id = row['chat_id']
+    checkpoint = main.JobCheckpoint(os.path.join(main.JOBS_DIR, row['id']))
+    try:
+        client = await main.session_manager.get_client(row['session_file'])
+        meta, users, counters = await asyncio.to_thread(checkpoint.load)
+    except Exception as e:
+        logger.error(f"شروع فرآیند {row['id']} در worker ناموفق بود: {e}")
+        main.job_broker.finish(row['id'])
+        await bot.send_message(chat_id, f"🚨 شروع فرآیند لایک ناموفق بود: {e}\n"
+                                        "پس از رفع مشکل، با /resume_liking می‌توانید دوباره تلاش کنید.")
+        return
+
+    context = SimpleNamespace(bot=bot, bot_data={}, user_data={
+        'chat_id': chat_id,
+        'client': client,
+        'session_file': row['session_file'],
+        'worker_job_id': row['id'],
+    })
+    main._start_liking_job(context, meta['mode'], meta['config'], checkpoint,
+                           users=users, counters=counters, total_items=meta['total_items'],
+                           client=client, pool_sessions=row['pool_sessions'],
+                           source_complete=meta['source_complete'], known_pks=meta['known_pks'])
+    job = context.user_data['liking_job']
+    controls = {'pause': main._pause_job, 'resume': main._unpause_job, 'cancel': main._cancel_job}
+    stopping = asyncio.create_task(stop.wait())
+    try:
+        while not job['task'].done():
+            control = main.job_broker.heartbeat(row['id'], worker_id, main._job_snapshot(job))
+            if control in controls:
+                controls[control](job)
+            await asyncio.wait([job['task'], stopping], timeout=PUBLISH_INTERVAL,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if stop.is_set() and job['is_running']:
+                job['shutting_down'] = True
+                main._cancel_job(job)
+                await asyncio.wait([job['task']], timeout=main.SHUTDOWN_DRAIN_TIMEOUT)
+                break
+    finally:
+        stopping.cancel()
+
+    if job['shutting_down']:
+        main.job_broker.requeue(row['id'])
+    else:
+        main.job_broker.finish(row['id'], main._job_snapshot(job))
+
+
+async def run_worker(worker_id: str, jobs_per_process: int) -> None:
+    """تا دریافت SIGINT/SIGTERM فرآیندهای صف را برمی‌دارد و حداکثر `jobs_per_process` فرآیند را همزمان اجرا می‌کند."""
+    import main
+    from telegram import Bot
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    bot = Bot(main.TELEGRAM_BOT_TOKEN)
+    await bot.initialize()
+    logger.info(f"worker {worker_id} آماده اجرای فرآیندهاست.")
+    running = set()
+    try:
+        while not stop.is_set():
+            while len(running) < jobs_per_process:
+                row = main.job_broker.claim(worker_id, STALE_AFTER)
+                if row is None:
+                    break
+                logger.info(f"worker {worker_id} فرآیند {row['id']} را برداشت.")
+                running.add(asyncio.create_task(run_claimed_job(main, bot, worker_id, row, stop)))
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=CLAIM_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            running = {task for task in running if not task.done()}
+        if running:
+            logger.info(f"worker {worker_id} در انتظار توقف {len(running)} فرآیند...")
+            await asyncio.wait(running)
+    finally:
+        await main.event_log.close()
+        await bot.shutdown()
+
+
+def _run_process(jobs_per_process: int) -> None:
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    asyncio.run(run_worker(worker_id, jobs_per_process))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="اجرای فرآیندهای لایک در پروسه‌های جداگانه از ربات.")
+    parser.add_argument('--processes', type=int, help="تعداد پروسه‌ها (پیش‌فرض: JOB_WORKERS)")
+    parser.add_argument('--jobs-per-process', type=int, default=1, help="حداکثر فرآیند همزمان در هر پروسه")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    processes = args.processes or int(os.getenv("JOB_WORKERS", "0"))
+    if processes <= 0 or int(os.getenv("JOB_WORKERS", "0")) <= 0:
+        parser.error("برای استفاده از workerها مقدار JOB_WORKERS در فایل .env باید بزرگ‌تر از صفر باشد.")
+
+    # spawn تا هر پروسه اتصال‌های SQLite و thread pool های خودش را بسازد
+    ctx = multiprocessing.get_context('spawn')
+    children = [ctx.Process(target=_run_process, args=(args.jobs_per_process,), name=f"worker-{i}")
+                for i in range(processes)]
+    for child in children:
+        child.start()
+
+    def forward(signum, frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        child.join()
+
+
+if __name__ == '__main__':
+    main()